@@ -0,0 +1,149 @@
+import threading
+import logging
+from datetime import datetime, timedelta, timezone, time as dtime
+import pandas as pd
+
+logger = logging.getLogger("BarAggregator")
+
+IST = timezone(timedelta(hours=5, minutes=30))
+SESSION_START = dtime(9, 15)
+SESSION_END = dtime(15, 30)
+
+# Interval -> (seconds, Angel interval name used for the REST backfill)
+INTERVALS = {"1m": (60, "ONE_MINUTE"), "5m": (300, "FIVE_MINUTE")}
+
+# A first tick this close to 09:15 means the token's bars were built live from the open
+LIVE_FROM_OPEN_SEC = 2
+
+CANDLE_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+
+def candles_frame(candles):
+    """Angel-format candles -> the DataFrame the strategies take (date, open, high, low, close, volume)."""
+    return pd.DataFrame(candles, columns=CANDLE_COLUMNS)
+
+
+def _stamp(dt):
+    # Same timestamp format as Angel candles: "2024-12-28T09:15:00+05:30"
+    return dt.strftime("%Y-%m-%dT%H:%M:%S+05:30")
+
+
+def _parse_stamp(ts):
+    try:
+        return datetime.strptime(str(ts)[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=IST)
+    except ValueError:
+        return None
+
+
+class _TokenBars:
+    """Today's bars of one token for every interval; each bar is [start dt, o, h, l, c, v]."""
+
+    def __init__(self, session_date):
+        self.session_date = session_date
+        self.open_dt = datetime.combine(session_date, SESSION_START, tzinfo=IST)
+        self.bars = {name: [] for name in INTERVALS}
+        self.backfilled = {name: False for name in INTERVALS}
+        self.last_cum_volume = None
+
+
+class BarAggregator:
+    """
+    Builds 1-minute and 5-minute OHLCV bars per token from live ticks, inside the NSE
+    session (09:15-15:30 IST). When a token's first tick arrives after the open, only the
+    bars before it are backfilled from REST, once, on the first read; after that today's
+    bars cost no broker calls.
+    backfill_func(token, angel_interval, session_date) -> Angel-format candles (or None).
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls, backfill_func=None):
+        if cls._instance is None:
+            cls._instance = BarAggregator(backfill_func)
+        return cls._instance
+
+    def __init__(self, backfill_func=None):
+        self.backfill_func = backfill_func
+        self._tokens = {} # token -> _TokenBars
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self.backfills = 0
+
+    def on_tick(self, token, ltp, cum_volume=None, high=None, low=None, now=None):
+        """Folds a tick (or a coalesced batch: latest ltp plus its high/low) into the open bars."""
+        now = (now or datetime.now(IST)).astimezone(IST)
+        if not (SESSION_START <= now.time() < SESSION_END): return
+        high = ltp if high is None else high
+        low = ltp if low is None else low
+        with self._lock:
+            tb = self._tokens.get(token)
+            if tb is None or tb.session_date != now.date():
+                tb = self._tokens[token] = _TokenBars(now.date())
+            # Day volume is cumulative; a bar gets the increase since the previous tick
+            vol = 0
+            if cum_volume is not None:
+                if tb.last_cum_volume is not None and cum_volume >= tb.last_cum_volume:
+                    vol = cum_volume - tb.last_cum_volume
+                tb.last_cum_volume = cum_volume
+            elapsed = (now - tb.open_dt).total_seconds()
+            for name, (secs, _) in INTERVALS.items():
+                start = tb.open_dt + timedelta(seconds=int(elapsed // secs) * secs)
+                bars = tb.bars[name]
+                if not bars or bars[-1][0] != start:
+                    # Live from the open only if the first tick is at the bell; a later first tick
+                    # gets REST's open, range and volume merged into this partial bar by _backfill
+                    if not bars and elapsed <= LIVE_FROM_OPEN_SEC: tb.backfilled[name] = True
+                    bars.append([start, ltp, high, low, ltp, vol])
+                else:
+                    bar = bars[-1]
+                    if high > bar[2]: bar[2] = high
+                    if low < bar[3]: bar[3] = low
+                    bar[4] = ltp
+                    bar[5] += vol
+            self.ticks += 1
+
+    def _backfill(self, token, name, tb):
+        """Fetches the session's bars before the first live bar and merges them in (outside the lock)."""
+        first = tb.bars[name][0][0]
+        candles = self.backfill_func(token, INTERVALS[name][1], tb.session_date)
+        if candles is None: return # Failed fetch, retried on the next read
+        self.backfills += 1
+        earlier = []
+        with self._lock:
+            live = tb.bars[name]
+            for c in candles:
+                dt = _parse_stamp(c[0])
+                if dt is None: continue
+                if dt < first:
+                    earlier.append([dt, c[1], c[2], c[3], c[4], c[5]])
+                elif dt == first and live:
+                    # The first live bar started mid-interval: take REST's open and range
+                    bar = live[0]
+                    bar[1] = c[1]
+                    bar[2] = max(bar[2], c[2])
+                    bar[3] = min(bar[3], c[3])
+                    bar[5] = max(bar[5], c[5])
+            tb.bars[name] = earlier + live
+            tb.backfilled[name] = True
+
+    def bars(self, token, interval="5m", now=None):
+        """
+        Today's bars for a token in Angel candle format ([ts, o, h, l, c, v], the last one
+        still forming), or None when the token has no live bars this session.
+        """
+        now = (now or datetime.now(IST)).astimezone(IST)
+        with self._lock:
+            tb = self._tokens.get(str(token))
+            if tb is None or tb.session_date != now.date() or not tb.bars[interval]: return None
+            need_backfill = not tb.backfilled[interval] and self.backfill_func is not None
+        if need_backfill:
+            try:
+                self._backfill(str(token), interval, tb)
+            except Exception as e:
+                logger.error(f"Bar backfill failed for {token}: {e}")
+        with self._lock:
+            return [[_stamp(b[0]), b[1], b[2], b[3], b[4], b[5]] for b in tb.bars[interval]]
+
+    def stats(self):
+        with self._lock:
+            return {"tokens": len(self._tokens), "ticks": self.ticks, "backfills": self.backfills}
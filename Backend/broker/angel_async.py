@@ -0,0 +1,119 @@
+import json
+import asyncio
+import logging
+import httpx
+
+try:
+    from ..rate_limiter import limiter as shared_limiter, SMARTAPI_ENDPOINTS, is_rate_limited
+except ImportError:
+    from rate_limiter import limiter as shared_limiter, SMARTAPI_ENDPOINTS, is_rate_limited
+
+logger = logging.getLogger("AngelAsync")
+
+ROUTES = {
+    "ltpData": "/rest/secure/angelbroking/order/v1/getLtpData",
+    "getCandleData": "/rest/secure/angelbroking/historical/v1/getCandleData",
+    "getMarketData": "/rest/secure/angelbroking/market/v1/quote",
+}
+QUOTE_BATCH = 50 # Max tokens per getMarketData call
+
+
+class AngelAsyncClient:
+    """
+    Async Angel One SmartAPI client for request handlers. Shares the session of the sync
+    SmartConnect instance (root, API key, JWT set at login) and sends every call over one
+    pooled keep-alive httpx.AsyncClient, paced by the shared Rate Limiter.
+    """
+
+    def __init__(self, smart, limiter=None, timeout=10.0, max_connections=20):
+        self._smart = smart
+        self._limiter = limiter or shared_limiter
+        self._timeout = timeout
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._http = None
+
+    @property
+    def http(self):
+        # Created lazily so it binds to the server's event loop
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(base_url=self._smart.root, timeout=self._timeout, limits=self._limits)
+        return self._http
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def _headers(self):
+        s = self._smart
+        accept = getattr(s, "accept", "application/json")
+        headers = {
+            "Content-type": accept,
+            "X-ClientLocalIP": getattr(s, "clientLocalIp", "127.0.0.1"),
+            "X-ClientPublicIP": getattr(s, "clientPublicIp", "127.0.0.1"),
+            "X-MACAddress": getattr(s, "clientMacAddress", ""),
+            "Accept": accept,
+            "X-PrivateKey": getattr(s, "privateKey", None) or s.api_key,
+            "X-UserType": getattr(s, "userType", "USER"),
+            "X-SourceID": getattr(s, "sourceID", "WEB"),
+        }
+        if s.access_token:
+            headers["Authorization"] = f"Bearer {s.access_token}"
+        return headers
+
+    def session(self):
+        """Root URL and request headers of the current session, for clients in other processes."""
+        return {"root": self._smart.root, "headers": self._headers()}
+
+    async def _post(self, method, params):
+        endpoint = SMARTAPI_ENDPOINTS.get(method, "default")
+        bucket = await self._limiter.acquire_async(endpoint)
+        throttled = False
+        try:
+            r = await self.http.post(ROUTES[method], content=json.dumps(params), headers=self._headers())
+            if r.status_code == 429:
+                throttled = True
+            data = r.json()
+            throttled = throttled or is_rate_limited(data)
+            if data.get("error_type"):
+                raise Exception(f"{data['error_type']}: {data.get('message')}")
+            if data.get("status", False) is False:
+                logger.error(f"Angel {method} failed: {data}")
+            return data
+        except Exception as e:
+            throttled = throttled or is_rate_limited(e)
+            raise
+        finally:
+            self._limiter.release(bucket, throttled)
+
+    async def ltpData(self, exchange, tradingsymbol, symboltoken):
+        return await self._post("ltpData", {"exchange": exchange, "tradingsymbol": tradingsymbol, "symboltoken": symboltoken})
+
+    async def getCandleData(self, historicDataParams):
+        return await self._post("getCandleData", historicDataParams)
+
+    async def getMarketData(self, mode, exchangeTokens):
+        return await self._post("getMarketData", {"mode": mode, "exchangeTokens": exchangeTokens})
+
+    async def getQuotes(self, mode, exchangeTokens):
+        """
+        getMarketData for any number of tokens: split into batches of QUOTE_BATCH (the API
+        limit per call), fetched concurrently. Returns the merged `fetched` rows.
+        """
+        batches, current = [], {}
+        count = 0
+        for exch, tokens in exchangeTokens.items():
+            for tok in tokens:
+                if count == QUOTE_BATCH:
+                    batches.append(current)
+                    current, count = {}, 0
+                current.setdefault(exch, []).append(str(tok))
+                count += 1
+        if current: batches.append(current)
+
+        responses = await asyncio.gather(*(self.getMarketData(mode, b) for b in batches))
+        fetched = []
+        for res in responses:
+            if res and res.get('data'):
+                fetched.extend(res['data'].get('fetched') or [])
+        return fetched
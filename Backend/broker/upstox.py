@@ -3,9 +3,26 @@ import os
 import urllib.parse
 from datetime import datetime, timedelta
 import pandas as pd
-import io
-import gzip
 import json
+import time
+import threading
+
+try:
+    from ..rate_limiter import limiter
+except ImportError:
+    from rate_limiter import limiter
+
+try:
+    import pyarrow.feather as feather # Optional: memory-mapped columnar cache
+except ImportError:
+    feather = None
+
+INSTRUMENTS_URL = "https://assets.upstox.com/market-quote/instruments/exchange/NSE.csv.gz"
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INSTRUMENTS_CACHE = os.path.join(BASE_DIR, "upstox_instruments.feather" if feather else "upstox_instruments.pkl")
+# Only the columns the app reads; low-cardinality ones are stored as categoricals
+INSTRUMENT_COLUMNS = ["instrument_key", "tradingsymbol", "name", "instrument_type", "exchange"]
+INSTRUMENT_CATEGORIES = ["instrument_type", "exchange"]
 
 class UpstoxBroker:
     def __init__(self, api_key=None, api_secret=None, redirect_uri=None):
@@ -15,6 +32,10 @@ class UpstoxBroker:
         self.base_url = "https://api.upstox.com/v2"
         self.access_token = os.getenv("UPSTOX_ACCESS_TOKEN")
         self.instruments = None
+        self.instrument_keys = {} # tradingsymbol -> instrument_key
+        self.instruments_date = None # Day the loaded master is current for
+        self._instruments_retry_at = 0.0 # After a failed daily download, when to try again
+        self._instruments_lock = threading.Lock()
         
         # Check Local File if env is missing
         if not self.access_token:
@@ -69,7 +90,7 @@ class UpstoxBroker:
         }
         
         try:
-            response = requests.post(url, headers=headers, data=data)
+            response = limiter.call("upstox", requests.post, url, headers=headers, data=data)
             resp_json = response.json()
             
             if "access_token" in resp_json:
@@ -84,39 +105,84 @@ class UpstoxBroker:
             print(f"Error generating Upstox token: {e}")
             return False
 
+    def instruments_stale(self):
+        """The master is republished every morning, so a cache from an earlier day is stale."""
+        if not os.path.exists(INSTRUMENTS_CACHE): return True
+        return datetime.fromtimestamp(os.path.getmtime(INSTRUMENTS_CACHE)).date() < datetime.now().date()
+
+    def download_instruments(self):
+        """Download NSE instruments and keep only the columns we use."""
+        print("Upstox: Downloading Instrument Master...")
+        tmp_path = INSTRUMENTS_CACHE + ".csv.gz.tmp"
+        with requests.get(INSTRUMENTS_URL, stream=True) as response:
+            response.raise_for_status()
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+        try:
+            df = pd.read_csv(tmp_path, compression="gzip",
+                             usecols=lambda c: c in INSTRUMENT_COLUMNS,
+                             dtype={c: "category" for c in INSTRUMENT_CATEGORIES})
+        finally:
+            os.remove(tmp_path)
+
+        cache_tmp = INSTRUMENTS_CACHE + ".tmp"
+        if feather:
+            feather.write_feather(df.reset_index(drop=True), cache_tmp, compression="uncompressed")
+        else:
+            df.to_pickle(cache_tmp)
+        os.replace(cache_tmp, INSTRUMENTS_CACHE)
+        return df
+
+    def read_instruments_cache(self):
+        if feather:
+            return feather.read_table(INSTRUMENTS_CACHE, memory_map=True).to_pandas()
+        return pd.read_pickle(INSTRUMENTS_CACHE)
+
+    def instruments_current(self):
+        """True while the loaded master is today's (or a failed refresh is backing off)."""
+        if self.instruments is None: return False
+        return self.instruments_date == datetime.now().date() or time.monotonic() < self._instruments_retry_at
+
     def load_instruments(self):
-        """Download and parse NSE Equity instruments."""
-        if self.instruments is not None: return
+        """Load NSE instruments from the on-disk cache, refreshing it once a day (also when the server runs past midnight)."""
+        if self.instruments_current(): return
         
-        try:
-            print("Upstox: Downloading Instrument Master...")
-            # NSE Equity
-            url = "https://assets.upstox.com/market-quote/instruments/exchange/NSE.csv.gz"
-            response = requests.get(url)
-            
-            with gzip.open(io.BytesIO(response.content), 'rt') as f:
-                df = pd.read_csv(f)
-                
-            # Filter for Equity
+        with self._instruments_lock:
+            if self.instruments_current(): return
+            df = None
+            today = datetime.now().date()
+            fresh = True
+            if self.instruments_stale():
+                try:
+                    df = self.download_instruments()
+                except Exception as e:
+                    print(f"Upstox Instrument Download Failed: {e}")
+                    fresh = False
+                    self._instruments_retry_at = time.monotonic() + 900 # Keep the old master, retry in 15 min
+            if df is None and os.path.exists(INSTRUMENTS_CACHE):
+                try:
+                    df = self.read_instruments_cache() # Fresh cache, or yesterday's if the download failed
+                except Exception as e:
+                    print(f"Upstox Instrument Cache Corrupt: {e}")
+            if df is None:
+                print("Upstox Instrument Load Failed")
+                return
+
+            # First row wins, matching the old boolean-mask lookup
+            keys = {}
+            for sym, key in zip(df['tradingsymbol'], df['instrument_key']):
+                if isinstance(sym, str): keys.setdefault(sym, key)
+            self.instrument_keys = keys
             self.instruments = df
+            self.instruments_date = today if fresh else None
             print(f"Upstox: Loaded {len(df)} instruments")
-        except Exception as e:
-            print(f"Upstox Instrument Load Failed: {e}")
 
     def get_instrument_key(self, symbol):
         """Find instrument key for a symbol (e.g., RELIANCE -> NSE_EQ|INE002A01018)."""
-        if self.instruments is None:
-            self.load_instruments()
+        self.load_instruments() # No-op until the day rolls over
             
-        if self.instruments is None: return None
-        
-        # Search exact match
-        # Usually symbols in master are 'RELIANCE', 'TCS' etc.
-        # Check column names: usually 'tradingsymbol', 'instrument_key'
-        res = self.instruments[self.instruments['tradingsymbol'] == symbol.upper()]
-        if not res.empty:
-            return res.iloc[0]['instrument_key']
-        return None
+        return self.instrument_keys.get(symbol.upper())
 
     def get_historical_data(self, symbol, interval="1d", from_date=None, to_date=None):
         """
@@ -148,7 +214,7 @@ class UpstoxBroker:
         }
         
         try:
-            response = requests.get(url, headers=headers)
+            response = limiter.call("upstox", requests.get, url, headers=headers)
             data = response.json()
             
             if data.get("status") == "success" and data.get("data") and data.get("data").get("candles"):
@@ -0,0 +1,179 @@
+import os
+import threading
+import logging
+import numpy as np
+from datetime import datetime, timedelta
+
+logger = logging.getLogger("CandleStore")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CANDLE_DIR = os.path.join(BASE_DIR, "candle_store")
+
+# One row per trading day. Stored as a plain .npy so it can be memory-mapped.
+CANDLE_DTYPE = np.dtype([
+    ("date", "datetime64[D]"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "i8"),
+])
+
+MARKET_OPEN = (9, 15)
+MARKET_CLOSE = (15, 30)
+
+
+def is_market_open(now=None):
+    now = now or datetime.now()
+    if now.weekday() >= 5: return False
+    open_dt = now.replace(hour=MARKET_OPEN[0], minute=MARKET_OPEN[1], second=0, microsecond=0)
+    close_dt = now.replace(hour=MARKET_CLOSE[0], minute=MARKET_CLOSE[1], second=0, microsecond=0)
+    return open_dt <= now <= close_dt
+
+
+def last_session_close(now=None):
+    """Most recent weekday 15:30 that is not in the future."""
+    now = now or datetime.now()
+    close_dt = now.replace(hour=MARKET_CLOSE[0], minute=MARKET_CLOSE[1], second=0, microsecond=0)
+    if close_dt > now: close_dt -= timedelta(days=1)
+    while close_dt.weekday() >= 5:
+        close_dt -= timedelta(days=1)
+    return close_dt
+
+
+class CandleStore:
+    """
+    Local on-disk store of daily OHLCV candles, one memory-mapped .npy file per token.
+    History is fetched once; every later sync only asks the broker for the missing tail
+    (the last stored day, which may still be forming, plus any gap days up to now).
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = CandleStore()
+        return cls._instance
+
+    def __init__(self, root=CANDLE_DIR, history_days=5000):
+        self.root = root
+        self.history_days = history_days # Depth of the first (seed) fetch, enough for ATH
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, token, exchange):
+        return os.path.join(self.root, f"{exchange}_{token}.npy")
+
+    def _token_lock(self, token, exchange):
+        key = (exchange, str(token))
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _load(self, token, exchange):
+        """Memory-maps the token file. Caller must hold the token lock."""
+        path = self._path(token, exchange)
+        if not os.path.exists(path): return None
+        try:
+            return np.load(path, mmap_mode="r")
+        except Exception as e:
+            logger.error(f"Corrupt candle file {path}: {e}")
+            return None
+
+    @staticmethod
+    def to_array(candles):
+        """Angel/Upstox candle list -> sorted structured array (one row per day, last one wins)."""
+        if not candles: return np.empty(0, dtype=CANDLE_DTYPE)
+        arr = np.empty(len(candles), dtype=CANDLE_DTYPE)
+        arr["date"] = [str(c[0])[:10] for c in candles]
+        arr["open"] = [c[1] for c in candles]
+        arr["high"] = [c[2] for c in candles]
+        arr["low"] = [c[3] for c in candles]
+        arr["close"] = [c[4] for c in candles]
+        arr["volume"] = [c[5] for c in candles]
+        # Keep the last occurrence of each date (np.unique keeps the first, so reverse)
+        rev = arr[::-1]
+        _, idx = np.unique(rev["date"], return_index=True)
+        return rev[idx]
+
+    @staticmethod
+    def to_rows(arr):
+        """Structured array -> [[timestamp, open, high, low, close, volume], ...] (Angel format)."""
+        return [[f"{d}T00:00:00+05:30", o, h, l, c, v] for d, o, h, l, c, v in arr.tolist()]
+
+    def read(self, token, days=None, exchange="NSE"):
+        """Returns the last `days` stored candles as an in-memory array (or None)."""
+        with self._token_lock(token, exchange):
+            mm = self._load(token, exchange)
+            if mm is None or len(mm) == 0: return None
+            # Copy only the tail out of the map so the file handle is released
+            return np.array(mm[-days:] if days else mm)
+
+    def all_time_high(self, token, exchange="NSE"):
+        with self._token_lock(token, exchange):
+            mm = self._load(token, exchange)
+            if mm is None or len(mm) == 0: return 0
+            return float(mm["high"].max())
+
+    def append(self, token, candles, exchange="NSE"):
+        """
+        Merges freshly fetched candles into the store. The fetched range is authoritative:
+        stored rows inside it are replaced (today's candle keeps changing until the close).
+        """
+        new = self.to_array(candles)
+        if len(new) == 0: return
+        path = self._path(token, exchange)
+        with self._token_lock(token, exchange):
+            old = self._load(token, exchange)
+            if old is not None and len(old):
+                before = old[old["date"] < new["date"][0]]
+                after = old[old["date"] > new["date"][-1]]
+                merged = np.concatenate([before, new, after])
+            else:
+                merged = new
+            del old # Drop the map before replacing the file (required on Windows)
+
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, merged)
+            os.replace(tmp_path, path)
+
+    def needs_refresh(self, token, exchange="NSE", now=None):
+        """False when the store was written after the last close and the market is shut."""
+        now = now or datetime.now()
+        path = self._path(token, exchange)
+        if not os.path.exists(path): return True
+        if is_market_open(now): return True
+        written = datetime.fromtimestamp(os.path.getmtime(path))
+        return written < last_session_close(now)
+
+    def sync(self, token, fetch_func, days=400, exchange="NSE"):
+        """
+        Brings the token up to date and returns its last `days` candles as Angel-format rows.
+        fetch_func(from_dt, to_dt) -> list of candles (or None) for that date range.
+        On the first sync the full history is seeded; afterwards only the tail is fetched.
+        """
+        now = datetime.now()
+        stored = self.read(token, days=1, exchange=exchange)
+
+        if stored is None:
+            from_dt = now - timedelta(days=self.history_days)
+        elif self.needs_refresh(token, exchange, now):
+            # Re-fetch from the last stored day: it may have been a partial (intraday) candle
+            last_day = stored["date"][-1].item()
+            from_dt = datetime.combine(last_day, datetime.min.time())
+        else:
+            from_dt = None # Up to date, no request needed
+
+        if from_dt is not None:
+            candles = fetch_func(from_dt, now)
+            if candles:
+                self.append(token, candles, exchange)
+            elif stored is None:
+                return None
+
+        arr = self.read(token, days=days, exchange=exchange)
+        if arr is None: return None
+        return self.to_rows(arr)
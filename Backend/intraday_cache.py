@@ -0,0 +1,133 @@
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, time as dtime
+
+logger = logging.getLogger("IntradayCache")
+
+SESSION_START = dtime(9, 15)
+SESSION_END = dtime(15, 30)
+
+
+class IntradayCache:
+    """
+    Process-wide cache of intraday candles keyed by (token, interval, session date).
+    Finished sessions never change and are kept until evicted (LRU); today's session is
+    refreshed incrementally by fetching only the candles after the last cached one.
+    fetch_func(from_dt, to_dt) -> list of Angel-format candles (or None).
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = IntradayCache()
+        return cls._instance
+
+    def __init__(self, max_sessions=5000, refresh_seconds=60):
+        self.max_sessions = max_sessions
+        self.refresh_seconds = refresh_seconds # Min age before today's session is topped up
+        self._sessions = OrderedDict() # (token, interval, date) -> {"candles": [...], "fetched_at": datetime}
+        self._lock = threading.Lock()
+        self._fetch_locks = {} # (token, interval) -> Lock, so one thread fetches per token
+        self.hits = 0
+        self.misses = 0
+
+    def _fetch_lock(self, token, interval):
+        key = (str(token), interval)
+        with self._lock:
+            if key not in self._fetch_locks:
+                self._fetch_locks[key] = threading.Lock()
+            return self._fetch_locks[key]
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is not None:
+                self._sessions.move_to_end(key)
+            return entry
+
+    def _put(self, key, candles, fetched_at):
+        with self._lock:
+            self._sessions[key] = {"candles": candles, "fetched_at": fetched_at}
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def _is_fresh(self, entry, session_date, now):
+        if entry is None: return False
+        if session_date < now.date(): return True # Finished session
+        # Today: complete once fetched after the close, otherwise needs periodic top-up
+        close_dt = datetime.combine(session_date, SESSION_END)
+        if entry["fetched_at"] >= close_dt: return True
+        return (now - entry["fetched_at"]).total_seconds() < self.refresh_seconds
+
+    def get_sessions(self, token, interval, dates, fetch_func, now=None):
+        """Returns the candles of the given session dates (ascending), fetching what is missing."""
+        now = now or datetime.now()
+        # Today's session only exists once the market has opened
+        last_date = now.date() if now.time() >= SESSION_START else now.date() - timedelta(days=1)
+        dates = sorted(d for d in dates if d <= last_date)
+        if not dates: return []
+
+        with self._fetch_lock(token, interval):
+            entries = {d: self._get((str(token), interval, d)) for d in dates}
+            missing = [d for d in dates if entries[d] is None]
+            stale = [d for d in dates if entries[d] is not None and not self._is_fresh(entries[d], d, now)]
+
+            if missing:
+                # One request from the first missing session up to the last requested one
+                self.misses += 1
+                first, last = missing[0], max(missing[-1], stale[-1] if stale else missing[-1])
+                end_dt = min(datetime.combine(last, SESSION_END), now)
+                candles = fetch_func(datetime.combine(first, SESSION_START), end_dt)
+                # On a failed fetch nothing is cached, so the next call retries
+                by_date = {d: [] for d in dates if first <= d <= last} if candles is not None else {}
+                candles = candles or []
+                for c in candles:
+                    try: d = datetime.strptime(str(c[0])[:10], "%Y-%m-%d").date()
+                    except ValueError: continue
+                    if d in by_date: by_date[d].append(c)
+                for d, day_candles in by_date.items():
+                    # Holidays are cached as empty sessions so they are not re-requested
+                    entries[d] = {"candles": day_candles, "fetched_at": now}
+                    self._put((str(token), interval, d), day_candles, now)
+                if by_date: stale = [d for d in stale if d > last]
+
+            for d in stale:
+                # Incremental tail refresh: re-fetch from the last cached candle (it may be partial)
+                self.misses += 1
+                cached = entries[d]["candles"]
+                start_dt = datetime.combine(d, SESSION_START)
+                if cached:
+                    try: start_dt = datetime.strptime(str(cached[-1][0])[:16], "%Y-%m-%dT%H:%M")
+                    except ValueError: pass
+                tail = fetch_func(start_dt, min(datetime.combine(d, SESSION_END), now))
+                if tail:
+                    first_ts = str(tail[0][0])
+                    merged = [c for c in cached if str(c[0]) < first_ts] + tail
+                else:
+                    merged = cached
+                entries[d] = {"candles": merged, "fetched_at": now}
+                self._put((str(token), interval, d), merged, now)
+
+            if not missing and not stale: self.hits += 1
+
+        result = []
+        for d in dates:
+            if entries[d] is not None: result.extend(entries[d]["candles"])
+        return result
+
+    def get_session(self, token, interval, session_date, fetch_func, now=None):
+        return self.get_sessions(token, interval, [session_date], fetch_func, now=now)
+
+    def get_recent(self, token, interval, days, fetch_func, now=None):
+        """Candles of every weekday session in the last `days` calendar days (inclusive of today)."""
+        now = now or datetime.now()
+        start = (now - timedelta(days=days)).date()
+        dates = [start + timedelta(days=i) for i in range((now.date() - start).days + 1)]
+        return self.get_sessions(token, interval, [d for d in dates if d.weekday() < 5], fetch_func, now=now)
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,193 @@
+import bisect
+import math
+import threading
+from datetime import datetime
+
+PERIODS = ("1d", "2d", "10d", "30d", "50d", "100d", "52w")
+# Level type -> market_cache field. Highs are resistance (bullish), lows support (bearish).
+LEVEL_TYPES = {f"high_{p}": f"high_{p}" for p in PERIODS}
+LEVEL_TYPES["high_all"] = "prev_ath" # The row's high_all already includes today's high
+LEVEL_TYPES.update({f"low_{p}": f"low_{p}" for p in PERIODS})
+
+# Strategy trigger levels as multiples of prev_close, and whether they are crossed upwards
+TRIGGER_LEVELS = {
+    "LOM_SHORT": (1.005, True),
+    "LOM_LONG": (1.03, True),
+    "LOM_SHORT_BEAR": (0.995, False),
+    "REVERSAL": (0.98, False),
+}
+
+
+def is_high(level_type):
+    if level_type in TRIGGER_LEVELS: return TRIGGER_LEVELS[level_type][1]
+    return level_type.startswith("high_")
+
+
+def crossing_type(key, status):
+    """Tracker key ("1d", "all", "LOM_SHORT" ...) plus breakout status -> level type."""
+    if key in TRIGGER_LEVELS: return key
+    if key == "all": return "high_all"
+    return ("high_" if status == "Bullish Breakout" else "low_") + key
+
+
+class _RatioIndex:
+    """(level / price, symbol) pairs kept sorted for range queries by binary search."""
+
+    def __init__(self):
+        self.entries = []
+        self.ratios = {}
+
+    def set(self, symbol, ratio):
+        old = self.ratios.pop(symbol, None)
+        if old is not None:
+            del self.entries[bisect.bisect_left(self.entries, (old, symbol))]
+        if ratio is not None:
+            bisect.insort(self.entries, (ratio, symbol))
+            self.ratios[symbol] = ratio
+
+    def between(self, lo, hi, lo_open=False, hi_open=False):
+        """Entries with lo <(=) ratio <(=) hi, ascending."""
+        key = lambda e: e[0]
+        i = (bisect.bisect_right if lo_open else bisect.bisect_left)(self.entries, lo, key=key)
+        j = (bisect.bisect_left if hi_open else bisect.bisect_right)(self.entries, hi, key=key)
+        return self.entries[i:j]
+
+
+class LevelIndex:
+    """
+    Per-level-type sorted index of level/price ratios. A ratio just above 1 means the price
+    sits just below that level; below 1 means the price is through it. Ticks re-key the
+    symbol's ratios in O(log N) and report crossings; proximity/crossed queries are a bisect.
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = LevelIndex()
+        return cls._instance
+
+    def __init__(self):
+        self._index = {t: _RatioIndex() for t in list(LEVEL_TYPES) + list(TRIGGER_LEVELS)}
+        self._levels = {} # symbol -> {level_type: level}
+        self._ltp = {} # symbol -> last price
+        self.crossings = {} # symbol -> {level_type: (time, level, price)} first crossing of the day
+        self._lock = threading.Lock()
+
+    def set_levels(self, symbol, row):
+        """Loads a symbol's levels from a scanner row (levels only change once per scan)."""
+        levels = {}
+        for t, field in LEVEL_TYPES.items():
+            lvl = row.get(field)
+            if lvl and not (isinstance(lvl, float) and math.isnan(lvl)): levels[t] = lvl
+        prev_close = row.get('prev_close')
+        if prev_close and not (isinstance(prev_close, float) and math.isnan(prev_close)):
+            for t, (mult, _) in TRIGGER_LEVELS.items():
+                levels[t] = prev_close * mult
+        with self._lock:
+            self._levels[symbol] = levels
+            ltp = row.get('ltp') or self._ltp.get(symbol)
+            if ltp: self._ltp[symbol] = ltp
+            for t, idx in self._index.items():
+                lvl = levels.get(t)
+                idx.set(symbol, lvl / ltp if (lvl and ltp) else None)
+
+    def update(self, symbol, ltp, now=None, high=None, low=None):
+        """
+        Re-keys the symbol at a new price. `high`/`low` are the extremes of a coalesced tick
+        batch, so a level touched inside the batch still counts. Returns the crossings this
+        tick caused as [(level_type, level, "Bullish Breakout" | "Bearish Breakout")].
+        """
+        if not ltp: return []
+        crossed = []
+        with self._lock:
+            levels = self._levels.get(symbol)
+            if levels is None: return []
+            prev = self._ltp.get(symbol)
+            self._ltp[symbol] = ltp
+            hi = ltp if high is None else max(high, ltp)
+            lo = ltp if low is None else min(low, ltp)
+            for t, lvl in levels.items():
+                self._index[t].set(symbol, lvl / ltp)
+                if prev is None: continue
+                if is_high(t) and prev <= lvl < hi:
+                    crossed.append((t, lvl, "Bullish Breakout"))
+                elif not is_high(t) and prev >= lvl > lo:
+                    crossed.append((t, lvl, "Bearish Breakout"))
+            if crossed:
+                ts = (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+                sym_cross = self.crossings.setdefault(symbol, {})
+                for t, lvl, _ in crossed:
+                    # Keep the first crossing of the day (the breakout time)
+                    prev_cross = sym_cross.get(t)
+                    if prev_cross is None or prev_cross[0][:10] != ts[:10]:
+                        sym_cross[t] = (ts, lvl, ltp)
+        return crossed
+
+    def crossing_time(self, symbol, level_type, level=None, on_date=None):
+        """
+        Tick time ("YYYY-MM-DD HH:MM:SS") the level was first crossed on `on_date` (default today),
+        or None. With `level`, the stamped crossing must be of that level (a rescan may have moved it).
+        """
+        day = (on_date or datetime.now()).strftime("%Y-%m-%d")
+        with self._lock:
+            cross = self.crossings.get(symbol, {}).get(level_type)
+        if not cross or cross[0][:10] != day: return None
+        if level is not None and abs(cross[1] - level) > 1e-9 * max(1.0, abs(level)): return None
+        return cross[0]
+
+    def update_many(self, ticks, now=None):
+        """Batch of (symbol, ltp). Returns {symbol: crossings} for symbols that crossed."""
+        out = {}
+        for symbol, ltp in ticks:
+            c = self.update(symbol, ltp, now)
+            if c: out[symbol] = c
+        return out
+
+    def remove(self, symbol):
+        with self._lock:
+            for idx in self._index.values():
+                idx.set(symbol, None)
+            self._levels.pop(symbol, None)
+            self._ltp.pop(symbol, None)
+            self.crossings.pop(symbol, None)
+
+    def near(self, level_type, pct):
+        """
+        Symbols within `pct`% of the level without having crossed it (below a high, above a low),
+        closest first, as [(symbol, distance %, level)]. Distance is (level - ltp) / ltp like the scanner.
+        """
+        f = pct / 100.0
+        with self._lock:
+            idx = self._index[level_type]
+            if is_high(level_type):
+                hits = idx.between(1.0, 1.0 + f, lo_open=True)
+            else:
+                hits = idx.between(1.0 - f, 1.0, hi_open=True)[::-1]
+            return [(s, abs(r - 1.0) * 100, self._levels[s][level_type]) for r, s in hits]
+
+    def closest(self, level_types, pct, k):
+        """Across several level types: each symbol's nearest level within `pct`%, closest first."""
+        best = {}
+        for t in level_types:
+            for s, dist, lvl in self.near(t, pct):
+                if s not in best or dist < best[s][1]:
+                    best[s] = (t, dist, lvl)
+        ranked = sorted(best.items(), key=lambda x: x[1][1])[:k]
+        return [(s, t, dist, lvl) for s, (t, dist, lvl) in ranked]
+
+    def crossed(self, level_type, pct):
+        """Symbols through the level by at most `pct`% of the level, as [(symbol, beyond %, level)]."""
+        f = pct / 100.0
+        with self._lock:
+            idx = self._index[level_type]
+            if is_high(level_type):
+                # ltp > lvl and (ltp - lvl) / lvl <= f  <=>  1 / (1 + f) <= ratio < 1
+                hits = idx.between(1.0 / (1.0 + f), 1.0, hi_open=True)[::-1]
+            else:
+                hits = idx.between(1.0, 1.0 / (1.0 - f) if f < 1 else math.inf, lo_open=True)
+            return [(s, abs(1.0 / r - 1.0) * 100, self._levels[s][level_type]) for r, s in hits]
+
+    def stats(self):
+        with self._lock:
+            return {"symbols": len(self._levels), "entries": sum(len(i.entries) for i in self._index.values())}
@@ -0,0 +1,165 @@
+def _ema_step(prev, value, span):
+    """One pandas ewm(span, adjust=False) step, same arithmetic as the batch/pandas path."""
+    if prev is None: return value
+    alpha = 1. / (1. + (span - 1) / 2.0)
+    old_wt = 1. - alpha
+    if prev == value: return prev
+    return (old_wt * prev + alpha * value) / (old_wt + alpha)
+
+
+def _ema_series_last(values, span):
+    ema = None
+    for v in values:
+        ema = _ema_step(ema, v, span)
+    return ema
+
+
+def _breakout(max_h, min_l, day_h, day_l):
+    if max_h and day_h > max_h: return "Bullish Breakout"
+    if min_l and day_l < min_l: return "Bearish Breakout"
+    return "Consolidating"
+
+
+LEVEL_NAMES = ("1d", "2d", "10d", "30d", "50d", "100d", "52w")
+
+
+class IndicatorState:
+    """
+    Incremental per-symbol indicator state for live ticks.
+
+    Seeded from the same daily history calculate_metrics used; everything up to yesterday's
+    close is folded into EMA/RSI state once. A tick is then treated as a provisional close for
+    today's candle and every derived field (RSI, MACD, EMA trend, score, sentiment, breakouts,
+    LOM/contraction/sniper) is recomputed in O(1).
+    """
+
+    def __init__(self, hist_data, ath_val=0, metrics=None):
+        closes = [x[4] for x in hist_data]
+        prior = closes[:-1] # Committed closes (everything before today's candle)
+        today = hist_data[-1]
+        self.n = len(hist_data)
+
+        # EMA state as of yesterday's close
+        self.e12 = _ema_series_last(prior, 12)
+        self.e26 = _ema_series_last(prior, 26)
+        self.e20 = _ema_series_last(prior, 20)
+        self.e50 = _ema_series_last(prior, 50)
+        sig = None
+        e12 = e26 = None
+        for c in prior:
+            e12, e26 = _ema_step(e12, c, 12), _ema_step(e26, c, 26)
+            sig = _ema_step(sig, e12 - e26, 9)
+        self.sig = sig
+        self.h_prev = (self.e12 - self.e26) - self.sig # Yesterday's MACD histogram
+
+        # RSI: the 13 committed gains/losses that stay in the 14-period window
+        deltas = [0.0] + [closes[i] - closes[i - 1] for i in range(1, len(closes))]
+        window = deltas[-14:-1]
+        self.gain_13 = sum(d for d in window if d > 0)
+        self.loss_13 = sum(-d for d in window if d < 0)
+
+        self.c1, self.c2, self.c3, self.c4 = closes[-2], closes[-3], closes[-4], closes[-5]
+        self.change_1d = ((self.c1 - self.c2) / self.c2) * 100
+        self.change_2d = ((self.c2 - self.c3) / self.c3) * 100
+        self.change_3d = ((self.c3 - self.c4) / self.c4) * 100
+        self.prior_bulls = sum(1 for x in hist_data[-4:-1] if x[4] > x[1])
+
+        self.open = today[1]
+        self.day_h = today[2]
+        self.day_l = today[3]
+        self.volume = today[5]
+        vols = [x[5] for x in hist_data]
+        self.avg_vol_10 = sum(vols[-11:-1]) / 10 if len(vols) >= 11 else None
+        self.h10_prev = max([x[2] for x in hist_data[-11:-1]]) if len(hist_data) >= 12 else None
+        self.prev_ath = ath_val
+
+        # Prior-day breakout levels (unchanged intraday)
+        metrics = metrics or {}
+        self.levels = {k: (metrics.get(f"high_{k}"), metrics.get(f"low_{k}")) for k in LEVEL_NAMES}
+
+    def update(self, ltp, volume=None):
+        """Folds a tick in as today's provisional close; returns the refreshed market_cache fields."""
+        c0 = ltp
+        if c0 > self.day_h: self.day_h = c0
+        if c0 < self.day_l: self.day_l = c0
+        if volume: self.volume = volume
+
+        change_current = ((c0 - self.c1) / self.c1) * 100
+        avg_3d = (change_current + self.change_1d + self.change_2d + self.change_3d) / 4.0
+        dom_current = "Buyers" if c0 > self.open else "Sellers"
+        bulls = self.prior_bulls + (1 if dom_current == "Buyers" else 0)
+        avg_dom_3d = "Buyers" if bulls >= 3 else "Sellers" if bulls <= 1 else "Balance"
+
+        # RSI
+        d = c0 - self.c1
+        cur_rsi = 50
+        if self.n >= 14:
+            gain = (self.gain_13 + (d if d > 0 else 0)) / 14
+            loss = (self.loss_13 + (-d if d < 0 else 0)) / 14
+            if loss > 0: cur_rsi = 100 - (100 / (1 + gain / loss))
+            elif gain > 0: cur_rsi = 100.0
+
+        # MACD
+        e12 = _ema_step(self.e12, c0, 12)
+        e26 = _ema_step(self.e26, c0, 26)
+        macd = e12 - e26
+        sig = _ema_step(self.sig, macd, 9)
+        h_val = macd - sig
+        macd_sig = "Neutral"
+        if h_val > 0: macd_sig = "Bullish Growing" if h_val > self.h_prev else "Bullish Waning"
+        elif h_val < 0: macd_sig = "Bearish Growing" if h_val < self.h_prev else "Bearish Waning"
+
+        # Strength Score
+        ema20 = _ema_step(self.e20, c0, 20)
+        ema50 = _ema_step(self.e50, c0, 50)
+        h10_prev = self.h10_prev if self.h10_prev is not None else c0
+        trend_score = (20 if c0 > ema50 else 0) + (10 if c0 > ema20 else 0) + (10 if c0 > h10_prev else 0)
+        mom_score = 20 if 50 <= cur_rsi <= 70 else 10 if cur_rsi > 70 else 0
+        if macd > sig: mom_score += 10
+        if h_val > 0 and h_val > self.h_prev: mom_score += 10
+        avg_vol = self.avg_vol_10 if self.avg_vol_10 is not None else self.volume
+        vol_score = (10 if dom_current == "Buyers" else 0) + (10 if self.volume > avg_vol else 0)
+        score = trend_score + mom_score + vol_score
+
+        sentiment = "Neutral"
+        if score >= 80: sentiment = "STRONG BUY"
+        elif score >= 60: sentiment = "Bullish"
+        elif score <= 20: sentiment = "STRONG SELL"
+        elif score <= 40: sentiment = "Bearish"
+
+        new_ath = self.prev_ath
+        if c0 > new_ath: new_ath = c0
+        if self.day_h > new_ath: new_ath = self.day_h
+
+        lom_status = "None"
+        if 0.5 <= change_current <= 3.0: lom_status = "LOM_SHORT"
+        elif change_current > 3.0: lom_status = "LOM_LONG"
+        if -3.0 <= change_current <= -0.5:
+            if lom_status == "None": lom_status = "LOM_SHORT_BEAR"
+        elif change_current < -3.0:
+            if lom_status == "None": lom_status = "LOM_LONG_BEAR"
+
+        fields = {
+            "ltp": c0,
+            "change_pct": round(change_current, 2),
+            "change_current": round(change_current, 2),
+            "avg_3d": round(avg_3d, 2),
+            "dom_current": dom_current,
+            "avg_dom_3d": avg_dom_3d,
+            "rsi": round(cur_rsi, 2),
+            "macd_signal": macd_sig,
+            "strength_score": round(score, 1),
+            "sentiment": sentiment,
+            "lom": lom_status,
+            "is_contraction": abs(change_current) < 0.25 and score > 50,
+            "is_sniper": change_current < -2.0 and cur_rsi < 40,
+            "day_high": self.day_h,
+            "day_low": self.day_l,
+            "high_all": new_ath,
+            "breakout_all": "Bullish Breakout" if self.prev_ath > 0 and self.day_h >= self.prev_ath else "Consolidating",
+            "volume": self.volume,
+            "turnover": (c0 * self.volume) / 10000000,
+        }
+        for k, (max_h, min_l) in self.levels.items():
+            fields[f"breakout_{k}"] = _breakout(max_h, min_l, self.day_h, self.day_l)
+        return fields
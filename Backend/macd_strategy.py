@@ -1,40 +1,39 @@
-import pandas as pd
-import pandas_ta as ta
 import logging
 from datetime import datetime, time, timedelta
 
-class MACDStrategy:
+try:
+    from .strategy_engine import Strategy, register
+except ImportError:
+    from strategy_engine import Strategy, register
+
+MACD = ("macd", 12, 26, 9)
+
+@register
+class MACDStrategy(Strategy):
+    name = "macd"
+    timeframe = "5m"
+    min_rows = 50
+    indicators = (MACD,)
+
     def __init__(self):
         self.logger = logging.getLogger("MACDStrategy")
         # Time Window Constants
         self.START_TIME = time(12, 0)
         self.END_TIME = time(14, 25)
 
-    def perform_analysis(self, df: pd.DataFrame) -> dict:
+    def evaluate(self, frame) -> dict:
         """
-        Analyzes a single stock dataframe (5-Minute Timeframe) for MACD squeeze/buildup.
-        df requires: 'date' (datetime), 'close'
+        Analyzes a single stock (5-Minute Timeframe) for MACD squeeze/buildup.
+        frame: SymbolFrame over 'date', 'close' candles
         """
-        if df.empty or len(df) < 50:
-            return None
-
-        df = df.copy()
-        df['date'] = pd.to_datetime(df['date'])
-        
-        # 1. Calculate MACD (12, 26, 9) on ENTIRE dataframe first for accuracy
-        macd = ta.macd(df['close'], fast=12, slow=26, signal=9)
-        # Handle cases where MACD calculation fails (e.g. not enough data)
-        if macd is None or macd.empty:
+        # 1. MACD (12, 26, 9) on the ENTIRE frame first for accuracy (shared with other strategies)
+        macd = frame.indicator(MACD)
+        if macd is None:
             return None
-            
-        df['MACD'] = macd['MACD_12_26_9']
-        df['MACD_SIGNAL'] = macd['MACDs_12_26_9']
-        df['MACD_HIST'] = macd['MACDh_12_26_9']
+        macd_line = macd['MACD']
 
         # 2. Identify "Today" vs "Yesterday" (Trading Days)
-        # Get unique dates sorted
-        unique_dates = df['date'].dt.date.unique()
-        unique_dates.sort() # Ensure sorted
+        unique_dates = frame.sessions()
         
         if len(unique_dates) < 2:
             return None # Need at least 2 days of data
@@ -45,24 +44,17 @@ class MACDStrategy:
         
         # 3. Analyze "Today" Window (12:00 - 14:25)
         # Filter for today AND time window
-        mask_today = (df['date'].dt.date == today_date) & \
-                     (df['date'].dt.time >= self.START_TIME) & \
-                     (df['date'].dt.time <= self.END_TIME)
-                     
-        today_df = df[mask_today]
+        today_rows = frame.window(today_date, self.START_TIME, self.END_TIME)
         
-        if today_df.empty:
+        if today_rows.empty:
              return None
 
         # Get Start and End values for Today
         # Start: Closest to 12:00 (First row of window)
         # End: Current or 14:25 (Last row of window)
         
-        start_row = today_df.iloc[0]
-        end_row = today_df.iloc[-1]
-        
-        macd_start = start_row['MACD']
-        macd_end = end_row['MACD']
+        macd_start = macd_line.loc[today_rows[0]]
+        macd_end = macd_line.loc[today_rows[-1]]
         
         macd_change = abs(macd_end - macd_start)
         
@@ -71,15 +63,12 @@ class MACDStrategy:
             return None # Filter out
             
         # 4. Analyze "Yesterday" Window (Comparison)
-        mask_yest = (df['date'].dt.date == yesterday_date) & \
-                    (df['date'].dt.time >= self.START_TIME) & \
-                    (df['date'].dt.time <= self.END_TIME)
-        yest_df = df[mask_yest]
+        yest_rows = frame.window(yesterday_date, self.START_TIME, self.END_TIME)
         
         yest_macd_change = 0.0
-        if not yest_df.empty:
-             y_start = yest_df.iloc[0]['MACD']
-             y_end = yest_df.iloc[-1]['MACD']
+        if not yest_rows.empty:
+             y_start = macd_line.loc[yest_rows[0]]
+             y_end = macd_line.loc[yest_rows[-1]]
              yest_macd_change = abs(y_end - y_start)
              
         # 5. Determine State
@@ -102,5 +91,5 @@ class MACDStrategy:
             "yest_change": round(yest_macd_change, 3),
             "direction": direction,
             "status": status,
-            "ltp": end_row['close']
+            "ltp": frame.df['close'].loc[today_rows[-1]]
         }
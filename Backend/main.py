@@ -1,12 +1,13 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from SmartApi import SmartConnect
 import os
-import json
 import pyotp
 import pandas as pd
 import pandas_ta as ta # Ensure pandas_ta is available
+# Strategy modules register themselves with the Strategy Engine on import
 from swing_strategy import SwingStrategy
 from macd_strategy import MACDStrategy
 from bearish_macd_strategy import BearishMACDStrategy
@@ -16,6 +17,7 @@ from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import logging
 import threading
+import asyncio
 from SmartApi.smartWebSocketV2 import SmartWebSocketV2
 
 
@@ -24,10 +26,46 @@ try:
     from .tokens import NIFTY_50_TOKENS
     from .scrip_master import ScripMaster
     from .broker.upstox import UpstoxBroker
+    from .broker.angel_async import AngelAsyncClient
+    from .candle_store import CandleStore
+    from .intraday_cache import IntradayCache
+    from .rate_limiter import limiter, interactive, RateLimitedClient, SMARTAPI_ENDPOINTS
+    from . import metrics_engine
+    from .live_indicators import IndicatorState
+    from .market_snapshot import SnapshotPublisher, MEDIA_TYPES, encode
+    from .market_stream import MarketStream, StreamClient
+    from .market_views import PreMarketViews
+    from .level_index import LevelIndex, LEVEL_TYPES, crossing_type
+    from .option_chain_cache import OptionChainCache
+    from .news_cache import NewsCache
+    from .tracker_store import TrackerStore
+    from .market_state import MarketState
+    from .tick_pipeline import TickPipeline
+    from .bar_aggregator import BarAggregator, candles_frame
+    from .sharded_scanner import ShardedScanner
+    from .strategy_engine import StrategyEngine
 except ImportError:
     from tokens import NIFTY_50_TOKENS
     from scrip_master import ScripMaster
     from broker.upstox import UpstoxBroker
+    from broker.angel_async import AngelAsyncClient
+    from candle_store import CandleStore
+    from intraday_cache import IntradayCache
+    from rate_limiter import limiter, interactive, RateLimitedClient, SMARTAPI_ENDPOINTS
+    import metrics_engine
+    from live_indicators import IndicatorState
+    from market_snapshot import SnapshotPublisher, MEDIA_TYPES, encode
+    from market_stream import MarketStream, StreamClient
+    from market_views import PreMarketViews
+    from level_index import LevelIndex, LEVEL_TYPES, crossing_type
+    from option_chain_cache import OptionChainCache
+    from news_cache import NewsCache
+    from tracker_store import TrackerStore
+    from market_state import MarketState
+    from tick_pipeline import TickPipeline
+    from bar_aggregator import BarAggregator, candles_frame
+    from sharded_scanner import ShardedScanner
+    from strategy_engine import StrategyEngine
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
@@ -35,6 +73,7 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI()
 upstox_broker = UpstoxBroker()
+candle_store = CandleStore.get_instance() # Local Daily OHLCV History
 
 app.add_middleware(
     CORSMiddleware,
@@ -42,10 +81,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
-# Global SmartConnect Instance
-smartApi = SmartConnect(api_key=os.getenv("ANGEL_API_KEY"))
+# Global SmartConnect Instance (every call goes through the shared Rate Limiter)
+smart_connect = SmartConnect(api_key=os.getenv("ANGEL_API_KEY"))
+smartApi = RateLimitedClient(smart_connect, limiter, SMARTAPI_ENDPOINTS)
+# Async client for request handlers: same session, pooled keep-alive connections, same limiter
+angel_async = AngelAsyncClient(smart_connect, limiter)
+
+strategy_engine = StrategyEngine.get_instance() # Registered strategies over one shared frame per symbol
+
+# Opt-in multi-process scan (SCANNER_PROCESSES=<workers>); the scanner runs on threads otherwise
+scanner_processes = int(os.getenv("SCANNER_PROCESSES", "0") or 0)
+if scanner_processes > 1 and __name__ == "__main__":
+    # Spawned workers re-import the __main__ script, so under `python main.py` each one would
+    # redo this module's setup (broker session, Tracker Store, ...). Needs `uvicorn main:app`.
+    print("SCANNER_PROCESSES ignored: start the server with `uvicorn main:app` to use the process pool")
+    scanner_processes = 0
+sharded_scanner = ShardedScanner.get_instance(scanner_processes) if scanner_processes > 1 else None
 
 # Cache for session (simple global var)
 session_data = None
@@ -126,15 +180,20 @@ def login():
         logger.error(f"Login failed: {e}")
         return {"status": "error", "message": str(e)}
 
+async def ensure_session():
+    """Logs in (blocking SmartConnect call, off the event loop) if there is no session yet."""
+    if not session_data and not smartApi.access_token:
+        await run_in_threadpool(login)
+
 @app.get("/market-data/{symbol_token}")
-def get_market_data(symbol_token: str):
+@interactive
+async def get_market_data(symbol_token: str):
     """
     Fetch market data. 
     """
     try:
         # Check session
-        if not session_data and not smartApi.access_token:
-            login()
+        await ensure_session()
 
         # Mapping logic
         token_map = NIFTY_50_TOKENS # Use imported map
@@ -151,27 +210,27 @@ def get_market_data(symbol_token: str):
         else:
              tradingsymbol = f"{symbol_token.upper()}-EQ" 
 
-        data = smartApi.ltpData(exchange, tradingsymbol, token)
+        data = await angel_async.ltpData(exchange, tradingsymbol, token)
         return data
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 @app.get("/indices")
-def get_indices():
+@interactive
+async def get_indices():
     """
     Fetches live data for NIFTY and BANKNIFTY Indices.
     """
     try:
         # Check session
-        if not session_data and not smartApi.access_token:
-            login()
+        await ensure_session()
             
-        tokens = ["99926000", "99926009"] # Nifty, BankNifty
+        indices = {"99926000": "NIFTY", "99926009": "BANKNIFTY"}
         results = {}
         
-        for token in tokens:
-            name = "NIFTY" if token == "99926000" else "BANKNIFTY"
-            data = smartApi.ltpData("NSE", name, token)
+        # Both quotes in flight at once
+        responses = await asyncio.gather(*(angel_async.ltpData("NSE", name, token) for token, name in indices.items()))
+        for name, data in zip(indices.values(), responses):
             if data and data.get('data'):
                 results[name] = data['data']
                 
@@ -180,39 +239,122 @@ def get_indices():
         return {"status": "error", "message": str(e)}
 
 # --- Background Scanner ---
-market_cache = {}
+SCAN_CHUNK_SIZE = 50 # Symbols scored and published together while the rest are still syncing
+SCAN_CHUNK_SEC = 2.0 # ...or whatever has synced after this long
+
+def fetch_candles(token, interval, from_dt, to_dt, exchange="NSE"):
+    """Raw Angel One candle fetch. Returns the candle list, [] for no data, or None on failure."""
+    fmt = "%Y-%m-%d %H:%M"
+    try:
+        res = smartApi.getCandleData({
+            "exchange": exchange, "symboltoken": token, "interval": interval,
+            "fromdate": from_dt.strftime(fmt), "todate": to_dt.strftime(fmt)
+        })
+        if res and res.get('data'): return res['data']
+        if res and res.get('status'): return []
+    except Exception as e:
+        print(f"Candle Fetch Error {token}: {e}")
+    return None
+
+intraday_cache = IntradayCache.get_instance() # Shared 5-Minute Candles (Scanner + Strategies)
+market_state = MarketState.get_instance() # Copy-on-write market_cache: one writer lock, lock-free readers
 token_map_reverse = {} # Token -> Symbol
+indicator_states = {} # Symbol -> IndicatorState (seeded by the scanner, advanced by ticks)
+snapshot_publisher = SnapshotPublisher.get_instance() # Versioned /god-mode snapshots
+market_stream = MarketStream.get_instance() # SSE fan-out of live changes
+pre_market_views = PreMarketViews.get_instance() # Ranked views behind /api/pre-market
+level_index = LevelIndex.get_instance() # Sorted level/price ratios for proximity & crossings
+option_chain_cache = OptionChainCache.get_instance() # Short-TTL, single-flight option chains
+news_cache = NewsCache.get_instance() # Per-symbol news, stale-while-revalidate
+tracker_store = TrackerStore.get_instance() # SQLite (WAL) persistence, written off the scan thread
+# The legacy JSON files are imported once, then the store is the source of truth
+for _ns, _path in (("breakout", "breakout_tracker.json"), ("strategy", "strategy_tracker.json"), ("ath", "ath_cache.json")):
+    tracker_store.import_json(_ns, _path)
+
 breakout_tracker = {} # Symbol -> "HH:MM:SS"
 # Load Tracker Persistence
 try:
-    if os.path.exists("breakout_tracker.json"):
-        with open("breakout_tracker.json", "r") as f:
-            breakout_tracker = json.load(f)
-            print(f"Loaded Breakout Tracker: {len(breakout_tracker)} symbols")
+    breakout_tracker = tracker_store.load("breakout")
+    print(f"Loaded Breakout Tracker: {len(breakout_tracker)} symbols")
 except Exception as e:
     print(f"Failed to load tracker: {e}")
 
 strategy_tracker = {} # Symbol -> { "LOM_SHORT": "HH:MM", ... }
 try:
-    if os.path.exists("strategy_tracker.json"):
-        with open("strategy_tracker.json", "r") as f:
-            strategy_tracker = json.load(f)
-            print(f"Loaded Strategy Tracker: {len(strategy_tracker)} symbols")
+    strategy_tracker = tracker_store.load("strategy")
+    print(f"Loaded Strategy Tracker: {len(strategy_tracker)} symbols")
 except Exception as e:
     print(f"Failed to load strategy tracker: {e}")
 
 # Global ATH Cache
 ath_cache = {} # Symbol -> Price
 try:
-    if os.path.exists("ath_cache.json"):
-        with open("ath_cache.json", "r") as f:
-            ath_cache = json.load(f)
-            print(f"Loaded ATH Cache: {len(ath_cache)} symbols")
+    ath_cache = tracker_store.load("ath")
+    print(f"Loaded ATH Cache: {len(ath_cache)} symbols")
 except Exception as e:
     print(f"Failed to load ATH cache: {e}")
 
 is_scanner_running = False
 
+def apply_ticks(ticks):
+    """
+    Tick applier: one coalesced batch [(token, ltp, volume, high, low)] from the Tick Pipeline becomes
+    one market_state swap, then the per-symbol fan-out (snapshot, stream, views, levels).
+    """
+    view = market_state.view()
+    updates = {}
+    batch_range = {} # Symbol -> (high, low) of the batch
+    for tok, new_ltp, volume, high, low in ticks:
+        # Live 1m/5m bars (every subscribed token, in session)
+        bar_aggregator.on_tick(tok, new_ltp, volume, high, low)
+
+        # Find symbol
+        sym = token_map_reverse.get(tok)
+        row = view.get(sym) if sym else None
+        if row is None: continue
+        fields = {'ltp': new_ltp}
+        batch_range[sym] = (high, low)
+
+        # Live Indicators: fold the tick in as today's provisional close
+        state = indicator_states.get(sym)
+        if state:
+            # Fold in the batch's extremes first so the day range matches tick-by-tick
+            if high > new_ltp: state.update(high)
+            if low < new_ltp: state.update(low)
+            fields = state.update(new_ltp, volume)
+
+        # Real-Time Change Calculation
+        elif 'prev_close' in row:
+            pc = row['prev_close']
+            if pc > 0:
+                change = ((new_ltp - pc) / pc) * 100
+                fields['change_pct'] = round(change, 2)
+        updates[sym] = fields
+
+    # New row versions swapped in at once; readers holding the old view are unaffected
+    rows = market_state.apply(updates=updates)
+    for sym, row in rows.items():
+        snapshot_publisher.touch(sym)
+        market_stream.publish(sym, updates[sym])
+        pre_market_views.update(sym, row)
+        # Stamps the exact time of any level crossed in this batch (read back by find_time)
+        high, low = batch_range[sym]
+        level_index.update(sym, row['ltp'], high=high, low=low)
+
+tick_pipeline = TickPipeline.get_instance(apply_ticks) # WebSocket ticks -> ring buffer -> batched applier
+
+def backfill_session(token, interval, session_date):
+    """
+    The session's candles straight from REST, or None on failure so the Bar Aggregator retries.
+    (Not through the Intraday Cache: it returns a failed fetch as an empty session.)
+    """
+    start = datetime.combine(session_date, datetime.min.time()).replace(hour=9, minute=15)
+    end = min(start.replace(hour=15, minute=30), datetime.now())
+    return fetch_candles(token, interval, start, end)
+
+# Today's 1m/5m bars from ticks; only the bars before the first tick come from REST
+bar_aggregator = BarAggregator.get_instance(backfill_session)
+
 def start_websocket():
     global sws, session_data
     try:
@@ -226,26 +368,9 @@ def start_websocket():
         sws = SmartWebSocketV2(auth_token, api_key, client_code, feed_token)
         
         def on_data(wsapp, message):
-            # print("Ticks:", message)
+            # Socket thread only enqueues; the tick applier does the rest in batches
             if 'token' in message and 'last_traded_price' in message:
-                # print(f"WS Tick: {message['token']} -> {message['last_traded_price']}")
-                tok = message['token']
-                # Clean token (sometimes comes with quotes or extra chars?) - usually clean string
-                
-                # Find symbol
-                if tok in token_map_reverse:
-                    sym = token_map_reverse[tok]
-                    if sym in market_cache:
-                        new_ltp = message['last_traded_price'] / 100.0
-                        market_cache[sym]['ltp'] = new_ltp
-                        
-                        # Real-Time Change Calculation
-                        if 'prev_close' in market_cache[sym]:
-                            pc = market_cache[sym]['prev_close']
-                            if pc > 0:
-                                change = ((new_ltp - pc) / pc) * 100
-                                market_cache[sym]['change_pct'] = round(change, 2)
-                        pass
+                tick_pipeline.push(message['token'], message['last_traded_price'], message.get('volume_trade_for_the_day'))
 
         def on_open(wsapp):
             print("WebSocket: Connected")
@@ -258,6 +383,7 @@ def start_websocket():
         sws.on_error = on_error
         
         # Run WS in separate thread to avoid blocking scanner
+        tick_pipeline.start()
         t_ws = threading.Thread(target=sws.connect, daemon=True)
         t_ws.start()
         
@@ -268,17 +394,17 @@ def subscribe_to_tokens(tokens):
     global sws
     if sws:
         try:
-            # Mode 1: LTP Only (Fastest)
+            # Mode 2: QUOTE (LTP + day volume; the live 1m/5m bars need volume_trade_for_the_day)
             # ExchangeType 1: NSE
             token_list = [{"exchangeType": 1, "tokens": tokens}]
-            sws.subscribe("correlation_id", 1, token_list)
+            sws.subscribe("correlation_id", 2, token_list)
             print(f"WebSocket: Subscribed to {len(tokens)} tokens")
         except Exception as e:
             print("Subscribe Failed:", e)
 
 
 def background_scanner():
-    global is_scanner_running, market_cache
+    global is_scanner_running
     print("Scanner: Started")
     
 # --- METRICS CALCULATION (Global for Resume) ---
@@ -467,6 +593,52 @@ def calculate_metrics(symbol, token, hist_data, ath_val=0, time_finder_func=None
         if change_current < -2.0 and cur_rsi < 40:
             is_sniper = True
 
+        core = {
+            "c0": c0, "day_h": day_h, "day_l": day_l,
+            "change_current": change_current, "change_1d": change_1d,
+            "change_2d": change_2d, "change_3d": change_3d, "avg_3d": avg_3d,
+            "dom_current": dom_current, "dom_1d": dom_1d, "dom_2d": dom_2d, "dom_3d": dom_3d,
+            "avg_dom_3d": avg_dom_3d, "cur_rsi": cur_rsi, "macd_sig": macd_sig,
+            "score": score, "sentiment": sentiment,
+            "prev_ath": prev_ath, "new_ath": new_ath, "bo_all": bo_all,
+            "lom_status": lom_status, "is_contraction": is_contraction, "is_sniper": is_sniper,
+            "high_1d": h1, "low_1d": l1, "bo_1d": bo_1,
+            "high_2d": h2, "low_2d": l2, "bo_2d": bo_2,
+            "high_10d": h10, "low_10d": l10, "bo_10d": bo_10,
+            "high_30d": h30, "low_30d": l30, "bo_30d": bo_30,
+            "high_50d": h50, "low_50d": l50, "bo_50d": bo_50,
+            "high_100d": h100, "low_100d": l100, "bo_100d": bo_100,
+            "high_52w": h52w, "low_52w": l52w, "bo_52w": bo_52w,
+        }
+        return finalize_metrics(symbol, token, hist_data, core, time_finder_func)
+    except Exception as e:
+        print(f"Metrics Error {symbol}: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def finalize_metrics(symbol, token, hist_data, core, time_finder_func=None):
+    """
+    Breakout/strategy event times and the final row. Shared by calculate_metrics and
+    the vectorized batch engine, which both supply the same `core` indicator values.
+    """
+    try:
+        c0, day_h, day_l = core["c0"], core["day_h"], core["day_l"]
+        change_current, change_1d = core["change_current"], core["change_1d"]
+        change_2d, change_3d, avg_3d = core["change_2d"], core["change_3d"], core["avg_3d"]
+        dom_current, dom_1d, dom_2d, dom_3d = core["dom_current"], core["dom_1d"], core["dom_2d"], core["dom_3d"]
+        avg_dom_3d, cur_rsi, macd_sig = core["avg_dom_3d"], core["cur_rsi"], core["macd_sig"]
+        score, sentiment = core["score"], core["sentiment"]
+        prev_ath, new_ath, bo_all = core["prev_ath"], core["new_ath"], core["bo_all"]
+        lom_status, is_contraction, is_sniper = core["lom_status"], core["is_contraction"], core["is_sniper"]
+        h1, l1, bo_1 = core["high_1d"], core["low_1d"], core["bo_1d"]
+        h2, l2, bo_2 = core["high_2d"], core["low_2d"], core["bo_2d"]
+        h10, l10, bo_10 = core["high_10d"], core["low_10d"], core["bo_10d"]
+        h30, l30, bo_30 = core["high_30d"], core["low_30d"], core["bo_30d"]
+        h50, l50, bo_50 = core["high_50d"], core["low_50d"], core["bo_50d"]
+        h100, l100, bo_100 = core["high_100d"], core["low_100d"], core["bo_100d"]
+        h52w, l52w, bo_52w = core["high_52w"], core["low_52w"], core["bo_52w"]
+
         # Breakout Time Logic
         now = datetime.now()
         market_close = now.replace(hour=15, minute=30, second=0, microsecond=0)
@@ -500,6 +672,11 @@ def calculate_metrics(symbol, token, hist_data, ath_val=0, time_finder_func=None
                         else:
                             dt_obj = datetime.strptime(last_candle_time[:10], "%Y-%m-%d")
 
+                        # Exact time stamped by the tick path when the price crossed the level
+                        ticked = level_index.crossing_time(symbol, crossing_type(tf, status), level, dt_obj)
+                        if ticked: return ticked
+
+                        # Gap (no live tick through the level): rebuild it from 5m candles
                         is_bull = status == "Bullish Breakout"
                         found = time_finder_func(symbol, token, level, is_bull, date_obj=dt_obj)
                         if found: return found
@@ -607,6 +784,7 @@ def calculate_metrics(symbol, token, hist_data, ath_val=0, time_finder_func=None
             "high_52w": h52w, "low_52w": l52w,
             "breakout_all": bo_all,
             "high_all": new_ath,
+            "prev_ath": prev_ath, # ATH before today: the level a breakout_all crossed
             "day_high": day_h,
             "day_low": day_l,
             "volume": hist_data[-1][5],
@@ -621,12 +799,40 @@ def calculate_metrics(symbol, token, hist_data, ath_val=0, time_finder_func=None
         traceback.print_exc()
         return None
 
+def calculate_metrics_batch(items, days=None):
+    """
+    Vectorized calculate_metrics for many symbols at once.
+    items: list of (symbol, token, hist_data, ath_val, time_finder_func) tuples.
+    Returns one metrics dict (or None) per item, identical to calling calculate_metrics on each.
+    """
+    if not items: return []
+    try:
+        now = datetime.now()
+        usable = [i for i, it in enumerate(items) if len(it[2]) >= 5 and metrics_engine.is_fresh(it[2], now)]
+        results = [None] * len(items)
+        if not usable: return results
+
+        panel, lengths = metrics_engine.build_panel([items[i][2] for i in usable], days=days)
+        ath_vals = [items[i][3] for i in usable]
+        cores = metrics_engine.core_rows(metrics_engine.compute_panel(panel, lengths, ath_vals), ath_vals)
+    except Exception as e:
+        # A malformed history must not cost the whole scan: score symbol by symbol instead
+        print(f"Batch Metrics Error, falling back to per-symbol: {e}")
+        return [calculate_metrics(*it) for it in items]
+
+    for i, core in zip(usable, cores):
+        if core is None: continue
+        symbol, token, hist_data, _, time_finder_func = items[i]
+        results[i] = finalize_metrics(symbol, token, hist_data, core, time_finder_func)
+    return results
+
+
 # --- PRE-MARKET ENDPOINT ---
 @app.get("/api/pre-market")
 def get_pre_market_data():
     try:
-        data = list(market_cache.values())
-        if not data: return {"status": "empty", "message": "No data available"}
+        market_cache = market_state.view() # One consistent view for the whole response
+        if not market_cache: return {"status": "empty", "message": "No data available"}
         
         # Determine Market Status
         now = datetime.now()
@@ -636,77 +842,39 @@ def get_pre_market_data():
         elif (now.hour == 9 and now.minute >= 15) or (now.hour > 9 and now.hour < 15) or (now.hour == 15 and now.minute <= 30):
              market_status = "OPEN"
         
+        # Views are kept sorted as market_cache changes, so each list is a top-K read
+        def rows(symbols):
+            return [market_cache[s] for s in symbols if s in market_cache]
+
         # 1. Pre-Market Gainers/Losers (Based on Last Close)
-        # Sort by change_pct
-        sorted_change = sorted(data, key=lambda x: x.get('change_pct', 0), reverse=True)
-        top_gainers = sorted_change[:20]
-        top_losers = sorted_change[-20:][::-1] # Ascending
+        top_gainers = rows(pre_market_views.gainers(20))
+        top_losers = rows(pre_market_views.losers(20)) # Ascending
         
-        # 2. Breakout Watch (Near Levels)
+        # 2. Breakout Watch (within 0.5% below a 10d/30d/50d/100d/52w/ATH resistance), closest first
         watch_list = []
-        # Key levels to check
-        levels_map = {
-            "10d": "high_10d", "30d": "high_30d", "50d": "high_50d", 
-            "100d": "high_100d", "52w": "high_52w", "all": "high_all"
-        }
-        
-        for item in data:
-            ltp = item.get('ltp', 0)
-            if ltp == 0: continue
-            
-            # Check proximity to Resistance Levels (Bullish Watch)
-            # We can also check Support for Bearish, but usually "Breakout" = Resistance
-            closest_dist = 100
-            closest_lvl = None
-            closest_type = None
-            
-            for lbl, key in levels_map.items():
-                lvl = item.get(key)
-                if not lvl: continue
-                
-                # Check distance %
-                # (Level - LTP) / LTP
-                if lvl > ltp: # Approaching from below
-                    dist = ((lvl - ltp) / ltp) * 100
-                    if dist <= 0.5: # Within 0.5%
-                        if dist < closest_dist:
-                            closest_dist = dist
-                            closest_lvl = lvl
-                            closest_type = lbl
-            
-            if closest_type:
-                watch_list.append({
-                    "symbol": item['symbol'],
-                    "ltp": ltp,
-                    "breakout_type": closest_type,
-                    "breakout_level": closest_lvl,
-                    "distance_pct": round(closest_dist, 2),
-                    "change_pct": item.get('change_pct', 0)
-                })
-        
-        # Sort Watch List by distance (closest first)
-        watch_list.sort(key=lambda x: x['distance_pct'])
-        
-        # 3. Strength Bias (3D Avg)
-        # Group by Buyers/Sellers
-        # Items with avg_3d > 0.5 -> Buyers, < -0.5 -> Sellers
-        strength_buyers = [
-            x for x in data if x.get('avg_3d', 0) > 0.5
-        ]
-        strength_sellers = [
-            x for x in data if x.get('avg_3d', 0) < -0.5
-        ]
+        watch_levels = ["high_10d", "high_30d", "high_50d", "high_100d", "high_52w", "high_all"]
+        for sym, lvl_type, dist, lvl in level_index.closest(watch_levels, 0.5, 30):
+            item = market_cache.get(sym)
+            if not item: continue
+            watch_list.append({
+                "symbol": sym,
+                "ltp": item.get('ltp', 0),
+                "breakout_type": lvl_type.replace("high_", ""),
+                "breakout_level": lvl,
+                "distance_pct": round(dist, 2),
+                "change_pct": item.get('change_pct', 0)
+            })
         
-        # Sort by strength magnitude
-        strength_buyers.sort(key=lambda x: x.get('avg_3d', 0), reverse=True)
-        strength_sellers.sort(key=lambda x: x.get('avg_3d', 0)) # Most negative first
+        # 3. Strength Bias (3D Avg): avg_3d > 0.5 -> Buyers, < -0.5 -> Sellers, by magnitude
+        strength_buyers = rows(pre_market_views.strength_buyers(20))
+        strength_sellers = rows(pre_market_views.strength_sellers(20)) # Most negative first
         
         return {
             "gainers": top_gainers,
             "losers": top_losers,
-            "breakout_watch": watch_list[:30], # Top 30 closest
-            "strength_buyers": strength_buyers[:20],
-            "strength_sellers": strength_sellers[:20],
+            "breakout_watch": watch_list, # Top 30 closest
+            "strength_buyers": strength_buyers,
+            "strength_sellers": strength_sellers,
             "market_status": market_status
         }
         
@@ -714,10 +882,30 @@ def get_pre_market_data():
         print(f"Pre-Market Error: {e}")
         return {"error": str(e)}
 
+# --- LEVEL PROXIMITY / CROSSINGS ---
+@app.get("/levels/near")
+def get_levels_near(level: str = "high_52w", pct: float = 1.0, limit: int = 50):
+    """Symbols within pct% of a level (below a high / above a low), closest first."""
+    if level not in LEVEL_TYPES: return {"status": "error", "message": f"Unknown level {level}"}
+    hits = level_index.near(level, pct)[:limit]
+    return {"status": "success", "data": [{"symbol": s, "distance_pct": round(d, 2), "level": lvl} for s, d, lvl in hits]}
+
+@app.get("/levels/crossed")
+def get_levels_crossed(level: str = "high_52w", pct: float = 1.0, limit: int = 50):
+    """Symbols that just crossed a level (through it by at most pct%), with the tick time of the crossing."""
+    if level not in LEVEL_TYPES: return {"status": "error", "message": f"Unknown level {level}"}
+    hits = level_index.crossed(level, pct)[:limit]
+    data = []
+    for s, d, lvl in hits:
+        cross = level_index.crossings.get(s, {}).get(level)
+        data.append({"symbol": s, "beyond_pct": round(d, 2), "level": lvl, "crossed_at": cross[0] if cross else None})
+    return {"status": "success", "data": data}
+
 import time
 
 # --- SWING STRATEGY ENDPOINT ---
 @app.get("/strategies/swing")
+@interactive
 def get_swing_stocks():
     try:
         # 1. Get List of Stocks to Scan
@@ -728,7 +916,6 @@ def get_swing_stocks():
             return {"status": "error", "message": "Scrip Master not ready"}
             
         results = []
-        strategy = SwingStrategy()
         
         count = 0
         # LIMIT TO 30 STOCKS FOR DEMO/MVP TO AVOID TIMEOUT & RATE LIMITS
@@ -741,11 +928,8 @@ def get_swing_stocks():
             symbol = item['symbol']
             token = item['token']
             
-            # Fetch Daily Data
+            # Fetch Daily Data (paced by the shared Rate Limiter)
             try:
-                # Add delay to avoid Rate Limit (3 req/sec rule of thumb)
-                time.sleep(0.4) 
-                
                 # Calculate from/to dates for last ~100 days
                 to_date = datetime.now()
                 from_date = to_date - timedelta(days=150)
@@ -764,7 +948,7 @@ def get_swing_stocks():
                     c_data = data['data']
                     df = pd.DataFrame(c_data, columns=['date', 'open', 'high', 'low', 'close', 'volume'])
                     
-                    analysis = strategy.perform_analysis(df)
+                    analysis = strategy_engine.run(df, "1d").get(SwingStrategy.name)
                     
                     if analysis:
                         res_obj = {
@@ -819,40 +1003,29 @@ def search_stocks(q: str, exchange: str = "NSE"):
         if not sm.df is not None:
             sm.load_data()
             
-        df = sm.df
-        q = q.upper()
-        
-        # Filter: NSE or BSE
-        # Relaxed logic: Search in Name OR Symbol.
+        # Ranked exact > prefix > substring over name and symbol (NSE, BSE, ...)
         # Removed strict '-EQ' check to allow SME (SM, ST) and other series (BE).
-        mask = (df['exch_seg'] == exchange) & (
-            (df['name'].str.contains(q, na=False)) | (df['symbol'].str.contains(q, na=False))
-        )
-        
-        # For NSE, we might still want to prioritize EQ/BE over others if needed, but for now just show all.
-        # Maybe exclude indices if they are in 'NSE' segment (usually they are in 'NSE-IND' or similar but here exch_seg is 'NSE')
-        
-        results = df[mask].head(20)[['name', 'token', 'symbol']].to_dict(orient='records')
+        results = sm.search(q, exchange, limit=20)
         return {"status": "success", "data": results}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 @app.get("/analyze/{exchange}/{symbol}/{token}")
-def analyze_stock(exchange: str, symbol: str, token: str):
+@interactive
+async def analyze_stock(exchange: str, symbol: str, token: str):
     """
     On-Demand Analysis for any stock
     """
     try:
         # Check session
-        if not session_data and not smartApi.access_token:
-            login()
+        await ensure_session()
             
         # Fetch History
         to_date = datetime.now()
         from_date = to_date - timedelta(days=400) # Enough for year high/low
         fmt = "%Y-%m-%d %H:%M"
         
-        res = smartApi.getCandleData({
+        res = await angel_async.getCandleData({
             "exchange": exchange, "symboltoken": token, "interval": "ONE_DAY",
             "fromdate": from_date.strftime(fmt), "todate": to_date.strftime(fmt)
         })
@@ -865,7 +1038,8 @@ def analyze_stock(exchange: str, symbol: str, token: str):
              # Let's stick to 400 days for speed (approx 1.5 year).
              # NOTE: calculate_metrics expects 'ath_val' to be from cache. We pass 0 if unknown.
              
-             metrics = calculate_metrics(symbol, token, hist_data, ath_val=0) # No time finder for speed
+             # CPU-bound pandas work runs on the threadpool so the event loop keeps serving
+             metrics = await run_in_threadpool(calculate_metrics, symbol, token, hist_data, ath_val=0) # No time finder for speed
              return {"status": "success", "data": metrics}
              
         else:
@@ -875,49 +1049,27 @@ def analyze_stock(exchange: str, symbol: str, token: str):
         return {"status": "error", "message": str(e)}
 
 @app.get("/news/{symbol}")
-def get_stock_news(symbol: str):
+async def get_stock_news(symbol: str):
     try:
-        import requests
-        import xml.etree.ElementTree as ET
-        
         # Clean symbol (remove -EQ if present)
         clean_sym = symbol.replace("-EQ", "").replace("_EQ", "")
-        
-        # Google News RSS URL
-        url = f"https://news.google.com/rss/search?q={clean_sym}+stock+news+india&hl=en-IN&gl=IN&ceid=IN:en"
-        
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        
-        root = ET.fromstring(response.content)
-        
-        news_items = []
-        # Parse items
-        for item in root.findall(".//item"):
-            title = item.find("title").text if item.find("title") is not None else "No Title"
-            link = item.find("link").text if item.find("link") is not None else "#"
-            pubDate = item.find("pubDate").text if item.find("pubDate") is not None else ""
-            source = item.find("source").text if item.find("source") is not None else "Google News"
-            
-            # Simple deduplication or cleaning if needed
-            news_items.append({
-                "title": title,
-                "link": link,
-                "date": pubDate,
-                "source": source
-            })
-            
-            if len(news_items) >= 5: break
-            
+
+        # Cached per symbol (TTL + stale-while-revalidate), concurrent requests share one fetch
+        news_items = await news_cache.get(clean_sym)
         return {"status": "success", "data": news_items}
         
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@app.get("/news-cache")
+def get_news_cache():
+    """Hit/stale/miss counters of the news cache."""
+    return {"status": "success", "data": news_cache.stats()}
+
 
 
 def background_scanner():
-    global is_scanner_running, market_cache
+    global is_scanner_running
     print("Scanner: Started")
     
             # Define Processing Logic Internal to Scanner (or move global)
@@ -947,6 +1099,7 @@ def background_scanner():
                 # If Stale, remove
                 if is_stale:
                     del breakout_tracker[sym][tf]
+                    tracker_store.delete("breakout", sym, tf)
                     changed = True
                     cleaned_bo += 1
             
@@ -965,18 +1118,14 @@ def background_scanner():
                 
                 if is_stale:
                     del strategy_tracker[sym][strat]
+                    tracker_store.delete("strategy", sym, strat)
                     cleaned_strat += 1
             
             if not strategy_tracker[sym]:
                 del strategy_tracker[sym]
 
         print(f"Scanner: Removed {cleaned_bo} stale breakouts and {cleaned_strat} stale strategies.")
-        
-        # Save immediately
-        try:
-            with open("breakout_tracker.json", "w") as f: json.dump(breakout_tracker, f)
-            with open("strategy_tracker.json", "w") as f: json.dump(strategy_tracker, f)
-        except: pass
+        # Deletions are queued on the Tracker Store and committed by its writer thread
 
     # Execute Cleanup Once
     clean_stale_data()
@@ -997,30 +1146,11 @@ def background_scanner():
             if not targets:
                 import time; time.sleep(10); continue
 
-            to_date = datetime.now()
-            # Dynamic From Date based on ATH Cache
-            # We determine this INSIDE process_item per stock to be safe, 
-            # but `process_item` runs in threads. 
-            # We can read `ath_cache` safely.
-            
             fmt = "%Y-%m-%d %H:%M"
             
-            def process_item(item):
-                import time; time.sleep(0.5) # Throttle to < 2 req/sec
-                sym, tok = item['symbol'], item['token']
-                
-                # Check if we need Deep History
-                # Access global ath_cache (Thread-safe for READ)
-                has_ath = sym in ath_cache
-                
-                # If we have ATH, we only need 400 days.
-                # If we DON'T have ATH, we need 5000 days (approx 15 years).
-                days_needed = 400 if has_ath else 5000
-                
-                item_from_date = to_date - timedelta(days=days_needed)
-                
-                # Helper to get Intraday Data for Precise Time (Rate Limited, Buffered)
-                # Cache at function scope to avoid redundant calls for same stock
+            def make_time_finder():
+                """Precise intraday breakout time lookup for one symbol (5m candles fetched once, on first use)."""
+                # Candles come from the shared Intraday Cache (also used by the MACD scans)
                 intraday_candles_cache = None
                 
                 def get_intraday_breakout_time(symbol, token, level, is_bullish, date_obj=None):
@@ -1028,30 +1158,17 @@ def background_scanner():
                     try:
                         # 1. Fetch if not cached
                         if intraday_candles_cache is None:
-                            # Determine Date Range from passed date_obj or Now
-                            if date_obj is None: target_date = datetime.now()
-                            else: target_date = date_obj
-                            
-                            start_time = target_date.replace(hour=9, minute=15, second=0, microsecond=0)
-                            end_time = target_date.replace(hour=15, minute=30, second=0, microsecond=0)
-                            if target_date.date() == datetime.now().date() and datetime.now() < end_time:
-                                 end_time = datetime.now()
-
-                            start_str = start_time.strftime("%Y-%m-%d %H:%M")
-                            end_str = end_time.strftime("%Y-%m-%d %H:%M")
-
-                            print(f"DEBUG: Intraday Fetch {symbol} [Token:{token}] range {start_str} to {end_str}")
-                            res = smartApi.getCandleData({
-                                "exchange": "NSE", "symboltoken": token, "interval": "FIVE_MINUTE",
-                                "fromdate": start_str, "todate": end_str
-                            })
-                            
-                            if res and res.get('data'):
-                                intraday_candles_cache = res['data']
-                                print(f"DEBUG: Cached {len(intraday_candles_cache)} candles for {symbol}")
-                            else:
-                                intraday_candles_cache = [] # Empty list to prevent refetch
-                                print(f"DEBUG: No Intraday Data for {symbol}")
+                            # Determine Session from passed date_obj or Now
+                            target_date = datetime.now() if date_obj is None else date_obj
+                            # Today's session: bars built from ticks (no REST call once live)
+                            if target_date.date() == datetime.now().date():
+                                intraday_candles_cache = bar_aggregator.bars(token, "5m")
+                            if intraday_candles_cache is None:
+                                intraday_candles_cache = intraday_cache.get_session(
+                                    token, "FIVE_MINUTE", target_date.date(),
+                                    lambda f, t: fetch_candles(token, "FIVE_MINUTE", f, t)
+                                )
+                            print(f"DEBUG: {len(intraday_candles_cache)} intraday candles for {symbol}")
 
                         # 2. Search in Cache
                         if not intraday_candles_cache: return None
@@ -1110,56 +1227,82 @@ def background_scanner():
                         print(f"Intraday Cache Error {symbol}: {e}")
                         return None
 
-                # Retry Logic with Failover (Upstox Primary)
+                return get_intraday_breakout_time
+
+            def scan_sharded(items):
+                """Process-pool path: the same (loaded, batch_results) as the thread pool + calculate_metrics_batch."""
+                session = {**angel_async.session(), "upstox_token": upstox_broker.access_token}
+                shard_items = [(x['symbol'], x['token'], ath_cache.get(x['symbol'], 0), x['symbol'] in ath_cache) for x in items]
+                loaded, results = [], []
+                for sym, tok, core, current_ath, new_ath_found in sharded_scanner.scan(shard_items, session):
+                    # Workers already synced the store: this is a local read, no broker call
+                    arr = candle_store.read(tok, days=400)
+                    if arr is None: continue
+                    recent_data = candle_store.to_rows(arr)
+                    time_finder = make_time_finder()
+                    loaded.append((sym, tok, recent_data, current_ath, time_finder, new_ath_found))
+                    results.append(finalize_metrics(sym, tok, recent_data, core, time_finder))
+                return loaded, results
+
+            def process_item(item):
+                """Syncs the symbol's daily candles. Returns the inputs for calculate_metrics_batch."""
+                # Pacing is handled by the shared Rate Limiter (background lane)
+                sym, tok = item['symbol'], item['token']
+                
+                # Check if we need the ATH from Deep History
+                # Access global ath_cache (Thread-safe for READ)
+                has_ath = sym in ath_cache
+                
+                get_intraday_breakout_time = make_time_finder()
+
+                # Daily Candle Fetch with Failover (Upstox Primary)
+                # Only called for the missing tail of the local Candle Store
+                def fetch_daily(from_dt, to_dt):
+                    # 1. Try Upstox (Primary)
+                    try:
+                        # Only if we have a token (otherwise quick fail)
+                        if upstox_broker.access_token:
+                            up_data = upstox_broker.get_historical_data(
+                                sym, "1d", from_date=from_dt.strftime("%Y-%m-%d"), to_date=to_dt.strftime("%Y-%m-%d")
+                            )
+                            if up_data: return up_data
+                    except Exception as e:
+                        print(f"Upstox Error {sym}: {e}")
+
+                    # 2. Failover to Angel One (Secondary)
+                    try:
+                        res = smartApi.getCandleData({
+                            "exchange": "NSE", "symboltoken": tok, "interval": "ONE_DAY",
+                            "fromdate": from_dt.strftime(fmt), "todate": to_dt.strftime(fmt)
+                        })
+                        if res and res.get('data'): return res['data']
+                    except Exception as e:
+                        print(f"Angel Error {sym}: {e}")
+                        if "rate" in str(e).lower(): raise
+                    return None
+
+                # Retry Logic
                 for i in range(3):
                     try:
-                        res = None
-                        
-                        # 1. Try Upstox (Primary)
-                        try:
-                            # Only if we have a token (otherwise quick fail)
-                            if upstox_broker.access_token:
-                                    res = {'data': up_data}
-                        except Exception as e:
-                            print(f"Upstox Error {sym}: {e}")
-
-                        # 2. Failover to Angel One (Secondary)
-                        if not res or not res.get('data'):
-                            try:
-                                res = smartApi.getCandleData({
-                                    "exchange": "NSE", "symboltoken": tok, "interval": "ONE_DAY",
-                                    "fromdate": item_from_date.strftime(fmt), "todate": to_date.strftime(fmt)
-                                })
-                            except Exception as e:
-                                print(f"Angel Error {sym}: {e}")
-
-                        if res and res.get('data'):
-                            full_data = res['data']
-                            
+                        # Local store returns the last 400 days (enough for 52w levels),
+                        # fetching only today's candle and any gap days from the broker
+                        recent_data = candle_store.sync(tok, fetch_daily, days=400)
+
+                        if recent_data:
                             # Logic:
-                            # 1. Calculate ATH from full_data if needed
+                            # 1. Calculate ATH from the stored history if needed
                             current_ath = ath_cache.get(sym, 0)
                             new_ath_found = 0
                             
                             if not has_ath:
-                                # Calculate max from the 5000 days
-                                # data structure: [timestamp, open, high, low, close, vol]
-                                max_h = max([x[2] for x in full_data], default=0)
+                                # Store is seeded with ~15 years on first sync
+                                max_h = candle_store.all_time_high(tok)
                                 if max_h > current_ath:
                                     current_ath = max_h
                                     new_ath_found = max_h
                             
-                            # 2. Slice data to 400 days for metrics (Optimization)
-                            # We don't want to process 5000 candles in metrics
-                            # Take last 400
-                            recent_data = full_data[-400:] if len(full_data) > 400 else full_data
-                            
-                            metrics = calculate_metrics(sym, tok, recent_data, ath_val=current_ath, time_finder_func=get_intraday_breakout_time)
-                            
-                            if metrics:
-                                if new_ath_found > 0:
-                                    metrics['update_ath'] = new_ath_found
-                                return metrics
+                            # Metrics are computed for the whole universe in one batch (see below)
+                            return (sym, tok, recent_data, current_ath, get_intraday_breakout_time, new_ath_found)
                         
                         if i == 2: return None
                         import time; time.sleep(0.5)
@@ -1175,14 +1318,18 @@ def background_scanner():
             start_time = time.time()
             
             # Tracker Updates
-            tracker_needs_save = False
-            ath_needs_save = False
-
-            # Reduced workers to prevent rate limiting
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as ex:
-                futures = {ex.submit(process_item, item): item for item in targets}
-                for f in concurrent.futures.as_completed(futures):
-                    res = f.result()
+
+            def publish_chunk(loaded, batch_results):
+                """Merges scored rows into the trackers and caches, then publishes them."""
+                for x, res in zip(loaded, batch_results):
+                    if res and x[5] > 0: res['update_ath'] = x[5]
+                    if res:
+                        # Re-seed the live indicator state from the fresh candles
+                        try: indicator_states[res['symbol']] = IndicatorState(x[2], x[3], res)
+                        except Exception as e: print(f"Live Indicator Seed Error {res['symbol']}: {e}")
+
+                scanned = {} # Symbol -> fresh row, swapped into market_state in one batch
+                for res in batch_results:
                     if res: 
                         # 1. Update Persistent Breakout Tracker (Thread-Safe in Main Thread)
                         sym = res['symbol']
@@ -1194,7 +1341,7 @@ def background_scanner():
                             # Only set if not already set (Keep the FIRST breakout time of the day/session)
                             if tf not in breakout_tracker[sym]:
                                 breakout_tracker[sym][tf] = time_str
-                                tracker_needs_save = True
+                                tracker_store.set("breakout", sym, tf, time_str)
                         
                         # Populate response with ALL persisted breakout times
                         res['breakout_times'] = breakout_tracker[sym]
@@ -1206,7 +1353,7 @@ def background_scanner():
                         lom = res.get('lom')
                         if lom and lom != "None" and lom not in strategy_tracker[sym]:
                              strategy_tracker[sym][lom] = res['scan_full_time']
-                             tracker_needs_save = True # Reuse same save flag or add new one? reused is fine if we save both
+                             tracker_store.set("strategy", sym, lom, res['scan_full_time'])
                         
                         # Support Bearish LOM tracking
                         if "LOM_SHORT_BEAR" in strategy_tracker[sym]: res['lom_short_bear_time'] = strategy_tracker[sym]["LOM_SHORT_BEAR"]
@@ -1215,25 +1362,26 @@ def background_scanner():
                         # Check Contraction
                         if res.get('is_contraction') and "CONTRACTION" not in strategy_tracker[sym]:
                              strategy_tracker[sym]["CONTRACTION"] = res['scan_full_time']
-                             tracker_needs_save = True
+                             tracker_store.set("strategy", sym, "CONTRACTION", res['scan_full_time'])
 
                         # Check Sniper
                         if res.get('is_sniper') and "SNIPER" not in strategy_tracker[sym]:
                              strategy_tracker[sym]["SNIPER"] = res['scan_full_time']
-                             tracker_needs_save = True
+                             tracker_store.set("strategy", sym, "SNIPER", res['scan_full_time'])
 
                         # Check REVERSAL (Day H/L Reversal / Deep Red)
                         # Page definition: change_pct < -2
                         if res.get('change_pct') and res['change_pct'] < -2.0 and "REVERSAL" not in strategy_tracker[sym]:
                              strategy_tracker[sym]["REVERSAL"] = res['scan_full_time']
-                             tracker_needs_save = True
+                             tracker_store.set("strategy", sym, "REVERSAL", res['scan_full_time'])
 
                         res['strategy_times'] = strategy_tracker[sym]
 
                         # 2. Update Cache
-                        market_cache[sym] = res
-                        market_cache[sym] = res
+                        scanned[sym] = res
                         token_map_reverse[res['token']] = sym
+                        pre_market_views.update(sym, res)
+                        level_index.set_levels(sym, res)
                         
                         # A. Precise Hits (from Intraday Scan in calculate_metrics)
                         hits = res.get('strategy_hits', {})
@@ -1243,36 +1391,49 @@ def background_scanner():
                              curr_val = strategy_tracker.get(sym, {}).get(s_name)
                              if not curr_val or " " in str(curr_val):
                                   strategy_tracker[sym][s_name] = s_time
-                                  tracker_needs_save = True
+                                  tracker_store.set("strategy", sym, s_name, s_time)
 
                         # 3. Update ATH Cache
                         if res.get('update_ath'):
                              new_val = res['update_ath']
                              if new_val > ath_cache.get(sym, 0):
                                  ath_cache[sym] = new_val
-                                 ath_needs_save = True
-
-            # Save Tracker if Changed (Breakout)
-            if tracker_needs_save:
-                try:
-                    with open("breakout_tracker.json", "w") as f:
-                        json.dump(breakout_tracker, f)
-                    
-                    with open("strategy_tracker.json", "w") as f:
-                        json.dump(strategy_tracker, f)
-                        
-                    print("Persistence: Saved trackers")
-                except Exception as e:
-                    print(f"Persistence Error: {e}")
-
-            # Save ATH Cache if Changed
-            if ath_needs_save:
-                try:
-                    with open("ath_cache.json", "w") as f:
-                        json.dump(ath_cache, f)
-                    print(f"Persistence: Saved ATH Cache ({len(ath_cache)} items)")
-                except Exception as e:
-                    print(f"ATH Persistence Error: {e}")
+                                 tracker_store.set_ath(sym, new_val)
+
+                # Published rows are never modified afterwards, so they get their own tracker dicts
+                for sym, res in scanned.items():
+                    res['breakout_times'] = dict(breakout_tracker.get(sym, {}))
+                    res['strategy_times'] = dict(strategy_tracker.get(sym, {}))
+                market_state.set_rows(scanned)
+
+                # Publish the new /god-mode snapshot (only changed rows get a new version)
+                market_cache = market_state.view()
+                prev_version = snapshot_publisher.current(market_cache).version
+                snap = snapshot_publisher.publish(market_cache, god_mode_meta())
+                for row in snap.changed_rows(prev_version):
+                    market_stream.publish(row['symbol'], row)
+
+            # Request rate is enforced by the shared Rate Limiter, not the worker count
+            with concurrent.futures.ThreadPoolExecutor(max_workers=4) as ex:
+                if sharded_scanner:
+                    # Shards are synced and scored in worker processes, read back from shared memory
+                    publish_chunk(*scan_sharded(targets))
+                else:
+                    # Score and publish as candle syncs complete, so early symbols don't wait for the slowest
+                    futures = [ex.submit(process_item, item) for item in targets]
+                    pending, last_flush = [], time.time()
+                    for f in concurrent.futures.as_completed(futures):
+                        r = f.result()
+                        if r: pending.append(r)
+                        if pending and (len(pending) >= SCAN_CHUNK_SIZE or time.time() - last_flush >= SCAN_CHUNK_SEC):
+                            # Vectorized Metrics over the chunk's (symbols x days) panel
+                            publish_chunk(pending, calculate_metrics_batch([x[:5] for x in pending]))
+                            pending, last_flush = [], time.time()
+                    if pending:
+                        publish_chunk(pending, calculate_metrics_batch([x[:5] for x in pending]))
+            market_cache = market_state.view()
+
+            # Tracker/ATH changes were queued on the Tracker Store; its writer thread commits them
             
             # Subscribe WS to new tokens
             if sws:
@@ -1280,7 +1441,7 @@ def background_scanner():
                 subscribe_to_tokens(tokens)
             
             elapsed = time.time() - start_time
-            print(f"Scanner: Updated {len(market_cache)} stocks in {elapsed:.2f} seconds. CacheID: {id(market_cache)}")
+            print(f"Scanner: Updated {len(market_cache)} stocks in {elapsed:.2f} seconds. CacheID: {id(market_state)}")
             import time; time.sleep(15) # 15s Hybrid Interval (WS handles real-time)
             
         except Exception as e:
@@ -1288,24 +1449,90 @@ def background_scanner():
             import time; time.sleep(30)
 
 
+@app.get("/rate-limits")
+def get_rate_limits():
+    """Queue depth, wait times and concurrency per broker endpoint class."""
+    return {"status": "success", "data": limiter.stats()}
+
+@app.get("/strategies/engine")
+def get_strategy_engine():
+    """Registered strategies with the indicators they declare, plus run/error counters."""
+    return {"status": "success", "data": strategy_engine.stats()}
+
+@app.get("/scanner/shards")
+def get_scanner_shards():
+    """Process-pool scanner stats (SCANNER_PROCESSES mode)."""
+    if not sharded_scanner: return {"status": "disabled", "data": None}
+    return {"status": "success", "data": sharded_scanner.stats()}
+
+@app.get("/options-chain-cache")
+def get_options_chain_cache():
+    """Hit/miss/shared counters of the option chain cache."""
+    return {"status": "success", "data": option_chain_cache.stats()}
+
+def god_mode_meta():
+    return {
+        "scanner_status": "Running" if is_scanner_running else "Stopped",
+        "debug_cache_id": id(market_state),
+        "debug_cache_len": len(market_state)
+    }
+
 @app.get("/god-mode")
-def god_mode():
+def god_mode(request: Request, since: int = None, format: str = "rows", fields: str = None, encoding: str = "json"):
     """
     Returns data from the Background Scanner INSTANTLY.
+    Serves the pre-sorted snapshot published by the scanner: If-None-Match -> 304 when
+    nothing changed, ?since=<version> -> only rows changed after that version.
+    ?format=columnar sends one array per field, ?fields=a,b projects, ?encoding=msgpack|arrow.
     """
-    data = list(market_cache.values())
-    print(f"API Request: Cache Size = {len(market_cache)}")
-    # Sort
-    sorted_data = sorted(data, key=lambda x: x['strength_score'], reverse=True)
-    
-    return {
-        "status": "success", 
-        "data": sorted_data, 
-        "count": len(sorted_data),
-        "scanner_status": "Running" if is_scanner_running else "Stopped",
-        "debug_cache_id": id(market_cache),
-        "debug_cache_len": len(market_cache)
-    }
+    snap = snapshot_publisher.current(market_state.view(), god_mode_meta())
+    headers = {"ETag": snap.etag, "Cache-Control": "no-cache"}
+
+    if request.headers.get("if-none-match") == snap.etag:
+        return Response(status_code=304, headers=headers)
+
+    wanted = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        body = snap.render(since=since if since is not None and since <= snap.version else None,
+                           layout=format, fields=wanted, encoding=encoding)
+    except ValueError as e:
+        return Response(content=encode({"status": "error", "message": str(e)}), status_code=406, media_type="application/json")
+    return Response(content=body, media_type=MEDIA_TYPES[encoding], headers=headers)
+
+@app.get("/stream/market")
+async def stream_market(request: Request, symbols: str = None, window_ms: int = 250):
+    """
+    Server-Sent Events feed of market_cache: one `snapshot` event, then `diff` events of
+    {symbol: changed fields}, coalesced over `window_ms`. `symbols` is a comma-separated filter.
+    """
+    wanted = [x.strip().upper() for x in symbols.split(",") if x.strip()] if symbols else None
+    client = StreamClient(asyncio.get_running_loop(), wanted, window_ms)
+    snap = snapshot_publisher.current(market_state.view(), god_mode_meta())
+    return StreamingResponse(
+        market_stream.events(client, request, snap.rows, snap.version),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/ticks/stats")
+def tick_stats():
+    """Tick pipeline throughput, queue lag and drops."""
+    return {"status": "success", "data": tick_pipeline.stats()}
+
+@app.get("/bars/{token}")
+def get_bars(token: str, interval: str = "5m"):
+    """Today's live 1m/5m bars for a streaming token."""
+    if interval not in ("1m", "5m"):
+        return {"status": "error", "message": "interval must be 1m or 5m"}
+    bars = bar_aggregator.bars(token, interval)
+    if bars is None:
+        return {"status": "error", "message": "No live bars for this token"}
+    return {"status": "success", "data": bars, "stats": bar_aggregator.stats()}
+
+@app.get("/stream/stats")
+def stream_stats():
+    """Connected stream clients and how many updates were coalesced."""
+    return {"status": "success", "data": market_stream.stats()}
 
 @app.on_event("startup")
 def startup_event():
@@ -1327,6 +1554,32 @@ def startup_event():
     except Exception as e:
         logger.error(f"Failed to init ScripMaster: {e}")
 
+@app.on_event("startup")
+async def start_news_prefetch():
+    # Keep news for the current top movers warm
+    news_cache.start_prefetcher(lambda: pre_market_views.gainers(10) + pre_market_views.losers(10))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Close pooled HTTP connections
+    await angel_async.aclose()
+    await news_cache.aclose()
+    if sharded_scanner: sharded_scanner.close()
+
+def get_recent_intraday(token, days=5):
+    """
+    Last `days` of 5-Minute candles. Finished sessions come from the shared Intraday Cache;
+    today's, when the token is streaming, from the Bar Aggregator instead of REST.
+    """
+    fetch = lambda f, t: fetch_candles(token, "FIVE_MINUTE", f, t)
+    live = bar_aggregator.bars(token, "5m")
+    if live is None:
+        return intraday_cache.get_recent(token, "FIVE_MINUTE", days, fetch)
+    today = datetime.now().date()
+    start = today - timedelta(days=days)
+    prior = [start + timedelta(days=i) for i in range((today - start).days)]
+    return intraday_cache.get_sessions(token, "FIVE_MINUTE", [d for d in prior if d.weekday() < 5], fetch) + live
+
 def run_strategy_scanner():
     """Background thread to update Strategy Caches"""
     global swing_cache, macd_cache, bearish_cache, last_scan_time
@@ -1340,64 +1593,37 @@ def run_strategy_scanner():
                 time.sleep(5)
                 continue
                 
-            # 1. MACD (Bullish) Scan
+            # One pass: each symbol's 5m frame is built once and every intraday strategy
+            # (MACD, Bearish MACD ...) runs on its shared indicators
             temp_macd = []
-            macd_strat = MACDStrategy()
-            
-            def scan_macd(item):
-                to_date = datetime.now()
-                from_date = to_date - timedelta(days=5)
+            temp_bearish = []
+
+            def scan_intraday(item):
                 try:
-                    res = smartApi.getCandleData({
-                        "exchange": "NSE", "symboltoken": item['token'], "interval": "FIVE_MINUTE",
-                        "fromdate": from_date.strftime("%Y-%m-%d %H:%M"), "todate": to_date.strftime("%Y-%m-%d %H:%M")
-                    })
-                    if res and res.get('data'):
-                        df = pd.DataFrame(res['data'], columns=['date', 'open', 'high', 'low', 'close', 'volume'])
-                        analysis = macd_strat.perform_analysis(df)
-                        if analysis: return { "symbol": item['symbol'], "token": item['token'], **analysis }
-                except: pass
-                return None
+                    candles = get_recent_intraday(item['token'])
+                    if candles:
+                        return item, strategy_engine.run(candles_frame(candles), "5m")
+                except Exception as e:
+                    print(f"Strategy Scan Error {item['symbol']}: {e}")
+                return item, {}
 
             with ThreadPoolExecutor(max_workers=4) as ex:
-                futures = {ex.submit(scan_macd, x): x for x in fno_list}
+                futures = [ex.submit(scan_intraday, x) for x in fno_list]
                 for f in as_completed(futures):
-                    r = f.result()
-                    if r: temp_macd.append(r)
-            
+                    item, hits = f.result()
+                    for name, bucket in ((MACDStrategy.name, temp_macd), (BearishMACDStrategy.name, temp_bearish)):
+                        analysis = hits.get(name)
+                        if analysis: bucket.append({ "symbol": item['symbol'], "token": item['token'], **analysis })
+
+            now_str = datetime.now().strftime("%H:%M:%S")
             temp_macd.sort(key=lambda x: x['macd_change'])
             macd_cache = temp_macd
-            last_scan_time["macd"] = datetime.now().strftime("%H:%M:%S")
+            last_scan_time["macd"] = now_str
             print(f"Strategy Scanner: Updated MACD ({len(macd_cache)} items)")
-            
-            # 2. Bearish MACD Scan
-            temp_bearish = []
-            bear_strat = BearishMACDStrategy()
-            
-            def scan_bearish(item):
-                to_date = datetime.now()
-                from_date = to_date - timedelta(days=5)
-                try:
-                    res = smartApi.getCandleData({
-                        "exchange": "NSE", "symboltoken": item['token'], "interval": "FIVE_MINUTE",
-                        "fromdate": from_date.strftime("%Y-%m-%d %H:%M"), "todate": to_date.strftime("%Y-%m-%d %H:%M")
-                    })
-                    if res and res.get('data'):
-                        df = pd.DataFrame(res['data'], columns=['date', 'open', 'high', 'low', 'close', 'volume'])
-                        analysis = bear_strat.perform_analysis(df)
-                        if analysis: return { "symbol": item['symbol'], "token": item['token'], **analysis }
-                except: pass
-                return None
 
-            with ThreadPoolExecutor(max_workers=4) as ex:
-                futures = {ex.submit(scan_bearish, x): x for x in fno_list}
-                for f in as_completed(futures):
-                    r = f.result()
-                    if r: temp_bearish.append(r)
-            
             temp_bearish.sort(key=lambda x: x['macd_change']) # Most negative first usually
             bearish_cache = temp_bearish
-            last_scan_time["bearish"] = datetime.now().strftime("%H:%M:%S")
+            last_scan_time["bearish"] = now_str
             print(f"Strategy Scanner: Updated Bearish MACD ({len(bearish_cache)} items)")
             
             # Sleep 2 Minutes
@@ -1407,10 +1633,59 @@ def run_strategy_scanner():
             print(f"Strategy Scanner Error: {e}")
             time.sleep(30)
 
+async def build_options_chain(symbol, token, expiry, width=5, center=None):
+    """
+    Spot quote, then every CE/PE quote of the strike window in batched getMarketData calls
+    (up to 50 tokens each): two broker calls per chain.
+    """
+    spot = await angel_async.getQuotes("LTP", {"NSE": [token]})
+    if not spot:
+        raise ValueError("Could not fetch spot price")
+    ltp = spot[0]['ltp']
+
+    # 2. Strike window around ATM (or `center` for far-from-the-money views), by binary search
+    from scrip_master import ScripMaster
+    sm = ScripMaster.get_instance()
+    expiry, rows = sm.get_option_chain(symbol.upper(), expiry, center if center is not None else ltp, width)
+    if not rows:
+        raise ValueError("No option contracts found for this expiry")
+    atm = rows[0]['strike']
+    for r in rows:
+        if abs(r['strike'] - ltp) < abs(atm - ltp): atm = r['strike']
+
+    # 3. Fetch Live Feeds (one batched quote call; paced by the shared Rate Limiter)
+    tokens = [t for r in rows for t in (r['ce_token'], r['pe_token']) if t]
+    fetched = await angel_async.getQuotes("LTP", {"NFO": tokens})
+    quotes = {str(q['symbolToken']): q['ltp'] for q in fetched}
+
+    chain_data = []
+    for r in rows:
+        strike = r['strike']
+        chain_data.append({
+            "strike": strike,
+            "type": "ATM" if strike == atm else ("ITM" if strike < atm else "OTM"),
+            "ce_ltp": quotes.get(r['ce_token'], 0),
+            "pe_ltp": quotes.get(r['pe_token'], 0),
+            "ce_token": r['ce_token'],
+            "pe_token": r['pe_token'],
+            "lot_size": r['lot_size']
+        })
+
+    return {
+        "status": "success",
+        "symbol": symbol,
+        "spot_price": ltp,
+        "expiry": expiry.strftime("%d%b%y").upper(),
+        "expiries": [d.strftime("%d%b%y").upper() for d in sm.get_expiries(symbol.upper())],
+        "chain": chain_data
+    }
+
 @app.get("/options-chain/{symbol}")
-def get_options_chain(symbol: str):
+@interactive
+async def get_options_chain(symbol: str, expiry: str = None, width: int = 5, center: float = None):
     """
     Returns a REAL Options Chain using Scrip Master lookup.
+    expiry: e.g. "26DEC24" (default: nearest), width: strikes either side, center: strike to center on (default: spot).
     """
     try:
         # 1. Get Spot Price
@@ -1424,84 +1699,17 @@ def get_options_chain(symbol: str):
              if not token:
                  return {"status": "error", "message": "Symbol not found"}
 
-        data = get_market_data(symbol) 
-        if not data or not data.get('data'):
-             return {"status": "error", "message": "Could not fetch spot price"}
-             
-        ltp = data['data']['ltp']
-        
-        # 2. Calculate ATM & Strikes
-        step = 50 if symbol.upper() in ["NIFTY", "NIFTY 50", "NIFTY50"] else (100 if "BANK" in symbol.upper() else (ltp * 0.01))
-        step = int(step) if step > 10 else 1.0
-        # Round to nearest step
-        atm = round(ltp / step) * step
-        
-        target_strikes = []
-        for i in range(-5, 6):
-            target_strikes.append(atm + (i * step))
-            
-        # 3. Lookup Real Tokens
+        # Resolve the expiry from the calendar (nearest upcoming when not given)
         from scrip_master import ScripMaster
         sm = ScripMaster.get_instance()
-        
-        # Auto-detect expiry (Hardcoded for Demo - Current Monthly 26 DEC 24)
-        # In a real app, this logic calculates the next Thursday
-        expiry_str = "26DEC24" 
-        
-        is_index = symbol.upper() in ["NIFTY", "BANKNIFTY", "NIFTY 50"]
-        
-        tokens_map = sm.get_fno_tokens_for_chain(symbol.upper(), expiry_str, target_strikes, is_index)
-        
-        # 4. Fetch Live Feeds (Parallelized)
-        import concurrent.futures
-        
-        def fetch_option_row(strike):
-            ce_token = tokens_map.get(f"{int(strike)}_CE")
-            pe_token = tokens_map.get(f"{int(strike)}_PE")
-            
-            ce_ltp, pe_ltp = 0, 0
-            
-            # CE
-            if ce_token:
-                try:
-                    res = smartApi.ltpData("NFO", f"{symbol}{expiry_str}{int(strike)}CE", ce_token)
-                    if res and res.get('data'): ce_ltp = res['data']['ltp']
-                except: pass
-                
-            # PE
-            if pe_token:
-                try:
-                    res = smartApi.ltpData("NFO", f"{symbol}{expiry_str}{int(strike)}PE", pe_token)
-                    if res and res.get('data'): pe_ltp = res['data']['ltp']
-                except: pass
-                
-            return {
-                "strike": strike,
-                "type": "ATM" if strike == atm else ("ITM" if strike < atm else "OTM"),
-                "ce_ltp": ce_ltp,
-                "pe_ltp": pe_ltp,
-                "ce_token": ce_token,
-                "pe_token": pe_token
-            }
-
-        chain_data = []
-        # 2. Parallel Processing
-        results = []
-        # Increased workers for ~200 stocks. Be careful of rate limits (3/sec is standard, but Angel often allows more)
-        # 20 workers ~ 20 concurrent requests.
-        with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-            chain_data = list(executor.map(fetch_option_row, target_strikes))
-            
-        # Ensure sorted
-        chain_data.sort(key=lambda x: x['strike'])
-
-        return {
-            "status": "success",
-            "symbol": symbol,
-            "spot_price": ltp,
-            "expiry": expiry_str,
-            "chain": chain_data
-        }
+        chain_expiry, _ = sm.get_option_chain(symbol.upper(), expiry)
+        if chain_expiry is None:
+            return {"status": "error", "message": "No option expiry found"}
+        width = min(max(width, 1), 50)
+
+        # Viewers of the same chain share one build (and its result for a couple of seconds)
+        return await option_chain_cache.get((symbol.upper(), chain_expiry, width, center),
+                                            lambda: build_options_chain(symbol, token, chain_expiry, width, center))
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
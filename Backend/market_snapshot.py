@@ -0,0 +1,225 @@
+import json
+import time
+import threading
+import logging
+
+try:
+    import orjson # Optional: fast JSON (native numpy support)
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack # Optional: ?encoding=msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa # Optional: ?encoding=arrow (Arrow IPC stream)
+except ImportError:
+    pa = None
+
+logger = logging.getLogger("MarketSnapshot")
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def _json_default(obj):
+    # numpy scalars (np.bool_, np.int64 ...) coming out of the metrics engine
+    if hasattr(obj, "item"): return obj.item()
+    return str(obj)
+
+
+# Stamped on every scan; a row whose only difference is these is not re-published
+VOLATILE_KEYS = ("scan_time", "scan_full_time")
+
+
+def _copy_row(row):
+    # Nested dicts (breakout_times, strategy_times) are shared with the trackers, copy them too
+    return {k: (dict(v) if isinstance(v, dict) else v) for k, v in row.items()}
+
+
+def _same(published, row):
+    if published is None or len(published) != len(row): return False
+    for k, v in row.items():
+        if k in VOLATILE_KEYS: continue
+        if k not in published or published[k] != v: return False
+    return True
+
+
+def encode(payload):
+    if orjson:
+        return orjson.dumps(payload, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+def _arrow_column(values):
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        # Mixed types: fall back to strings (None stays null)
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def serialize(payload, encoding="json"):
+    """Encodes a response payload; columnar payloads can also go out as an Arrow IPC stream."""
+    if encoding == "json":
+        return encode(payload)
+    if encoding == "msgpack":
+        if msgpack is None: raise ValueError("msgpack is not installed")
+        return msgpack.packb(payload, default=_json_default, use_bin_type=True)
+    if encoding == "arrow":
+        if pa is None: raise ValueError("pyarrow is not installed")
+        columns = payload.get("columns")
+        if columns is None: raise ValueError("arrow encoding needs format=columnar")
+        meta = {k: v for k, v in payload.items() if k != "columns"}
+        table = pa.table({f: _arrow_column(vals) for f, vals in columns.items()})
+        table = table.replace_schema_metadata({"meta": encode(meta)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    raise ValueError(f"Unknown encoding {encoding}")
+
+
+def columns_of(rows, fields=None):
+    """Rows -> (field names, {field: [values]}), each key sent once instead of once per row."""
+    if fields is None:
+        names = {}
+        for r in rows:
+            for k in r: names[k] = None
+        fields = list(names)
+    return fields, {f: [r.get(f) for r in rows] for f in fields}
+
+
+class Snapshot:
+    """Immutable, pre-sorted view of market_cache at one version."""
+
+    def __init__(self, version, rows, row_versions, removed, meta):
+        self.version = version
+        self.rows = rows # Tuple of row dicts, sorted by strength_score (desc)
+        self.row_versions = row_versions # symbol -> version the row last changed at
+        self.removed = removed # symbol -> version it was dropped at
+        self.meta = meta
+        self.etag = f'W/"{version}"'
+        self.order = [r['symbol'] for r in rows]
+        self._bodies = {} # (format, fields, encoding) -> encoded full response
+
+    def changed_rows(self, since):
+        return [r for r in self.rows if self.row_versions.get(r['symbol'], 0) > since]
+
+    def render(self, since=None, layout="rows", fields=None, encoding="json"):
+        """
+        Encoded response. layout "rows" is a list of dicts, "columnar" is one array per field;
+        `fields` projects to a subset. With `since`, only rows changed after that version are
+        included, plus the current order and removed symbols. Full responses are encoded once
+        per snapshot and shared by every poller.
+        """
+        fields = tuple(fields) if fields else None
+        key = (layout, fields, encoding)
+        if since is None and key in self._bodies: return self._bodies[key]
+
+        rows = self.rows if since is None else self.changed_rows(since)
+        payload = dict(self.meta, status="success", version=self.version, count=len(self.rows))
+        if since is not None:
+            payload.update(since=since, delta=True, order=self.order,
+                           removed=[s for s, v in self.removed.items() if v > since])
+        if layout == "columnar":
+            names, columns = columns_of(rows, list(fields) if fields else None)
+            payload.update(format="columnar", fields=names, columns=columns)
+        else:
+            payload["data"] = list(rows) if fields is None else [{f: r.get(f) for f in fields} for r in rows]
+
+        body = serialize(payload, encoding)
+        if since is None: self._bodies[key] = body
+        return body
+
+
+class SnapshotPublisher:
+    """
+    Publishes versioned snapshots of market_cache. The scanner publishes after every cycle;
+    ticks only mark their symbol dirty and are folded in on the next read, so a snapshot is
+    rebuilt (and re-sorted) only when something actually changed.
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = SnapshotPublisher()
+        return cls._instance
+
+    def __init__(self):
+        # Versions start at the wall clock so a client's `since` from before a restart is always older
+        self._version = int(time.time() * 1000)
+        self._published = {} # symbol -> row copy as last published
+        self._row_versions = {}
+        self._removed = {}
+        self._dirty = set()
+        self._dirty_lock = threading.Lock() # Tick thread vs readers; never held while publishing
+        self._lock = threading.Lock()
+        self._snapshot = Snapshot(self._version, (), {}, {}, {})
+
+    def touch(self, symbol):
+        """Marks a symbol whose row changed in place (WebSocket tick)."""
+        with self._dirty_lock:
+            self._dirty.add(symbol)
+
+    def _take_dirty(self):
+        # Hand-off: later touches go to a fresh set, so the taken one is never mutated
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    def publish(self, cache, meta=None, symbols=None):
+        """
+        Diffs `cache` (all symbols, or only `symbols`) against the last snapshot and
+        publishes a new one if any row changed. Returns the current snapshot.
+        """
+        with self._lock:
+            if symbols is None:
+                self._take_dirty()
+                check = list(cache.keys())
+                gone = [s for s in self._published if s not in cache]
+            else:
+                check = [s for s in symbols if s in cache]
+                gone = [s for s in symbols if s not in cache and s in self._published]
+
+            changed = False
+            for sym in check:
+                row = cache.get(sym)
+                if row is None: continue
+                if not _same(self._published.get(sym), row):
+                    if not changed:
+                        self._version += 1
+                        changed = True
+                    self._published[sym] = _copy_row(row)
+                    self._row_versions[sym] = self._version
+                    self._removed.pop(sym, None)
+            for sym in gone:
+                if not changed:
+                    self._version += 1
+                    changed = True
+                self._published.pop(sym, None)
+                self._row_versions.pop(sym, None)
+                self._removed[sym] = self._version
+
+            meta = meta if meta is not None else self._snapshot.meta
+            if changed or meta != self._snapshot.meta:
+                if not changed: self._version += 1
+                rows = tuple(sorted(self._published.values(), key=lambda x: x['strength_score'], reverse=True))
+                self._snapshot = Snapshot(self._version, rows, dict(self._row_versions), dict(self._removed), meta)
+            return self._snapshot
+
+    def current(self, cache, meta=None):
+        """Latest snapshot, folding in symbols touched by ticks since the last publish."""
+        if self._dirty:
+            dirty = self._take_dirty()
+            if dirty: return self.publish(cache, meta=meta, symbols=dirty)
+        if meta is not None and meta != self._snapshot.meta:
+            return self.publish(cache, meta=meta, symbols=())
+        return self._snapshot
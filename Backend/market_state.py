@@ -0,0 +1,68 @@
+import threading
+import types
+
+
+class MarketState:
+    """
+    Copy-on-write container for market_cache (symbol -> row dict). Writers (scanner,
+    WebSocket) go through one lock and never mutate a published row or mapping: each
+    change builds new row dicts and swaps in a new read-only mapping. Readers just take
+    view(), a consistent point-in-time snapshot, without locking or blocking ingestion.
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = MarketState()
+        return cls._instance
+
+    def __init__(self):
+        self._rows = {}
+        self._view = types.MappingProxyType(self._rows)
+        self._write_lock = threading.Lock()
+        self.version = 0 # Bumped on every swap
+
+    def view(self):
+        """Read-only mapping of every row as of now. Rows in it are never modified later."""
+        return self._view
+
+    def get(self, symbol, default=None):
+        return self._view.get(symbol, default)
+
+    def __len__(self):
+        return len(self._view)
+
+    def _swap(self, rows):
+        # Single reference assignment: readers see the old or the new mapping, never a mix
+        self._rows = rows
+        self._view = types.MappingProxyType(rows)
+        self.version += 1
+
+    def apply(self, updates=None, rows=None, remove=()):
+        """
+        One atomic batch: `updates` {symbol: fields} merged into existing rows (unknown symbols
+        are skipped), `rows` {symbol: row} replacing whole rows, `remove` dropping symbols.
+        Returns {symbol: new row} for every row written.
+        """
+        written = {}
+        with self._write_lock:
+            new = dict(self._rows)
+            for sym, row in (rows or {}).items():
+                new[sym] = written[sym] = row
+            for sym, fields in (updates or {}).items():
+                old = new.get(sym)
+                if old is None: continue
+                new[sym] = written[sym] = {**old, **fields}
+            for sym in remove:
+                new.pop(sym, None)
+            self._swap(new)
+        return written
+
+    def update(self, symbol, fields):
+        """Merges fields into one row (a tick). Returns the new row, or None if the symbol is unknown."""
+        return self.apply(updates={symbol: fields}).get(symbol)
+
+    def set_rows(self, rows):
+        """Replaces whole rows (a scanner cycle) in a single swap."""
+        return self.apply(rows=rows)
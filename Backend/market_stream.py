@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import logging
+
+try:
+    from .market_snapshot import encode
+except ImportError:
+    from market_snapshot import encode
+
+logger = logging.getLogger("MarketStream")
+
+HEARTBEAT_SECONDS = 15
+MIN_WINDOW_MS, MAX_WINDOW_MS = 50, 5000
+
+
+class StreamClient:
+    """
+    One connected dashboard. Updates are coalesced per symbol into `pending` (latest value
+    wins), so a slow consumer costs at most one entry per symbol, never an unbounded queue.
+    """
+
+    def __init__(self, loop, symbols=None, window_ms=250):
+        self.loop = loop
+        self.symbols = set(symbols) if symbols else None # None = every symbol
+        self.window = min(max(window_ms, MIN_WINDOW_MS), MAX_WINDOW_MS) / 1000.0
+        self.pending = {}
+        self.event = asyncio.Event()
+        self._lock = threading.Lock()
+        self._signalled = False
+        self.sent = 0
+        self.coalesced = 0
+
+    def offer(self, symbol, fields):
+        """Called from any thread; merges the update and wakes the client once per batch."""
+        if self.symbols is not None and symbol not in self.symbols: return
+        with self._lock:
+            if symbol in self.pending:
+                self.pending[symbol].update(fields)
+                self.coalesced += 1
+            else:
+                self.pending[symbol] = dict(fields)
+            if self._signalled: return
+            self._signalled = True
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            pass # Loop closed; the client is going away
+
+    def drain(self):
+        with self._lock:
+            batch, self.pending = self.pending, {}
+            self._signalled = False
+            self.event.clear()
+        self.sent += len(batch)
+        return batch
+
+
+class MarketStream:
+    """Fans market_cache changes out to every connected Server-Sent Events client."""
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = MarketStream()
+        return cls._instance
+
+    def __init__(self):
+        self._clients = set()
+        self._lock = threading.Lock()
+
+    def register(self, client):
+        with self._lock:
+            self._clients.add(client)
+        logger.info(f"Stream client connected ({len(self._clients)} total)")
+
+    def unregister(self, client):
+        with self._lock:
+            self._clients.discard(client)
+        logger.info(f"Stream client disconnected ({len(self._clients)} total)")
+
+    def publish(self, symbol, fields):
+        """Pushes changed fields of one symbol (a tick diff or a full scanner row)."""
+        with self._lock:
+            clients = list(self._clients)
+        for c in clients:
+            c.offer(symbol, fields)
+
+    def stats(self):
+        with self._lock:
+            clients = list(self._clients)
+        return {
+            "clients": len(clients),
+            "pending": sum(len(c.pending) for c in clients),
+            "sent": sum(c.sent for c in clients),
+            "coalesced": sum(c.coalesced for c in clients),
+        }
+
+    async def events(self, client, request, initial_rows=None, version=None):
+        """SSE body: an initial `snapshot` event, then coalesced `diff` events and heartbeats."""
+        self.register(client)
+        try:
+            yield "retry: 3000\n\n"
+            if initial_rows is not None:
+                rows = [r for r in initial_rows if client.symbols is None or r['symbol'] in client.symbols]
+                yield "event: snapshot\ndata: " + encode({"version": version, "data": rows}).decode() + "\n\n"
+            while True:
+                try:
+                    await asyncio.wait_for(client.event.wait(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected(): break
+                    yield ": ping\n\n"
+                    continue
+                # Coalescing window: let more ticks land before sending
+                await asyncio.sleep(client.window)
+                if await request.is_disconnected(): break
+                batch = client.drain()
+                if batch:
+                    yield "event: diff\ndata: " + encode(batch).decode() + "\n\n"
+        finally:
+            self.unregister(client)
@@ -0,0 +1,88 @@
+import bisect
+import math
+import threading
+
+STRENGTH_PCT = 0.5 # |avg_3d| above this counts as Buyers/Sellers
+
+
+class RankedIndex:
+    """Symbols kept sorted by a numeric value (bisect insert/remove), for top-K reads without sorting."""
+
+    def __init__(self):
+        self._entries = [] # Sorted [(value, symbol)]
+        self._values = {} # symbol -> value currently in _entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def update(self, symbol, value):
+        old = self._values.get(symbol)
+        if old is not None:
+            if old == value: return
+            i = bisect.bisect_left(self._entries, (old, symbol))
+            del self._entries[i]
+            del self._values[symbol]
+        if value is None or (isinstance(value, float) and math.isnan(value)): return
+        bisect.insort(self._entries, (value, symbol))
+        self._values[symbol] = value
+
+    def remove(self, symbol):
+        self.update(symbol, None)
+
+    def lowest(self, k, below=None):
+        """Up to k (value, symbol) from the bottom, optionally only while value < below."""
+        out = []
+        for value, sym in self._entries:
+            if len(out) >= k or (below is not None and value >= below): break
+            out.append((value, sym))
+        return out
+
+    def highest(self, k, above=None):
+        """Up to k (value, symbol) from the top, optionally only while value > above."""
+        out = []
+        for value, sym in reversed(self._entries):
+            if len(out) >= k or (above is not None and value <= above): break
+            out.append((value, sym))
+        return out
+
+
+class PreMarketViews:
+    """
+    Incrementally maintained views behind /api/pre-market: gainers/losers by change_pct and
+    3-day strength by avg_3d (the breakout watch is served by LevelIndex).
+    Updated per symbol as market_cache changes, so the endpoint only reads the top K.
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = PreMarketViews()
+        return cls._instance
+
+    def __init__(self):
+        self.change = RankedIndex()
+        self.strength = RankedIndex()
+        self._lock = threading.Lock()
+
+    def update(self, symbol, row):
+        with self._lock:
+            self.change.update(symbol, row.get('change_pct', 0))
+            self.strength.update(symbol, row.get('avg_3d', 0))
+
+    def remove(self, symbol):
+        with self._lock:
+            self.change.remove(symbol)
+            self.strength.remove(symbol)
+
+    def gainers(self, k=20):
+        with self._lock: return [s for _, s in self.change.highest(k)]
+
+    def losers(self, k=20):
+        with self._lock: return [s for _, s in self.change.lowest(k)]
+
+    def strength_buyers(self, k=20):
+        with self._lock: return [s for _, s in self.strength.highest(k, above=STRENGTH_PCT)]
+
+    def strength_sellers(self, k=20):
+        with self._lock: return [s for _, s in self.strength.lowest(k, below=-STRENGTH_PCT)]
@@ -0,0 +1,280 @@
+import numpy as np
+from datetime import datetime
+
+# Panel field order: one (symbols x days) float matrix per OHLCV column
+FIELDS = ("open", "high", "low", "close", "volume")
+BREAKOUT_PERIODS = {"1d": 1, "2d": 2, "10d": 10, "30d": 30, "50d": 50, "100d": 100, "52w": 250}
+
+
+def is_fresh(hist_data, now=None):
+    """Same freshness rule as calculate_metrics: skip data whose last candle is > 5 days old."""
+    try:
+        last_c_time = hist_data[-1][0]
+        if "T" in last_c_time:
+            last_dt = datetime.strptime(last_c_time.split("T")[0], "%Y-%m-%d")
+        else:
+            last_dt = datetime.strptime(last_c_time[:10], "%Y-%m-%d")
+        return ((now or datetime.now()) - last_dt).days <= 5
+    except Exception:
+        return True
+
+
+def build_panel(histories, days=None):
+    """
+    Aligns per-symbol candle lists ([ts, o, h, l, c, v] rows) into a right-aligned panel.
+    Shorter histories are left-padded with NaN. Returns (panel dict, lengths array).
+    Pass the same history calculate_metrics would get: EMAs depend on the full series.
+    """
+    n_sym = len(histories)
+    width = max((len(h) for h in histories), default=0)
+    if days: width = min(days, width)
+    panel = {f: np.full((n_sym, width), np.nan) for f in FIELDS}
+    lengths = np.zeros(n_sym, dtype=np.int64)
+    for i, hist in enumerate(histories):
+        rows = hist[-width:] if width else []
+        n = len(rows)
+        lengths[i] = n
+        if n == 0: continue
+        block = np.array([r[1:6] for r in rows], dtype=np.float64)
+        for k, f in enumerate(FIELDS):
+            panel[f][i, width - n:] = block[:, k]
+    return panel, lengths
+
+
+def _ewm(values, span):
+    """Row-wise pandas ewm(span, adjust=False).mean() with identical arithmetic (leading NaN = not started)."""
+    com = (span - 1) / 2.0
+    alpha = 1. / (1. + com)
+    old_wt = 1. - alpha # adjust=False: the previous weight is reset to 1 after every observation
+    out = np.full(values.shape, np.nan)
+    weighted = np.full(values.shape[0], np.nan)
+    with np.errstate(invalid="ignore"):
+        for j in range(values.shape[1]):
+            cur = values[:, j]
+            obs = cur == cur
+            started = weighted == weighted
+            upd = started & obs & (weighted != cur)
+            blended = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+            weighted = np.where(upd, blended, weighted)
+            weighted = np.where(~started & obs, cur, weighted)
+            out[:, j] = weighted
+    return out
+
+
+def _rolling_mean_last(values, window):
+    """
+    Row-wise pandas rolling(window).mean() evaluated at the last column, replicating the
+    incremental Kahan add/remove algorithm so results match bit-for-bit. NaN = no observation.
+    """
+    n_sym, width = values.shape
+    nobs = np.zeros(n_sym, dtype=np.int64)
+    neg_ct = np.zeros(n_sym, dtype=np.int64)
+    same_ct = np.zeros(n_sym, dtype=np.int64)
+    sum_x = np.zeros(n_sym)
+    comp_add = np.zeros(n_sym)
+    comp_rem = np.zeros(n_sym)
+    prev = values[:, 0].copy() if width else np.zeros(n_sym)
+
+    for i in range(width):
+        if i >= window: # Remove the value leaving the window
+            val = values[:, i - window]
+            obs = val == val
+            y = -val - comp_rem
+            t = sum_x + y
+            comp_rem = np.where(obs, (t - sum_x) - y, comp_rem)
+            sum_x = np.where(obs, t, sum_x)
+            nobs -= obs
+            neg_ct -= obs & np.signbit(val)
+
+        val = values[:, i]
+        obs = val == val
+        y = val - comp_add
+        t = sum_x + y
+        comp_add = np.where(obs, (t - sum_x) - y, comp_add)
+        sum_x = np.where(obs, t, sum_x)
+        nobs += obs
+        neg_ct += obs & np.signbit(val)
+        same_ct = np.where(obs, np.where(val == prev, same_ct + 1, 1), same_ct)
+        prev = np.where(obs, val, prev)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = sum_x / np.maximum(nobs, 1)
+    result = np.where(same_ct >= nobs, prev, result)
+    result = np.where((same_ct < nobs) & (neg_ct == 0) & (result < 0), 0.0, result)
+    result = np.where((same_ct < nobs) & (neg_ct == nobs) & (result > 0), 0.0, result)
+    return np.where(nobs >= window, result, np.nan)
+
+
+def _window_extreme(panel_field, lengths, period, use_max):
+    """Max/min over the `period` candles before today; NaN where history is too short (< period + 2)."""
+    width = panel_field.shape[1]
+    if width < period + 1:
+        return np.full(panel_field.shape[0], np.nan)
+    window = panel_field[:, width - (period + 1):width - 1]
+    vals = window.max(axis=1) if use_max else window.min(axis=1) # NaN rows are masked below
+    return np.where(lengths >= period + 2, vals, np.nan)
+
+
+def compute_panel(panel, lengths, ath_vals):
+    """
+    Vectorized equivalent of calculate_metrics' indicator/score/breakout logic for every row at once.
+    Returns a dict of (symbols,) arrays. Rows with < 5 candles, a zero close in the last
+    five or non-finite prices are flagged via 'valid'.
+    """
+    o, h, l, c, v = (panel[f] for f in FIELDS)
+    n_sym, width = c.shape
+    ath_vals = np.asarray(ath_vals, dtype=np.float64)
+    valid = lengths >= 5
+    if width < 5:
+        return {"valid": np.zeros(n_sym, dtype=bool)}
+
+    c0, c1, c2, c3, c4 = c[:, -1], c[:, -2], c[:, -3], c[:, -4], c[:, -5]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        change_current = ((c0 - c1) / c1) * 100
+        change_1d = ((c1 - c2) / c2) * 100
+        change_2d = ((c2 - c3) / c3) * 100
+        change_3d = ((c3 - c4) / c4) * 100
+    avg_3d = (change_current + change_1d + change_2d + change_3d) / 4.0
+    # calculate_metrics fails (-> None) on a zero close; bad candles must not surface as inf/NaN either
+    valid &= (c1 != 0) & (c2 != 0) & (c3 != 0) & (c4 != 0)
+    valid &= np.isfinite(c0) & np.isfinite(h[:, -1]) & np.isfinite(l[:, -1]) & np.isfinite(avg_3d)
+
+    buyers = c[:, -4:] > o[:, -4:] # [dom_3d, dom_2d, dom_1d, dom_current]
+    bulls = buyers.sum(axis=1)
+
+    # RSI (simple 14-period average of gains/losses, first diff counts as 0)
+    col = np.arange(width)
+    started = col[None, :] >= (width - lengths)[:, None]
+    delta = np.full(c.shape, np.nan)
+    delta[:, 1:] = c[:, 1:] - c[:, :-1]
+    with np.errstate(invalid="ignore"):
+        gains = np.where(started, np.where(delta > 0, delta, 0.0), np.nan)
+        losses = np.where(started, -np.where(delta < 0, delta, 0.0), np.nan)
+    gain = _rolling_mean_last(gains, 14)
+    loss = _rolling_mean_last(losses, 14)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rsi = 100 - (100 / (1 + gain / loss))
+    cur_rsi = np.where(np.isnan(rsi), 50.0, rsi)
+
+    # MACD (12, 26, 9)
+    e12 = _ewm(c, 12)
+    e26 = _ewm(c, 26)
+    macd = e12 - e26
+    sig = _ewm(macd, 9)
+    hist = macd - sig
+    h_val, h_prev = hist[:, -1], hist[:, -2]
+
+    ema20 = _ewm(c, 20)[:, -1]
+    ema50 = _ewm(c, 50)[:, -1]
+
+    levels = {}
+    for name, period in BREAKOUT_PERIODS.items():
+        levels[f"high_{name}"] = _window_extreme(h, lengths, period, True)
+        levels[f"low_{name}"] = _window_extreme(l, lengths, period, False)
+
+    # Strength Score
+    h10_prev = np.where(lengths >= 12, levels["high_10d"], c0)
+    trend_score = 20 * (c0 > ema50) + 10 * (c0 > ema20) + 10 * (c0 > h10_prev)
+    mom_score = np.where((cur_rsi >= 50) & (cur_rsi <= 70), 20, np.where(cur_rsi > 70, 10, 0))
+    mom_score = mom_score + 10 * (macd[:, -1] > sig[:, -1]) + 10 * ((h_val > 0) & (h_val > h_prev))
+
+    # Sum left-to-right like the builtin sum() in calculate_metrics
+    vol_sum = np.zeros(n_sym)
+    if width >= 11:
+        for j in range(width - 11, width - 1):
+            vol_sum = vol_sum + v[:, j]
+    avg_vol_10 = np.where(lengths >= 11, vol_sum / 10, v[:, -1])
+    vol_score = 10 * buyers[:, -1] + 10 * (v[:, -1] > avg_vol_10)
+    score = (trend_score + mom_score + vol_score).astype(np.int64)
+
+    day_h, day_l = h[:, -1], l[:, -1]
+    new_ath = np.where(c0 > ath_vals, c0, ath_vals)
+    new_ath = np.where(day_h > new_ath, day_h, new_ath)
+
+    breakouts = {}
+    for name in BREAKOUT_PERIODS:
+        hi, lo = levels[f"high_{name}"], levels[f"low_{name}"]
+        bull = (hi == hi) & (hi != 0) & (day_h > hi)
+        bear = ~bull & (lo == lo) & (lo != 0) & (day_l < lo)
+        breakouts[name] = np.where(bull, 1, np.where(bear, -1, 0))
+    breakout_all = (ath_vals > 0) & (day_h >= ath_vals)
+
+    return {
+        "valid": valid,
+        "c0": c0, "day_h": day_h, "day_l": day_l,
+        "change_current": change_current, "change_1d": change_1d,
+        "change_2d": change_2d, "change_3d": change_3d, "avg_3d": avg_3d,
+        "buyers": buyers, "bulls": bulls,
+        "cur_rsi": cur_rsi, "h_val": h_val, "h_prev": h_prev,
+        "score": score, "new_ath": new_ath,
+        "levels": levels, "breakouts": breakouts, "breakout_all": breakout_all,
+    }
+
+
+def _sentiment(score):
+    if score >= 80: return "STRONG BUY"
+    if score >= 60: return "Bullish"
+    if score <= 20: return "STRONG SELL"
+    if score <= 40: return "Bearish"
+    return "Neutral"
+
+
+def _macd_signal(h_val, h_prev):
+    if h_val > 0: return "Bullish Growing" if h_val > h_prev else "Bullish Waning"
+    if h_val < 0: return "Bearish Growing" if h_val < h_prev else "Bearish Waning"
+    return "Neutral"
+
+
+def _lom(change_current):
+    if 0.5 <= change_current <= 3.0: return "LOM_SHORT"
+    if change_current > 3.0: return "LOM_LONG"
+    if -3.0 <= change_current <= -0.5: return "LOM_SHORT_BEAR"
+    if change_current < -3.0: return "LOM_LONG_BEAR"
+    return "None"
+
+
+def core_rows(result, ath_vals):
+    """Per-symbol core values (same names/types as calculate_metrics uses) from a compute_panel result."""
+    rows = []
+    if not result["valid"].any():
+        return [None] * len(result["valid"])
+    plain = {k: result[k].tolist() for k in (
+        "c0", "day_h", "day_l", "change_current", "change_1d", "change_2d", "change_3d",
+        "avg_3d", "bulls", "cur_rsi", "h_val", "h_prev", "score", "new_ath", "breakout_all",
+    )}
+    buyers = result["buyers"].tolist()
+    levels = {k: [None if x != x else x for x in arr.tolist()] for k, arr in result["levels"].items()}
+    breakouts = {k: arr.tolist() for k, arr in result["breakouts"].items()}
+    bo_label = {1: "Bullish Breakout", -1: "Bearish Breakout", 0: "Consolidating"}
+
+    for i, ok in enumerate(result["valid"].tolist()):
+        if not ok:
+            rows.append(None)
+            continue
+        change_current = plain["change_current"][i]
+        score = plain["score"][i]
+        cur_rsi = plain["cur_rsi"][i]
+        dom = ["Buyers" if b else "Sellers" for b in buyers[i]]
+        bulls = plain["bulls"][i]
+        core = {
+            "c0": plain["c0"][i], "day_h": plain["day_h"][i], "day_l": plain["day_l"][i],
+            "change_current": change_current, "change_1d": plain["change_1d"][i],
+            "change_2d": plain["change_2d"][i], "change_3d": plain["change_3d"][i],
+            "avg_3d": plain["avg_3d"][i],
+            "dom_current": dom[3], "dom_1d": dom[2], "dom_2d": dom[1], "dom_3d": dom[0],
+            "avg_dom_3d": "Buyers" if bulls >= 3 else "Sellers" if bulls <= 1 else "Balance",
+            "cur_rsi": cur_rsi,
+            "macd_sig": _macd_signal(plain["h_val"][i], plain["h_prev"][i]),
+            "score": score, "sentiment": _sentiment(score),
+            "prev_ath": ath_vals[i], "new_ath": plain["new_ath"][i],
+            "bo_all": "Bullish Breakout" if plain["breakout_all"][i] else "Consolidating",
+            "lom_status": _lom(change_current),
+            "is_contraction": abs(change_current) < 0.25 and score > 50,
+            "is_sniper": change_current < -2.0 and cur_rsi < 40,
+        }
+        for name in BREAKOUT_PERIODS:
+            core[f"high_{name}"] = levels[f"high_{name}"][i]
+            core[f"low_{name}"] = levels[f"low_{name}"][i]
+            core[f"bo_{name}"] = bo_label[breakouts[name][i]]
+        rows.append(core)
+    return rows
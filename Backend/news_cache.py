@@ -0,0 +1,156 @@
+import asyncio
+import time
+import logging
+import urllib.parse
+import xml.etree.ElementTree as ET
+import httpx
+
+logger = logging.getLogger("NewsCache")
+
+MAX_ITEMS = 5
+
+
+def parse_rss(content, limit=MAX_ITEMS):
+    """Google News RSS -> [{title, link, date, source}] (first `limit` items)."""
+    root = ET.fromstring(content)
+    news_items = []
+    for item in root.findall(".//item"):
+        title = item.find("title").text if item.find("title") is not None else "No Title"
+        link = item.find("link").text if item.find("link") is not None else "#"
+        pubDate = item.find("pubDate").text if item.find("pubDate") is not None else ""
+        source = item.find("source").text if item.find("source") is not None else "Google News"
+        news_items.append({"title": title, "link": link, "date": pubDate, "source": source})
+        if len(news_items) >= limit: break
+    return news_items
+
+
+class GoogleNewsFetcher:
+    """Default network layer: Google News RSS over one pooled keep-alive client."""
+
+    URL = "https://news.google.com/rss/search?q={q}+stock+news+india&hl=en-IN&gl=IN&ceid=IN:en"
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+        self._http = None
+
+    async def __call__(self, symbol):
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(timeout=self.timeout, follow_redirects=True)
+        response = await self._http.get(self.URL.format(q=urllib.parse.quote_plus(symbol)))
+        response.raise_for_status()
+        return parse_rss(response.content)
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+class NewsCache:
+    """
+    Per-symbol news with a TTL and stale-while-revalidate: fresh entries are served from
+    memory, stale ones (up to `max_stale`) are served immediately while one background
+    refresh runs, and concurrent misses share one fetch. `fetcher(symbol)` is any coroutine
+    function returning the item list, so tests can plug in a local stub.
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = NewsCache()
+        return cls._instance
+
+    def __init__(self, fetcher=None, ttl=300, max_stale=3600, max_entries=2000):
+        self.fetcher = fetcher or GoogleNewsFetcher()
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self._entries = {} # symbol -> (fetched_at, items)
+        self._inflight = {} # symbol -> asyncio.Task
+        self._prefetch_task = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.errors = 0
+
+    def _refresh(self, symbol):
+        """The in-flight fetch for `symbol`, starting one if none is running."""
+        task = self._inflight.get(symbol)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._fetch(symbol))
+            self._inflight[symbol] = task
+        else:
+            self.shared += 1
+        return task
+
+    async def _fetch(self, symbol):
+        try:
+            items = await self.fetcher(symbol)
+            self._entries[symbol] = (time.monotonic(), items)
+            if len(self._entries) > self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                self._entries.pop(oldest, None)
+            return items
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._inflight.pop(symbol, None)
+
+    async def get(self, symbol):
+        entry = self._entries.get(symbol)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self.hits += 1
+                return entry[1]
+            if age < self.max_stale:
+                # Serve stale now, revalidate in the background
+                self.stale_hits += 1
+                task = self._refresh(symbol)
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                return entry[1]
+        self.misses += 1
+        return await asyncio.shield(self._refresh(symbol))
+
+    async def prefetch(self, symbols, concurrency=4):
+        """Warms the cache for `symbols` (only those missing or past the TTL)."""
+        now = time.monotonic()
+        todo = [s for s in symbols if s not in self._entries or now - self._entries[s][0] >= self.ttl]
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(symbol):
+            async with sem:
+                try:
+                    await self._refresh(symbol)
+                except Exception as e:
+                    logger.debug(f"Prefetch failed for {symbol}: {e}")
+        await asyncio.gather(*(one(s) for s in todo))
+        return len(todo)
+
+    def start_prefetcher(self, symbols_func, interval=120):
+        """Background task: every `interval` seconds prefetch news for symbols_func() (e.g. top movers)."""
+        async def loop():
+            while True:
+                try:
+                    n = await self.prefetch(symbols_func())
+                    if n: logger.info(f"Prefetched news for {n} symbols")
+                except Exception as e:
+                    logger.error(f"News prefetch error: {e}")
+                await asyncio.sleep(interval)
+        if self._prefetch_task is None or self._prefetch_task.done():
+            self._prefetch_task = asyncio.get_running_loop().create_task(loop())
+        return self._prefetch_task
+
+    async def aclose(self):
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            self._prefetch_task = None
+        if hasattr(self.fetcher, "aclose"):
+            await self.fetcher.aclose()
+
+    def stats(self):
+        return {"entries": len(self._entries), "in_flight": len(self._inflight), "hits": self.hits,
+                "stale_hits": self.stale_hits, "misses": self.misses, "shared": self.shared, "errors": self.errors}
@@ -0,0 +1,65 @@
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger("OptionChainCache")
+
+
+class OptionChainCache:
+    """
+    Short-lived cache of built option chains keyed by (underlying, expiry). Within `ttl`
+    seconds a chain is served from memory; concurrent viewers of a chain that is being
+    fetched await the same in-flight build instead of starting their own.
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = OptionChainCache()
+        return cls._instance
+
+    def __init__(self, ttl=2.0, max_entries=200):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {} # key -> (built_at, chain)
+        self._inflight = {} # key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    async def get(self, key, build):
+        """Cached chain for `key`, else the result of `await build()` (one build per key at a time)."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self.hits += 1
+            return entry[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            self.misses += 1
+            # The build runs as its own task: a viewer that disconnects (even the first one)
+            # only cancels its own wait, never the build the other viewers share
+            task = asyncio.get_running_loop().create_task(self._build(key, build))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(task)
+
+    async def _build(self, key, build):
+        try:
+            chain = await build()
+            # Failed builds (None) are not cached, the next viewer retries
+            if chain is not None:
+                self._entries[key] = (time.monotonic(), chain)
+                if len(self._entries) > self.max_entries:
+                    oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                    self._entries.pop(oldest, None)
+            return chain
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self):
+        return {"entries": len(self._entries), "in_flight": len(self._inflight),
+                "hits": self.hits, "misses": self.misses, "shared": self.shared}
@@ -0,0 +1,101 @@
+import bisect
+import logging
+from datetime import datetime, date
+import numpy as np
+
+logger = logging.getLogger("OptionIndex")
+
+
+def parse_expiry(expiry):
+    """Angel expiry "26DEC2024" (or the short "26DEC24") -> date, None if unparseable."""
+    if isinstance(expiry, date): return expiry
+    expiry = str(expiry).upper()
+    for fmt in ("%d%b%Y", "%d%b%y"):
+        try:
+            return datetime.strptime(expiry, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+class ExpiryChain:
+    """One underlying/expiry: sorted strike array with the CE/PE token and lot size per strike."""
+
+    def __init__(self, expiry, strikes, ce_tokens, pe_tokens, lot_size):
+        self.expiry = expiry
+        self.strikes = strikes # np.float64, ascending, unique
+        self.ce_tokens = ce_tokens # Parallel lists, None where the leg is not listed
+        self.pe_tokens = pe_tokens
+        self.lot_size = lot_size
+
+    def atm_index(self, spot):
+        """Index of the listed strike closest to spot (binary search)."""
+        n = len(self.strikes)
+        i = int(np.searchsorted(self.strikes, spot))
+        if i == 0: return 0
+        if i == n: return n - 1
+        return i if self.strikes[i] - spot < spot - self.strikes[i - 1] else i - 1
+
+    def window(self, center, width):
+        """Rows for the `width` strikes either side of the strike closest to `center`."""
+        if not len(self.strikes): return []
+        c = self.atm_index(center)
+        lo, hi = max(0, c - width), min(len(self.strikes), c + width + 1)
+        return [{
+            "strike": float(self.strikes[i]),
+            "ce_token": self.ce_tokens[i],
+            "pe_token": self.pe_tokens[i],
+            "lot_size": self.lot_size,
+        } for i in range(lo, hi)]
+
+
+class OptionIndex:
+    """
+    underlying -> sorted expiry dates -> ExpiryChain, built once per scrip master load.
+    Nearest-expiry resolution and ATM windows are binary searches, so a chain of any
+    underlying/expiry (near or far from the money) costs O(log n).
+    """
+
+    def __init__(self, names, symbols, expiries, strikes, tokens, lot_sizes):
+        legs = {} # (name, expiry date) -> {strike: [ce, pe, lot]}
+        parsed = {} # Expiry string -> date (a few hundred distinct values)
+        for name, sym, exp, stk, tok, lot in zip(names, symbols, expiries, strikes, tokens, lot_sizes):
+            if not isinstance(sym, str): continue
+            otype = 1 if sym.endswith("CE") else 2 if sym.endswith("PE") else 0
+            d = parsed[exp] if exp in parsed else parsed.setdefault(exp, parse_expiry(exp))
+            if not otype or d is None or stk != stk: continue
+            # Angel 'strike' is scaled by 100 (2400000 -> 24000.0)
+            row = legs.setdefault((name, d), {}).setdefault(float(stk) / 100.0, [None, None, None])
+            if row[otype - 1] is None: row[otype - 1] = str(tok)
+            if lot == lot and lot: row[2] = int(lot)
+
+        chains = {}
+        for (name, d), by_strike in legs.items():
+            ordered = sorted(by_strike)
+            lot = next((by_strike[s][2] for s in ordered if by_strike[s][2]), None)
+            chains.setdefault(name, {})[d] = ExpiryChain(
+                d, np.array(ordered, dtype=np.float64),
+                [by_strike[s][0] for s in ordered], [by_strike[s][1] for s in ordered], lot)
+
+        self._chains = chains
+        self._expiries = {name: sorted(by_exp) for name, by_exp in chains.items()}
+        logger.info(f"Indexed option chains for {len(chains)} underlyings, {len(legs)} expiries.")
+
+    def __len__(self):
+        return len(self._chains)
+
+    def expiries(self, underlying):
+        return list(self._expiries.get(underlying, ()))
+
+    def nearest_expiry(self, underlying, on=None):
+        """First expiry on or after `on` (default today), None if the underlying has none left."""
+        dates = self._expiries.get(underlying)
+        if not dates: return None
+        i = bisect.bisect_left(dates, on or date.today())
+        return dates[i] if i < len(dates) else None
+
+    def chain(self, underlying, expiry=None):
+        """ExpiryChain for an expiry (date or Angel string), or the nearest one when omitted."""
+        d = parse_expiry(expiry) if expiry else self.nearest_expiry(underlying)
+        if d is None: return None
+        return self._chains.get(underlying, {}).get(d)
@@ -0,0 +1,360 @@
+import time
+import asyncio
+import heapq
+import itertools
+import threading
+import contextvars
+import functools
+import logging
+import multiprocessing
+from contextlib import contextmanager
+
+logger = logging.getLogger("RateLimiter")
+
+# Priority Lanes (lower value is served first)
+PRIORITY_INTERACTIVE = 0 # User-facing requests (/analyze, /options-chain ...)
+PRIORITY_BACKGROUND = 1  # Scanners
+LANE_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+# Endpoint Class -> (requests/sec, burst, max concurrency)
+# Angel One SmartAPI: historical 3/s, quotes 10/s, login 1/s. Upstox: 50/s (kept well below).
+DEFAULT_LIMITS = {
+    "historical": (3.0, 3, 3),
+    "quote": (10.0, 10, 10),
+    "auth": (1.0, 1, 1),
+    "upstox": (10.0, 10, 10),
+    "default": (5.0, 5, 5),
+}
+
+# SmartConnect method -> Endpoint Class
+SMARTAPI_ENDPOINTS = {
+    "getCandleData": "historical",
+    "ltpData": "quote",
+    "getMarketData": "quote",
+    "generateSession": "auth",
+    "generateToken": "auth",
+}
+
+_current_priority = contextvars.ContextVar("rate_limit_priority", default=PRIORITY_BACKGROUND)
+
+
+def is_rate_limited(result):
+    """Detects a rate-limit rejection in a broker response or exception."""
+    if result is None: return False
+    status = getattr(result, "status_code", None)
+    if status == 429: return True
+    if isinstance(result, dict):
+        text = str(result.get("message", "")) + str(result.get("errorcode", ""))
+    elif isinstance(result, Exception):
+        text = str(result)
+    else:
+        return False
+    text = text.lower()
+    return "access rate" in text or "rate limit" in text or "too many" in text
+
+
+class _Bucket:
+    """Token bucket plus an AIMD concurrency window for one endpoint class."""
+
+    def __init__(self, name, rate, burst, max_concurrency):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.max_concurrency = max_concurrency
+        self.window = float(max_concurrency) # AIMD concurrency window
+        self.in_flight = 0
+        self.waiters = [] # Heap of [priority, seq]
+        self.cond = threading.Condition()
+        # Counters
+        self.queued = {p: 0 for p in LANE_NAMES}
+        self.granted = {p: 0 for p in LANE_NAMES}
+        self.wait_total = {p: 0.0 for p in LANE_NAMES}
+        self.wait_max = {p: 0.0 for p in LANE_NAMES}
+        self.throttled = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def ready_in(self, now):
+        """0 if a call may start now, seconds until the next token, or None to wait for a release."""
+        if self.in_flight >= max(1, int(self.window)): return None
+        self._refill(now)
+        if self.tokens >= 1: return 0
+        return (1 - self.tokens) / self.rate
+
+    def on_release(self, throttled):
+        self.in_flight -= 1
+        if throttled:
+            # Multiplicative decrease, and drain the bucket so everyone backs off
+            self.throttled += 1
+            self.window = max(1.0, self.window / 2)
+            self.tokens = 0
+            logger.warning(f"{self.name}: rate limited, concurrency window -> {self.window:.1f}")
+        else:
+            # Additive increase (about +1 per full window of successful calls)
+            self.window = min(float(self.max_concurrency), self.window + 1.0 / self.window)
+
+
+class SharedBucket:
+    """
+    Token bucket kept in shared memory, so several processes (the API process and the
+    scanner workers) draw from one request budget for an endpoint class. Uses wall-clock
+    time because monotonic clocks are not comparable across processes.
+    """
+
+    def __init__(self, rate, burst, ctx=None):
+        ctx = ctx or multiprocessing.get_context("spawn")
+        self.rate = rate
+        self.burst = burst
+        self._state = ctx.Array("d", [float(burst), time.time()]) # [tokens, last refill]
+
+    def try_take(self):
+        """Takes a token and returns 0, or returns the seconds until one is available."""
+        with self._state.get_lock():
+            now = time.time()
+            tokens = min(self.burst, self._state[0] + max(0.0, now - self._state[1]) * self.rate)
+            self._state[1] = now
+            if tokens >= 1:
+                self._state[0] = tokens - 1
+                return 0
+            self._state[0] = tokens
+            return (1 - tokens) / self.rate
+
+    def take(self):
+        while True:
+            wait = self.try_take()
+            if wait == 0: return
+            time.sleep(wait)
+
+    def drain(self):
+        """Empties the bucket (a rate-limit rejection in any process backs everyone off)."""
+        with self._state.get_lock():
+            self._state[0] = 0.0
+            self._state[1] = time.time()
+
+
+class RateLimiter:
+    """
+    Single shared limiter for every broker call. Each endpoint class has its own token
+    bucket and AIMD concurrency window; waiters are served strictly by priority lane,
+    then in arrival order.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self._buckets = {}
+        self._shared = {} # endpoint -> SharedBucket (cross-process budget)
+        self._guard = threading.Lock()
+        self._seq = itertools.count()
+
+    def _bucket(self, endpoint):
+        with self._guard:
+            if endpoint not in self._buckets:
+                rate, burst, conc = self.limits.get(endpoint, self.limits["default"])
+                self._buckets[endpoint] = _Bucket(endpoint, rate, burst, conc)
+            return self._buckets[endpoint]
+
+    def share(self, endpoint, shared_bucket):
+        """
+        Makes calls to `endpoint` also draw from a cross-process SharedBucket. The local bucket
+        still orders waiters by lane; the shared one caps the combined rate of all processes.
+        """
+        with self._guard:
+            self._shared[endpoint] = shared_bucket
+
+    def shared_buckets(self, endpoints, ctx=None):
+        """SharedBuckets for `endpoints` (created from this limiter's limits on first use)."""
+        out = {}
+        for endpoint in endpoints:
+            with self._guard:
+                shared = self._shared.get(endpoint)
+            if shared is None:
+                rate, burst, _ = self.limits.get(endpoint, self.limits["default"])
+                shared = SharedBucket(rate, burst, ctx)
+                self.share(endpoint, shared)
+            out[endpoint] = shared
+        return out
+
+    @contextmanager
+    def priority(self, priority):
+        """Runs the block (and broker calls made from it) in the given priority lane."""
+        reset = _current_priority.set(priority)
+        try:
+            yield
+        finally:
+            _current_priority.reset(reset)
+
+    def acquire(self, endpoint, priority=None):
+        prio = _current_priority.get() if priority is None else priority
+        bucket = self._bucket(endpoint)
+        entry = [prio, next(self._seq)]
+        start = time.monotonic()
+        with bucket.cond:
+            heapq.heappush(bucket.waiters, entry)
+            bucket.queued[prio] += 1
+            while True:
+                wait = bucket.ready_in(time.monotonic()) if bucket.waiters[0] is entry else None
+                if wait == 0: break
+                bucket.cond.wait(timeout=wait)
+            self._grant(bucket, prio, start)
+        shared = self._shared.get(endpoint)
+        if shared is not None:
+            shared.take() # Holds the in-flight slot while waiting for the global budget
+        return bucket
+
+    def _grant(self, bucket, prio, start):
+        # Caller holds bucket.cond and is at the head of the queue
+        heapq.heappop(bucket.waiters)
+        bucket.tokens -= 1
+        bucket.in_flight += 1
+        bucket.queued[prio] -= 1
+        waited = time.monotonic() - start
+        bucket.granted[prio] += 1
+        bucket.wait_total[prio] += waited
+        bucket.wait_max[prio] = max(bucket.wait_max[prio], waited)
+        bucket.cond.notify_all() # Next in line re-checks
+
+    async def acquire_async(self, endpoint, priority=None, poll=0.05):
+        """
+        Same queue and lanes as acquire(), for coroutines: waits with asyncio.sleep instead
+        of blocking the event loop on the condition variable.
+        """
+        prio = _current_priority.get() if priority is None else priority
+        bucket = self._bucket(endpoint)
+        entry = [prio, next(self._seq)]
+        start = time.monotonic()
+        with bucket.cond:
+            heapq.heappush(bucket.waiters, entry)
+            bucket.queued[prio] += 1
+        try:
+            while True:
+                with bucket.cond:
+                    wait = bucket.ready_in(time.monotonic()) if bucket.waiters[0] is entry else None
+                    if wait == 0:
+                        self._grant(bucket, prio, start)
+                        break
+                await asyncio.sleep(poll if wait is None else min(wait, poll))
+        except BaseException:
+            # Cancelled while queued: leave the line without taking a slot
+            with bucket.cond:
+                if entry in bucket.waiters:
+                    bucket.waiters.remove(entry)
+                    heapq.heapify(bucket.waiters)
+                    bucket.queued[prio] -= 1
+                    bucket.cond.notify_all()
+            raise
+        shared = self._shared.get(endpoint)
+        if shared is not None:
+            try:
+                while True:
+                    wait = shared.try_take()
+                    if wait == 0: break
+                    await asyncio.sleep(min(wait, poll))
+            except BaseException:
+                self.release(bucket)
+                raise
+        return bucket
+
+    async def call_async(self, endpoint, coro_func, *args, priority=None, **kwargs):
+        """Awaits coro_func(*args, **kwargs) inside the endpoint's limits (async counterpart of call)."""
+        bucket = await self.acquire_async(endpoint, priority)
+        throttled = False
+        try:
+            result = await coro_func(*args, **kwargs)
+            throttled = is_rate_limited(result)
+            return result
+        except Exception as e:
+            throttled = is_rate_limited(e)
+            raise
+        finally:
+            self.release(bucket, throttled)
+
+    def release(self, bucket, throttled=False):
+        with bucket.cond:
+            bucket.on_release(throttled)
+            bucket.cond.notify_all()
+        shared = self._shared.get(bucket.name)
+        if throttled and shared is not None: shared.drain()
+
+    def call(self, endpoint, func, *args, priority=None, **kwargs):
+        """Runs func(*args, **kwargs) inside the endpoint's limits, feeding rejections back into AIMD."""
+        bucket = self.acquire(endpoint, priority)
+        throttled = False
+        try:
+            result = func(*args, **kwargs)
+            throttled = is_rate_limited(result)
+            return result
+        except Exception as e:
+            throttled = is_rate_limited(e)
+            raise
+        finally:
+            self.release(bucket, throttled)
+
+    def stats(self):
+        with self._guard:
+            buckets = list(self._buckets.values())
+        out = {}
+        for b in buckets:
+            with b.cond:
+                out[b.name] = {
+                    "rate_per_sec": b.rate,
+                    "tokens": round(b.tokens, 2),
+                    "in_flight": b.in_flight,
+                    "concurrency_window": round(b.window, 2),
+                    "throttled": b.throttled,
+                    "lanes": {
+                        LANE_NAMES[p]: {
+                            "queue_depth": b.queued[p],
+                            "granted": b.granted[p],
+                            "avg_wait_ms": round(1000 * b.wait_total[p] / b.granted[p], 1) if b.granted[p] else 0.0,
+                            "max_wait_ms": round(1000 * b.wait_max[p], 1),
+                        } for p in LANE_NAMES
+                    },
+                }
+        return out
+
+
+class RateLimitedClient:
+    """Proxy that routes every method call of a broker client through the limiter."""
+
+    def __init__(self, client, limiter, endpoints, default_endpoint="default"):
+        self._client = client
+        self._limiter = limiter
+        self._endpoints = endpoints
+        self._default_endpoint = default_endpoint
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"): return attr
+        endpoint = self._endpoints.get(name, self._default_endpoint)
+
+        def limited(*args, **kwargs):
+            return self._limiter.call(endpoint, attr, *args, **kwargs)
+        return limited
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"): object.__setattr__(self, name, value)
+        else: setattr(self._client, name, value)
+
+
+# Process-wide Limiter
+limiter = RateLimiter()
+
+
+def interactive(func):
+    """Decorator: broker calls made by this handler use the interactive (priority) lane."""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with limiter.priority(PRIORITY_INTERACTIVE):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with limiter.priority(PRIORITY_INTERACTIVE):
+            return func(*args, **kwargs)
+    return wrapper
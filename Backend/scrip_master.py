@@ -1,10 +1,23 @@
 import requests
 import json
 import os
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import logging
 
+try:
+    from .search_index import SearchIndex
+    from .option_index import OptionIndex
+except ImportError:
+    from search_index import SearchIndex
+    from option_index import OptionIndex
+
+try:
+    import pyarrow.feather as feather # Optional: memory-mapped columnar cache
+except ImportError:
+    feather = None
+
 # Configure logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("ScripMaster")
@@ -12,10 +25,58 @@ logger = logging.getLogger("ScripMaster")
 SCRIP_MASTER_URL = "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json"
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SCRIP_FILE_PATH = os.path.join(BASE_DIR, "OpenAPIScripMaster.json")
+CACHE_PATH = SCRIP_FILE_PATH.replace(".json", ".feather" if feather else ".pkl")
+
+# Only the columns the app reads; low-cardinality ones are stored as categoricals
+COLUMNS = ["token", "symbol", "name", "expiry", "strike", "lotsize", "instrumenttype", "exch_seg"]
+CATEGORY_COLUMNS = ["name", "expiry", "instrumenttype", "exch_seg"]
+
+def iter_json_array(path, chunk_size=1 << 20):
+    """Yields the objects of a top-level JSON array one at a time, reading the file in chunks."""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf, pos, eof = "", 0, False
+        started = False
+        while True:
+            # Skip separators
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf) or not started:
+                if eof:
+                    return
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                if not started:
+                    start = buf.find("[")
+                    if start < 0:
+                        if eof: return
+                        continue
+                    pos, started = start + 1, True
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Object cut at the chunk boundary: read more and retry
+                if eof: raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            yield obj
+            pos = end
 
 class ScripMaster:
     _instance = None
     df = None
+    _equity_index = {} # Symbol/Name -> NSE token
+    _fno_list = [] # Memoized F&O universe
+    option_index = None # underlying -> expiries -> strike chain
+    search_index = None # Type-ahead index for /search
 
     @classmethod
     def get_instance(cls):
@@ -38,10 +99,14 @@ class ScripMaster:
 
             if should_download:
                 logger.info("Downloading latest Scrip Master...")
-                response = requests.get(SCRIP_MASTER_URL)
-                response.raise_for_status()
-                with open(SCRIP_FILE_PATH, 'wb') as f:
-                    f.write(response.content)
+                # Stream to disk instead of holding the ~100 MB body in memory
+                with requests.get(SCRIP_MASTER_URL, stream=True) as response:
+                    response.raise_for_status()
+                    tmp_path = SCRIP_FILE_PATH + ".tmp"
+                    with open(tmp_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=1 << 20):
+                            f.write(chunk)
+                    os.replace(tmp_path, SCRIP_FILE_PATH)
                 logger.info("Download complete.")
         except Exception as e:
             logger.error(f"Failed to download Scrip Master: {e}")
@@ -54,102 +119,143 @@ class ScripMaster:
             return
 
         try:
-            # Check for PICKLE cache (fast load)
-            pkl_path = SCRIP_FILE_PATH.replace(".json", ".pkl")
-            if os.path.exists(pkl_path):
+            # Binary cache (fast load): memory-mapped Feather, or Pickle without pyarrow
+            if os.path.exists(CACHE_PATH):
                  file_time = datetime.fromtimestamp(os.path.getmtime(SCRIP_FILE_PATH))
-                 pkl_time = datetime.fromtimestamp(os.path.getmtime(pkl_path))
-                 if pkl_time >= file_time:
-                      logger.info("Loading from Cached Pickle (Fast!)...")
-                      self.df = pd.read_pickle(pkl_path)
-                      logger.info(f"Loaded {len(self.df)} scrips from cache.")
-                      return
+                 cache_time = datetime.fromtimestamp(os.path.getmtime(CACHE_PATH))
+                 if cache_time >= file_time:
+                      logger.info("Loading from Cache (Fast!)...")
+                      df = self.read_cache(CACHE_PATH)
+                      # A cache written before a column was added is rebuilt from the JSON
+                      if set(COLUMNS) <= set(df.columns):
+                           self.df = df
+                           logger.info(f"Loaded {len(self.df)} scrips from cache.")
+                           self.build_indexes()
+                           return
 
             logger.info("Parsing JSON Scrip Master (Slow)...")
-            # Load with specific types to save memory
-            with open(SCRIP_FILE_PATH, 'r') as f:
-                data = json.load(f)
-                
-            self.df = pd.DataFrame(data)
+            self.df = self.parse_json(SCRIP_FILE_PATH)
             
-            # Save to Pickle for next time
+            # Save cache for next time
             logger.info("Saving cache...")
-            self.df.to_pickle(pkl_path)
+            self.write_cache(self.df, CACHE_PATH)
             
             logger.info(f"Loaded {len(self.df)} scrips.")
+            self.build_indexes()
             
         except Exception as e:
             logger.error(f"Error loading scrip data: {e}")
 
+    @staticmethod
+    def parse_json(path):
+        """Streams the scrip master and keeps only COLUMNS, in compact dtypes."""
+        cols = {c: [] for c in COLUMNS}
+        for row in iter_json_array(path):
+            for c in COLUMNS:
+                cols[c].append(row.get(c))
+
+        df = pd.DataFrame({c: pd.Categorical(cols[c]) for c in CATEGORY_COLUMNS})
+        df['symbol'] = cols['symbol']
+        df['strike'] = pd.to_numeric(pd.Series(cols['strike']), errors='coerce')
+        df['lotsize'] = pd.to_numeric(pd.Series(cols['lotsize']), errors='coerce')
+        try:
+            # Angel tokens are numeric; the API boundary converts back to str
+            df['token'] = np.array(cols['token'], dtype=np.int64)
+        except (TypeError, ValueError):
+            df['token'] = cols['token']
+        return df[COLUMNS]
+
+    @staticmethod
+    def read_cache(path):
+        if feather and path.endswith(".feather"):
+            return feather.read_table(path, memory_map=True).to_pandas()
+        return pd.read_pickle(path)
+
+    @staticmethod
+    def write_cache(df, path):
+        tmp_path = path + ".tmp"
+        if feather and path.endswith(".feather"):
+            # Uncompressed so the file can be memory-mapped
+            feather.write_feather(df.reset_index(drop=True), tmp_path, compression="uncompressed")
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+    def build_indexes(self):
+        """Builds the lookup dicts once per load so every query is a hash lookup."""
+        df = self.df
+        if df is None: return
+
+        # 1. Equity: first NSE row whose symbol is "<X>-EQ" or whose name is X
+        equity_index = {}
+        nse = df[df['exch_seg'] == 'NSE']
+        for sym, name, tok in zip(nse['symbol'], nse['name'], nse['token']):
+            tok = str(tok)
+            if isinstance(sym, str) and sym.endswith("-EQ"):
+                equity_index.setdefault(sym[:-3], tok)
+            equity_index.setdefault(name, tok)
+
+        # 2. F&O universe: NSE "-EQ" rows of every name with stock futures
+        fno_names = set(df[(df['exch_seg'] == 'NFO') & (df['instrumenttype'] == 'FUTSTK')]['name'])
+        fno_list = []
+        for sym, name, tok in zip(nse['symbol'], nse['name'], nse['token']):
+            if name in fno_names and isinstance(sym, str) and sym.endswith("-EQ"):
+                fno_list.append({"symbol": name, "token": str(tok)})
+
+        # 3. Option chains: underlying -> expiry calendar -> sorted strikes
+        opts = df[(df['exch_seg'] == 'NFO') & (df['instrumenttype'].isin(['OPTIDX', 'OPTSTK']))]
+        option_index = OptionIndex(opts['name'], opts['symbol'], opts['expiry'], opts['strike'],
+                                   opts['token'], opts['lotsize'])
+
+        self._equity_index = equity_index
+        self._fno_list = fno_list
+        self.option_index = option_index
+        self.search_index = SearchIndex(df)
+        logger.info(f"Indexed {len(equity_index)} equity keys, {len(fno_list)} F&O stocks, {len(option_index)} option underlyings.")
+
     def get_fno_tokens_for_chain(self, symbol, expiry_str, strikes, is_index=True):
         """
         Efficiently finds tokens for a list of strikes for a given expiry.
         expiry_str: e.g. "26DEC24" (Angel format)
         strikes: list of float e.g. [24000.0, 24100.0]
         """
-        if self.df is None:
+        chain = self.option_index.chain(symbol, expiry_str) if self.option_index else None
+        if chain is None:
             return {}
 
         found_tokens = {} # { "24000_CE": "token", "24000_PE": "token" ... }
-        
-        # Determine Instrument
-        inst_type = "OPTIDX" if is_index else "OPTSTK"
-        
-        # Filter DF once for this Symbol, Expiry and Type
-        # Symbol in NFO is typically "NIFTY", "SBIN"
-        mask = (self.df['exch_seg'] == 'NFO') & \
-               (self.df['name'] == symbol) & \
-               (self.df['instrumenttype'] == inst_type)
-               
-        # We can also filter by expiry if the DF has it parsed, specifically matching the symbol suffix is safer
-        # Angel Symbol format: [Name][ExpiryDay][ExpiryMonth][ExpiryYear][Strike][Type]
-        # BUT formatting that exactly is tricky.
-        # Easier Strategy: Filter master for the subset, then iterate.
-        
-        subset = self.df[mask]
-        if subset.empty:
-            return {}
-
-        # Convert to dictionary for O(1) lookup: key=symbol, value=token
-        # Problem: 'symbol' column is like "NIFTY26DEC2424000CE"
-        # We need to fuzzy match or parse.
-        
-        # Let's iterate the subset once creating a map of { strike_price_float : { 'CE': token, 'PE': token } }
-        # Note: 'strike' in JSON is usually string "24000.000000" and divided by 100 or something? 
-        # Actually checking raw JSON is best. usually it's -1 for integers.
-        # Let's trust 'strike' column provided by Angel (usually requires /100 conversion).
-        
-        for _, row in subset.iterrows():
-            try:
-                # Check Expiry Match (simplistic string match in symbol for MVP)
-                if expiry_str not in row['symbol']:
-                     continue
-
-                # Parse Type
-                otype = "CE" if row['symbol'].endswith("CE") else "PE" if row['symbol'].endswith("PE") else None
-                if not otype: continue
-                
-                # Parse Strike (Angel 'strike' is typically scaled, e.g. 2400000 -> 24000.0)
-                # Safe fallback: parse from symbol if column unreliable
-                stk_price = float(row['strike']) / 100.0 
-                
-                if stk_price in strikes:
-                     key = f"{int(stk_price)}_{otype}"
-                     found_tokens[key] = row['token']
-                     
-            except Exception:
-                continue
+        for stk_price in strikes:
+            i = chain.atm_index(float(stk_price))
+            if chain.strikes[i] != float(stk_price): continue
+            if chain.ce_tokens[i]: found_tokens[f"{int(stk_price)}_CE"] = chain.ce_tokens[i]
+            if chain.pe_tokens[i]: found_tokens[f"{int(stk_price)}_PE"] = chain.pe_tokens[i]
                 
         return found_tokens
 
+    def get_expiries(self, symbol):
+        """Sorted expiry dates with listed options for an underlying."""
+        return self.option_index.expiries(symbol) if self.option_index else []
+
+    def get_option_chain(self, symbol, expiry=None, center=None, width=5):
+        """
+        Strike window of an underlying's chain: the `width` listed strikes either side of the one
+        closest to `center` (spot for ATM). expiry: Angel string/date, or None for the nearest.
+        Returns (expiry date, [{strike, ce_token, pe_token, lot_size}]) or (None, []).
+        """
+        chain = self.option_index.chain(symbol, expiry) if self.option_index else None
+        if chain is None or center is None:
+            return (chain.expiry if chain else None), []
+        return chain.expiry, chain.window(center, width)
+
+    def search(self, q, exchange="NSE", limit=20):
+        """Ranked name/symbol search (exact > prefix > substring)."""
+        if self.search_index is None: return []
+        return self.search_index.search(q, exchange, limit)
+
     def get_equity_token(self, symbol):
         """Get NSE Equity token"""
         if self.df is None: return None
-        mask = (self.df['exch_seg'] == 'NSE') & ((self.df['symbol'] == f"{symbol}-EQ") | (self.df['name'] == symbol) )
-        res = self.df[mask]
-        if not res.empty:
-            return res.iloc[0]['token']
-        return None
+        return self._equity_index.get(symbol)
 
     def get_all_fno_tokens(self):
         """
@@ -158,29 +264,7 @@ class ScripMaster:
         """
         if self.df is None: return []
         
-        # 1. Provide unique names from NFO Futures (FUTSTK)
-        # This confirms the stock is in F&O segment
-        fno_names = self.df[
-            (self.df['exch_seg'] == 'NFO') & 
-            (self.df['instrumenttype'] == 'FUTSTK')
-        ]['name'].unique()
-        
-        # 2. Get their NSE Equity tokens
-        # It's faster to filter the DF once for all NSE Equities matching these names
-        mask = (self.df['exch_seg'] == 'NSE') & \
-               (self.df['name'].isin(fno_names)) & \
-               (self.df['symbol'].str.endswith("-EQ"))
-               
-        equity_subset = self.df[mask]
-        
-        results = []
-        for _, row in equity_subset.iterrows():
-            results.append({
-                "symbol": row['name'],
-                "token": row['token']
-            })
-            
-        return results
+        return list(self._fno_list)
 
 # Singleton usage
 # scrip_master = ScripMaster.get_instance()
@@ -0,0 +1,129 @@
+import bisect
+import threading
+import logging
+import numpy as np
+
+logger = logging.getLogger("SearchIndex")
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _base_symbol(symbol):
+    """"SBIN-EQ" -> "SBIN" so the plain ticker counts as an exact hit."""
+    return symbol.rsplit("-", 1)[0] if "-" in symbol else symbol
+
+
+class _Partition:
+    """Search structures for one exch_seg: exact dict, sorted prefix keys and a trigram index."""
+
+    def __init__(self, names, symbols, tokens):
+        self.names = names
+        self.symbols = symbols
+        self.tokens = tokens
+
+        exact = {}
+        by_key = {}
+        postings = {}
+        for i, (name, sym) in enumerate(zip(names, symbols)):
+            for key in {name, sym, _base_symbol(sym)}:
+                if key: exact.setdefault(key, []).append(i)
+            for key in {name, sym}:
+                if key: by_key.setdefault(key, []).append(i)
+            for tg in _trigrams(name) | _trigrams(sym):
+                postings.setdefault(tg, []).append(i)
+
+        self.exact = exact
+        self.keys = sorted(by_key) # Sorted prefix array
+        self.key_rows = [by_key[k] for k in self.keys]
+        # Row ids are appended in order, so every posting list is already sorted
+        self.postings = {tg: np.array(ids, dtype=np.int32) for tg, ids in postings.items()}
+
+    def prefix_rows(self, q, skip, limit):
+        """Rows whose name/symbol starts with q, in key order; stops after `limit`."""
+        out = []
+        i = bisect.bisect_left(self.keys, q)
+        while i < len(self.keys) and self.keys[i].startswith(q):
+            for row in self.key_rows[i]:
+                if row not in skip:
+                    skip.add(row)
+                    out.append(row)
+            if len(out) >= limit: break
+            i += 1
+        return out
+
+    def substring_rows(self, q, skip, limit):
+        if len(q) >= 3:
+            lists = sorted((self.postings.get(tg) for tg in _trigrams(q)), key=lambda a: -1 if a is None else len(a))
+            if lists[0] is None: return []
+            cand = lists[0]
+            for arr in lists[1:]:
+                cand = np.intersect1d(cand, arr, assume_unique=True)
+                if len(cand) == 0: return []
+            candidates = cand.tolist()
+        else:
+            candidates = range(len(self.names)) # Too short for trigrams: plain scan with early stop
+        out = []
+        for i in candidates:
+            if i in skip: continue
+            if q in self.names[i] or q in self.symbols[i]:
+                out.append(i)
+                if len(out) >= limit: break
+        return out
+
+
+class SearchIndex:
+    """
+    In-memory type-ahead index over scrip `name` and `symbol`, partitioned by exch_seg.
+    Results are ranked exact > prefix > substring; prefix hits come in key order, the
+    other tiers in scrip master order.
+    Partitions are built on first use (NSE/BSE are warmed at load).
+    """
+
+    def __init__(self, df, warm=("NSE", "BSE")):
+        self._rows = {} # exch_seg -> (NAMES, SYMBOLS, tokens) upper-cased for matching
+        self._display = {} # exch_seg -> (names, symbols) as stored, for the response
+        seg = df['exch_seg'].astype(str).to_numpy()
+        order = np.argsort(seg, kind="stable")
+        seg = seg[order]
+        names = df['name'].astype(object).fillna("").astype(str).to_numpy()[order]
+        symbols = df['symbol'].astype(object).fillna("").astype(str).to_numpy()[order]
+        tokens = df['token'].astype(str).to_numpy()[order]
+        for ex in np.unique(seg):
+            lo, hi = np.searchsorted(seg, ex, "left"), np.searchsorted(seg, ex, "right")
+            disp_names, disp_symbols = names[lo:hi].tolist(), symbols[lo:hi].tolist()
+            self._display[str(ex)] = (disp_names, disp_symbols)
+            self._rows[str(ex)] = ([n.upper() for n in disp_names], [s.upper() for s in disp_symbols], tokens[lo:hi].tolist())
+
+        self._partitions = {}
+        self._lock = threading.Lock()
+        for ex in warm:
+            self._partition(ex)
+
+    def _partition(self, exchange):
+        part = self._partitions.get(exchange)
+        if part is not None: return part
+        with self._lock:
+            part = self._partitions.get(exchange)
+            if part is None and exchange in self._rows:
+                part = _Partition(*self._rows[exchange])
+                self._partitions[exchange] = part
+                logger.info(f"Search index for {exchange}: {len(part.names)} scrips, {len(part.postings)} trigrams")
+        return part
+
+    def search(self, q, exchange="NSE", limit=20):
+        """Returns up to `limit` [{'name', 'token', 'symbol'}] records for the query."""
+        q = (q or "").strip().upper()
+        part = self._partition(exchange)
+        if not q or part is None: return []
+
+        ranked = sorted(set(part.exact.get(q, [])))
+        seen = set(ranked)
+        if len(ranked) < limit:
+            ranked += part.prefix_rows(q, seen, limit - len(ranked))
+        if len(ranked) < limit:
+            ranked += part.substring_rows(q, seen, limit - len(ranked))
+
+        names, symbols = self._display[exchange]
+        return [{"name": names[i], "token": part.tokens[i], "symbol": symbols[i]} for i in ranked[:limit]]
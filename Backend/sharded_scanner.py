@@ -0,0 +1,244 @@
+import json
+import time
+import atexit
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+import httpx
+
+try:
+    from . import metrics_engine
+    from .candle_store import CandleStore
+    from .rate_limiter import limiter
+    from .broker.angel_async import ROUTES
+    from .broker.upstox import UpstoxBroker
+except ImportError:
+    import metrics_engine
+    from candle_store import CandleStore
+    from rate_limiter import limiter
+    from broker.angel_async import ROUTES
+    from broker.upstox import UpstoxBroker
+
+logger = logging.getLogger("ShardedScanner")
+
+# Endpoint classes the workers call; their budget is shared with the API process
+SHARED_ENDPOINTS = ("historical", "upstox")
+
+# One row per symbol: the compute_panel outputs for that symbol, plus the ATH it was scanned with
+_fields = [("ok", "?"), ("ath", "f8"), ("new_ath_found", "f8")]
+_fields += [(f, "f8") for f in ("c0", "day_h", "day_l", "change_current", "change_1d", "change_2d",
+                                "change_3d", "avg_3d", "cur_rsi", "h_val", "h_prev", "new_ath")]
+_fields += [("bulls", "i8"), ("score", "i8"), ("breakout_all", "?"), ("buyers", "?", (4,))]
+for _p in metrics_engine.BREAKOUT_PERIODS:
+    _fields += [(f"high_{_p}", "f8"), (f"low_{_p}", "f8"), (f"bo_{_p}", "i1")]
+RESULT_DTYPE = np.dtype(_fields)
+
+_PANEL_FIELDS = ("c0", "day_h", "day_l", "change_current", "change_1d", "change_2d", "change_3d",
+                 "avg_3d", "cur_rsi", "h_val", "h_prev", "new_ath", "bulls", "score", "breakout_all", "buyers")
+
+
+def to_result(arr):
+    """Shared result rows -> a compute_panel-shaped dict, ready for metrics_engine.core_rows."""
+    return {
+        "valid": arr["ok"],
+        **{f: arr[f] for f in _PANEL_FIELDS},
+        "levels": {f"{side}_{p}": arr[f"{side}_{p}"] for p in metrics_engine.BREAKOUT_PERIODS for side in ("high", "low")},
+        "breakouts": {p: arr[f"bo_{p}"] for p in metrics_engine.BREAKOUT_PERIODS},
+    }
+
+
+# --- Worker process ---
+
+_candle_store = None
+_upstox = None
+_http = None
+
+
+def _init_worker(shared_buckets):
+    global _candle_store, _upstox, _http
+    for endpoint, bucket in shared_buckets.items():
+        limiter.share(endpoint, bucket)
+    _candle_store = CandleStore.get_instance()
+    _upstox = UpstoxBroker()
+    _http = httpx.Client(timeout=10.0)
+
+
+def _fetch_daily(symbol, token, session, from_dt, to_dt):
+    """Same failover as the in-process scanner: Upstox first, then Angel One."""
+    fmt = "%Y-%m-%d %H:%M"
+    if session.get("upstox_token"):
+        try:
+            _upstox.access_token = session["upstox_token"]
+            data = _upstox.get_historical_data(symbol, "1d", from_date=from_dt.strftime("%Y-%m-%d"), to_date=to_dt.strftime("%Y-%m-%d"))
+            if data: return data
+        except Exception as e:
+            print(f"Upstox Error {symbol}: {e}")
+    try:
+        params = {"exchange": "NSE", "symboltoken": token, "interval": "ONE_DAY",
+                  "fromdate": from_dt.strftime(fmt), "todate": to_dt.strftime(fmt)}
+        r = limiter.call("historical", _http.post, session["root"] + ROUTES["getCandleData"],
+                         content=json.dumps(params), headers=session["headers"])
+        res = r.json()
+        if res and res.get('data'): return res['data']
+    except Exception as e:
+        print(f"Angel Error {symbol}: {e}")
+    return None
+
+
+def _scan_shard(shm_name, capacity, shard, session):
+    """
+    Syncs and scores one shard of the universe, writing each symbol's row of the shared
+    result array. shard: [(row, symbol, token, ath_val, has_ath)]. Returns the rows written.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    out = np.ndarray((capacity,), dtype=RESULT_DTYPE, buffer=shm.buf)
+    try:
+        out["ok"][[s[0] for s in shard]] = False
+        rows, histories, aths, found = [], [], [], []
+        now = time.time()
+        for row, sym, tok, ath_val, has_ath in shard:
+            try:
+                hist = _candle_store.sync(tok, lambda f, t: _fetch_daily(sym, tok, session, f, t), days=400)
+            except Exception as e:
+                print(f"Process Error {sym}: {e}")
+                continue
+            if not hist or len(hist) < 5 or not metrics_engine.is_fresh(hist): continue
+            new_ath_found = 0
+            if not has_ath:
+                # Store is seeded with ~15 years on first sync
+                max_h = _candle_store.all_time_high(tok)
+                if max_h > ath_val: ath_val = new_ath_found = max_h
+            rows.append(row)
+            histories.append(hist)
+            aths.append(ath_val)
+            found.append(new_ath_found)
+        if not rows: return 0
+
+        panel, lengths = metrics_engine.build_panel(histories)
+        res = metrics_engine.compute_panel(panel, lengths, aths)
+        if "c0" not in res: return 0
+        idx = np.asarray(rows)
+        for f in _PANEL_FIELDS:
+            out[f][idx] = res[f]
+        for name, arr in res["levels"].items():
+            out[name][idx] = arr
+        for p, arr in res["breakouts"].items():
+            out[f"bo_{p}"][idx] = arr
+        out["ath"][idx] = aths
+        out["new_ath_found"][idx] = found
+        out["ok"][idx] = res["valid"] # Last, so a row is only marked once it is complete
+        logger.debug(f"Shard of {len(shard)} scored in {time.time() - now:.2f}s")
+        return int(res["valid"].sum())
+    finally:
+        del out # Release the buffer before closing the mapping
+        shm.close()
+
+
+# --- API process ---
+
+class ShardedScanner:
+    """
+    Process-pool scan mode: the symbol universe is split into shards, each worker syncs its
+    symbols' daily candles (local Candle Store first, broker for the missing tail) and runs
+    the vectorized metrics, then writes the results into a shared-memory array that the API
+    process reads without pickling. Broker calls from every process draw from one shared
+    rate budget. Enabled with SCANNER_PROCESSES=<workers>; the server must be started as
+    `uvicorn main:app` (spawned workers re-import the __main__ script).
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls, workers=None):
+        if cls._instance is None:
+            cls._instance = ShardedScanner(workers)
+        return cls._instance
+
+    def __init__(self, workers=None, shards_per_worker=4):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.shards_per_worker = shards_per_worker # More shards than workers evens out slow symbols
+        self._ctx = multiprocessing.get_context("spawn") # Workers must not inherit broker sockets/threads
+        # The API process joins the same budget, so its own calls count against it too
+        self._buckets = limiter.shared_buckets(SHARED_ENDPOINTS, self._ctx)
+        self._pool = None
+        self._shm = None
+        self._capacity = 0
+        self.scans = 0
+        self.shard_errors = 0
+        self.last_scan_sec = 0.0
+        self.last_rows = 0
+        atexit.register(self.close)
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._ctx,
+                                             initializer=_init_worker, initargs=(self._buckets,))
+        return self._pool
+
+    def _results(self, n):
+        """Shared result array with room for n symbols (grown, never shrunk)."""
+        if self._shm is None or n > self._capacity:
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+            self._capacity = max(n, 2 * self._capacity)
+            self._shm = shared_memory.SharedMemory(create=True, size=self._capacity * RESULT_DTYPE.itemsize)
+        return np.ndarray((self._capacity,), dtype=RESULT_DTYPE, buffer=self._shm.buf)
+
+    def scan(self, items, session):
+        """
+        items: [(symbol, token, ath_val, has_ath)]. session: {"root", "headers", "upstox_token"}
+        for the workers' broker calls. Returns [(symbol, token, core, ath_val, new_ath_found)]
+        for every symbol with fresh data, core being a metrics_engine.core_rows entry.
+        """
+        start = time.time()
+        n = len(items)
+        if not n: return []
+        out = self._results(n)
+        out["ok"][:n] = False
+        rows = [(i, sym, tok, float(ath), bool(has)) for i, (sym, tok, ath, has) in enumerate(items)]
+        n_shards = min(n, self.workers * self.shards_per_worker)
+        shards = [rows[k::n_shards] for k in range(n_shards)] # Interleaved: priority symbols spread out
+
+        pool = self._executor()
+        futures = [pool.submit(_scan_shard, self._shm.name, self._capacity, shard, session) for shard in shards]
+        for f in futures:
+            try:
+                f.result()
+            except BrokenProcessPool as e:
+                logger.error(f"Scanner worker died: {e}")
+                self.shard_errors += 1
+                if self._pool is not None:
+                    # Reap the surviving workers and queues; a new pool is made on the next scan
+                    self._pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = None
+            except Exception as e:
+                logger.error(f"Shard failed: {e}")
+                self.shard_errors += 1
+
+        arr = np.array(out[:n]) # Copy out so the next scan can reuse the buffer
+        del out
+        cores = metrics_engine.core_rows(to_result(arr), arr["ath"].tolist())
+        found = arr["new_ath_found"].tolist()
+        results = [(sym, tok, core, arr["ath"][i].item(), found[i])
+                   for i, ((sym, tok, _, _), core) in enumerate(zip(items, cores)) if core is not None]
+        self.scans += 1
+        self.last_rows = len(results)
+        self.last_scan_sec = time.time() - start
+        return results
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def stats(self):
+        return {"workers": self.workers, "scans": self.scans, "shard_errors": self.shard_errors,
+                "last_rows": self.last_rows, "last_scan_sec": round(self.last_scan_sec, 2),
+                "result_capacity": self._capacity}
@@ -0,0 +1,155 @@
+import abc
+import logging
+import pandas as pd
+import pandas_ta as ta
+
+logger = logging.getLogger("StrategyEngine")
+
+
+# --- Indicators ---
+# Spec tuples ("name", *params) -> builder(close, *params). A spec is computed at most once per frame.
+
+def _macd(close, fast, slow, signal):
+    macd = ta.macd(close, fast=fast, slow=slow, signal=signal)
+    # Handle cases where MACD calculation fails (e.g. not enough data)
+    if macd is None or macd.empty: return None
+    suffix = f"{fast}_{slow}_{signal}"
+    return {"MACD": macd[f"MACD_{suffix}"], "MACD_SIGNAL": macd[f"MACDs_{suffix}"], "MACD_HIST": macd[f"MACDh_{suffix}"]}
+
+
+INDICATORS = {
+    "macd": _macd,
+    "sma": lambda close, length: ta.sma(close, length=length),
+    "rsi": lambda close, length: ta.rsi(close, length=length),
+    "pct": lambda close, periods: close.pct_change(periods=periods) * 100, # N-bar return in %
+}
+
+
+class SymbolFrame:
+    """
+    One symbol's candles, prepared once for every strategy: `date` parsed, `close` as float,
+    indicators and intraday session windows computed on first use and then shared.
+    """
+
+    def __init__(self, df):
+        df = df.copy()
+        df['date'] = pd.to_datetime(df['date'])
+        df['close'] = df['close'].astype(float)
+        self.df = df
+        self._indicators = {}
+        self._day = None
+        self._time = None
+        self._sessions = None
+        self._windows = {}
+
+    def __len__(self):
+        return len(self.df)
+
+    def indicator(self, spec):
+        """Indicator for a spec like ("macd", 12, 26, 9) or ("sma", 20): a Series, a dict of Series, or None."""
+        if spec not in self._indicators:
+            name, *params = spec
+            self._indicators[spec] = INDICATORS[name](self.df['close'], *params)
+        return self._indicators[spec]
+
+    def sessions(self):
+        """Trading days present in the frame, sorted."""
+        if self._sessions is None:
+            self._day = self.df['date'].dt.date
+            self._time = self.df['date'].dt.time
+            self._sessions = sorted(self._day.unique())
+        return self._sessions
+
+    def window(self, day, start, end):
+        """Index of the rows of `day` between `start` and `end` (inclusive)."""
+        key = (day, start, end)
+        if key not in self._windows:
+            self.sessions()
+            mask = (self._day == day) & (self._time >= start) & (self._time <= end)
+            self._windows[key] = self.df.index[mask]
+        return self._windows[key]
+
+
+# --- Registry ---
+
+STRATEGIES = {} # name -> strategy class
+
+
+def register(cls):
+    """Class decorator: adds a strategy to the registry the engine runs."""
+    STRATEGIES[cls.name] = cls
+    return cls
+
+
+class Strategy(abc.ABC):
+    """
+    Base for registered strategies. Subclasses set `name`, `timeframe` ("5m" intraday or
+    "1d" daily), `min_rows` and `indicators` (the spec tuples they read), and implement
+    evaluate(frame) -> result dict or None.
+    """
+    name = None
+    timeframe = "5m"
+    min_rows = 0
+    indicators = ()
+
+    @abc.abstractmethod
+    def evaluate(self, frame):
+        """Result dict for the frame, or None when the setup is absent."""
+
+    def perform_analysis(self, df: pd.DataFrame) -> dict:
+        """Standalone run on one DataFrame (builds its own frame)."""
+        if df.empty or len(df) < self.min_rows:
+            return None
+        return self.evaluate(SymbolFrame(df))
+
+
+class StrategyEngine:
+    """
+    Runs every registered strategy of a timeframe over one shared SymbolFrame per symbol:
+    the union of their indicators is computed once, then each strategy only reads it.
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = StrategyEngine()
+        return cls._instance
+
+    def __init__(self):
+        self._strategies = {}
+        self.runs = 0
+        self.errors = 0
+
+    def strategies(self, timeframe):
+        # Instantiated lazily so strategies registered after startup are picked up
+        for name, cls in STRATEGIES.items():
+            if name not in self._strategies:
+                self._strategies[name] = cls()
+        return [s for s in self._strategies.values() if s.timeframe == timeframe]
+
+    def run(self, df, timeframe="5m"):
+        """{strategy name: result dict or None} for every registered strategy of the timeframe."""
+        strategies = self.strategies(timeframe)
+        out = {s.name: None for s in strategies}
+        eligible = [s for s in strategies if not df.empty and len(df) >= s.min_rows]
+        if not eligible: return out
+
+        frame = SymbolFrame(df)
+        for spec in {spec for s in eligible for spec in s.indicators}:
+            frame.indicator(spec)
+        for s in eligible:
+            try:
+                out[s.name] = s.evaluate(frame)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"{s.name} failed: {e}")
+        self.runs += 1
+        return out
+
+    def stats(self):
+        return {
+            "strategies": {n: {"timeframe": c.timeframe, "indicators": [list(i) for i in c.indicators]} for n, c in STRATEGIES.items()},
+            "runs": self.runs,
+            "errors": self.errors,
+        }
@@ -1,44 +1,48 @@
 import pandas as pd
-import pandas_ta as ta
 import logging
 
-class SwingStrategy:
+try:
+    from .strategy_engine import Strategy, register
+except ImportError:
+    from strategy_engine import Strategy, register
+
+SMA_20, SMA_50, RSI = ("sma", 20), ("sma", 50), ("rsi", 14)
+MACD = ("macd", 12, 26, 9)
+PCT_3D, PCT_5D, PCT_10D = ("pct", 3), ("pct", 5), ("pct", 10)
+
+@register
+class SwingStrategy(Strategy):
+    name = "swing"
+    timeframe = "1d"
+    min_rows = 55 # Need enough data for 50 DMA
+    indicators = (SMA_20, SMA_50, RSI, MACD, PCT_3D, PCT_5D, PCT_10D)
+
     def __init__(self):
         self.logger = logging.getLogger("SwingStrategy")
 
-    def perform_analysis(self, df: pd.DataFrame) -> dict:
+    def evaluate(self, frame) -> dict:
         """
-        Analyzes a single stock dataframe (Daily Timeframe) for Swing setups.
-        df requires: 'open', 'high', 'low', 'close', 'volume', 'date' (or index as date)
+        Analyzes a single stock (Daily Timeframe) for Swing setups.
+        frame: SymbolFrame over 'open', 'high', 'low', 'close', 'volume', 'date' candles
         """
-        if df.empty or len(df) < 55: # Need enough data for 50 DMA
+        df = frame.df
+        macd = frame.indicator(MACD)
+        if macd is None:
             return None
 
-        # Clean and Prepare
-        df = df.copy()
-        df['close'] = df['close'].astype(float)
-        
-        # Calculate Indicators
-        # 1. Moving Averages
-        df['SMA_20'] = ta.sma(df['close'], length=20)
-        df['SMA_50'] = ta.sma(df['close'], length=50)
-        
-        # 2. RSI
-        df['RSI'] = ta.rsi(df['close'], length=14)
-        
-        # 3. MACD
-        macd = ta.macd(df['close'])
-        df['MACD'] = macd['MACD_12_26_9']
-        df['MACD_SIGNAL'] = macd['MACDs_12_26_9']
-        df['MACD_HIST'] = macd['MACDh_12_26_9']
-        
-        # 4. Momentum (N-Day Returns)
-        df['3D_Pct'] = df['close'].pct_change(periods=3) * 100
-        df['5D_Pct'] = df['close'].pct_change(periods=5) * 100
-        df['10D_Pct'] = df['close'].pct_change(periods=10) * 100
-        
-        # Current Candle (Latest)
-        curr = df.iloc[-1]
+        # Current Candle (Latest), with the shared indicators' last values
+        curr = {
+            'close': df['close'].iloc[-1],
+            'SMA_20': frame.indicator(SMA_20).iloc[-1],
+            'SMA_50': frame.indicator(SMA_50).iloc[-1],
+            'RSI': frame.indicator(RSI).iloc[-1],
+            'MACD': macd['MACD'].iloc[-1],
+            'MACD_SIGNAL': macd['MACD_SIGNAL'].iloc[-1],
+            'MACD_HIST': macd['MACD_HIST'].iloc[-1],
+            '3D_Pct': frame.indicator(PCT_3D).iloc[-1],
+            '5D_Pct': frame.indicator(PCT_5D).iloc[-1],
+            '10D_Pct': frame.indicator(PCT_10D).iloc[-1],
+        }
         
         # --- LOGIC ---
         
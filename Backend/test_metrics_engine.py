@@ -0,0 +1,78 @@
+"""
+Equivalence check: calculate_metrics_batch (vectorized panel) vs calculate_metrics (per symbol).
+Run from Backend/: python test_metrics_engine.py [seed]
+"""
+import sys
+import math
+import random
+from datetime import datetime, timedelta
+
+import main
+
+
+def make_history(n, kind, today):
+    p = random.uniform(10, 5000)
+    hist = []
+    for d in range(n):
+        dt = today - timedelta(days=n - 1 - d)
+        if kind == "flat":
+            o = h = l = c = round(p, 2)
+        else:
+            o = round(p * random.uniform(0.98, 1.02), 2)
+            c = round(p * random.uniform(0.97, 1.03), 2)
+            h = round(max(o, c) * random.uniform(1, 1.02), 2)
+            l = round(min(o, c) * random.uniform(0.98, 1), 2)
+            p = c
+        if kind == "int": o, h, l, c = int(o), int(h), int(l), int(c)
+        hist.append([dt.strftime("%Y-%m-%dT00:00:00+05:30"), o, h, l, c, random.randint(1000, 10**7)])
+    if kind == "zero_close": hist[-2][4] = 0.0 # Previous close of 0: calculate_metrics returns None
+    if kind == "malformed": hist[-3] = hist[-3][:4] # Truncated candle: the batch must fall back, not raise
+    return hist
+
+
+def make_items(count, today):
+    items = []
+    for k in range(count):
+        n = random.choice([3, 4, 5, 6, 12, 13, 14, 15, 16, 30, 52, 60, 101, 102, 251, 252, 399, 400])
+        kind = random.choices(["normal", "flat", "int", "zero_close"], weights=[85, 5, 5, 5])[0]
+        hist = make_history(n, kind, today)
+        ath = random.choice([0, 0, hist[-1][4] * 0.9, hist[-1][4] * 1.5, max(x[2] for x in hist)])
+        items.append((f"S{k}", str(k), hist, ath, None))
+    return items
+
+
+def compare(items):
+    ref = [main.calculate_metrics(*it) for it in items]
+    got = main.calculate_metrics_batch(items)
+    bad = 0
+    for it, r, g in zip(items, ref, got):
+        if r is None or g is None:
+            if (r is None) != (g is None):
+                bad += 1
+                print(f"None mismatch {it[0]} ({len(it[2])} candles): per-symbol={r is not None} batch={g is not None}")
+            continue
+        for key in r:
+            if key in ("scan_time", "scan_full_time"): continue
+            a, b = r[key], g.get(key)
+            if key in ("breakout_times", "strategy_hits"): # Without a time finder these are stamped "now"
+                a, b = sorted(a), sorted(b)
+            if a != b and not (isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b)):
+                bad += 1
+                print(f"{it[0]} {key}: per-symbol={a!r} batch={b!r}")
+    return bad, sum(x is not None for x in ref)
+
+
+if __name__ == "__main__":
+    random.seed(int(sys.argv[1]) if len(sys.argv) > 1 else 1)
+    today = datetime.now()
+    items = make_items(300, today)
+
+    bad, valid = compare(items)
+    print(f"Batch vs per-symbol: {bad} mismatches over {len(items)} symbols ({valid} scored)")
+
+    # One malformed history in the batch: every other symbol must still be scored
+    items.append(("BAD", "0", make_history(30, "malformed", today), 0, None))
+    bad_fallback, _ = compare(items)
+    print(f"With a malformed history: {bad_fallback} mismatches")
+
+    sys.exit(1 if bad or bad_fallback else 0)
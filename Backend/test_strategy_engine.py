@@ -0,0 +1,90 @@
+"""
+Equivalence check: StrategyEngine (one shared indicator frame per symbol) vs the standalone
+MACD, Bearish MACD and Swing strategies from before the engine existed.
+The reference modules are read from git, at the parent of the commit that added strategy_engine.py
+(or at REV). Run from Backend/: python test_strategy_engine.py [REV]
+"""
+import sys
+import types
+import subprocess
+import numpy as np
+from datetime import datetime, timedelta
+
+from bar_aggregator import candles_frame
+from strategy_engine import StrategyEngine
+from macd_strategy import MACDStrategy
+from bearish_macd_strategy import BearishMACDStrategy
+from swing_strategy import SwingStrategy
+
+# Registry name -> (module, class) of the pre-engine implementation
+REFERENCES = {
+    "macd": ("macd_strategy", "MACDStrategy"),
+    "bearish_macd": ("bearish_macd_strategy", "BearishMACDStrategy"),
+    "swing": ("swing_strategy", "SwingStrategy"),
+}
+
+
+def git(*args):
+    return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+
+
+def load_references(rev=None):
+    if rev is None:
+        added = git("log", "--diff-filter=A", "--format=%H", "--", "strategy_engine.py").splitlines()[-1]
+        rev = added + "^"
+    refs = {}
+    for name, (module, cls) in REFERENCES.items():
+        mod = types.ModuleType(f"reference_{module}")
+        exec(git("show", f"{rev}:./{module}.py"), mod.__dict__)
+        refs[name] = getattr(mod, cls)()
+    return rev, refs
+
+
+def intraday_frame(rng, calm):
+    rows = []
+    for d in range(4):
+        day = datetime(2026, 10, 12) + timedelta(days=d)
+        p = 100 + rng.normal(0, 0.3)
+        for i in range(75):
+            p += rng.normal(0, 0.02 if calm else 0.3)
+            ts = (day + timedelta(hours=9, minutes=15 + 5 * i)).strftime("%Y-%m-%dT%H:%M:%S+05:30")
+            rows.append([ts, p, p + 0.1, p - 0.1, p, 100])
+    return candles_frame(rows)
+
+
+def daily_frame(rng):
+    rows = []
+    for i in range(120):
+        ts = (datetime(2026, 1, 1) + timedelta(days=i)).strftime("%Y-%m-%dT00:00:00+05:30")
+        rows.append([ts, 100 + i * 0.1, 101 + i * 0.1 + rng.random(), 99 + i * 0.1, 100 + i * 0.1 + rng.normal(0, 2), 1000])
+    return candles_frame(rows)
+
+
+def same(a, b):
+    """Result dicts equal field by field (NaN == NaN)."""
+    if a is None or b is None: return a is b
+    return a.keys() == b.keys() and all(a[k] == b[k] or (a[k] != a[k] and b[k] != b[k]) for k in a)
+
+
+if __name__ == "__main__":
+    rev, refs = load_references(sys.argv[1] if len(sys.argv) > 1 else None)
+    engine = StrategyEngine()
+    standalone = {"macd": MACDStrategy(), "bearish_macd": BearishMACDStrategy(), "swing": SwingStrategy()}
+    rng = np.random.default_rng(3)
+    hits = {name: 0 for name in REFERENCES}
+    bad = 0
+
+    for trial in range(300):
+        for timeframe, df in (("5m", intraday_frame(rng, trial % 2)), ("1d", daily_frame(rng))):
+            out = engine.run(df, timeframe)
+            for name, ref in refs.items():
+                if name not in out: continue
+                expected = ref.perform_analysis(df)
+                if expected: hits[name] += 1
+                for label, got in (("engine", out[name]), ("standalone", standalone[name].perform_analysis(df))):
+                    if not same(expected, got):
+                        bad += 1
+                        print(f"{name} ({label}): reference={expected} got={got}")
+
+    print(f"Reference {rev}: {bad} mismatches over 300 trials, setups found {hits}, engine errors {engine.errors}")
+    sys.exit(1 if bad or engine.errors else 0)
@@ -0,0 +1,193 @@
+import time
+import threading
+import logging
+import numpy as np
+
+logger = logging.getLogger("TickPipeline")
+
+TICK_DTYPE = np.dtype([
+    ("token", "i8"),
+    ("ltp", "f8"), # Rupees (Angel sends paise)
+    ("volume", "i8"), # -1 when the tick carries no volume
+    ("ts", "f8"), # time.monotonic() at receipt
+])
+
+
+class TickPipeline:
+    """
+    WebSocket ticks -> preallocated ring buffer -> applier thread. The socket callback only
+    writes one slot; the applier drains in batches, keeps the latest tick per token, updates
+    array-backed per-token state and hands the batch to `apply_func` once. When the ring is
+    full the oldest ticks are overwritten (and counted as dropped).
+
+    apply_func(ticks) receives [(token str, ltp, volume or None, batch high, batch low)],
+    one entry per token.
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls, apply_func=None):
+        if cls._instance is None:
+            cls._instance = TickPipeline(apply_func)
+        return cls._instance
+
+    def __init__(self, apply_func=None, capacity=1 << 16, max_batch=8192, interval=0.05):
+        self.apply_func = apply_func
+        self.capacity = capacity
+        self.max_batch = max_batch
+        self.interval = interval # Applier wake-up period (batching window)
+        self._ring = np.zeros(capacity, dtype=TICK_DTYPE)
+        self._head = 0 # Next slot to write (total ticks pushed)
+        self._tail = 0 # Next slot to read (total ticks consumed or dropped)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        # Per-token state, array-backed: token -> slot
+        self._slots = {}
+        self.tokens = np.zeros(1024, dtype=np.int64)
+        self.ltp = np.zeros(1024, dtype=np.float64)
+        self.volume = np.full(1024, -1, dtype=np.int64)
+        self.last_ts = np.zeros(1024, dtype=np.float64)
+        self.tick_count = np.zeros(1024, dtype=np.int64)
+        # Counters
+        self.received = 0
+        self.dropped = 0
+        self.invalid = 0
+        self.applied = 0
+        self.batches = 0
+        self.apply_errors = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self._rate_t0 = time.monotonic()
+        self._rate_n0 = 0
+        self.ticks_per_sec = 0.0
+
+    # --- Producer (WebSocket thread) ---
+
+    def push(self, token, ltp_paise, volume=None):
+        try:
+            tok = int(token)
+        except (TypeError, ValueError):
+            self.invalid += 1
+            return
+        with self._lock:
+            self._ring[self._head % self.capacity] = (tok, ltp_paise / 100.0, -1 if volume is None else volume, time.monotonic())
+            self._head += 1
+            self.received += 1
+            if self._head - self._tail > self.capacity:
+                # Overwrote the oldest unread tick
+                self.dropped += self._head - self._tail - self.capacity
+                self._tail = self._head - self.capacity
+
+    # --- Consumer (applier thread) ---
+
+    def _slot(self, tok):
+        i = self._slots.get(tok)
+        if i is None:
+            i = len(self._slots)
+            if i == len(self.tokens):
+                n = 2 * len(self.tokens)
+                self.tokens = np.resize(self.tokens, n)
+                self.ltp = np.resize(self.ltp, n)
+                self.volume = np.concatenate([self.volume, np.full(n - i, -1, dtype=np.int64)])
+                self.last_ts = np.resize(self.last_ts, n)
+                self.tick_count = np.concatenate([self.tick_count, np.zeros(n - i, dtype=np.int64)])
+            self._slots[tok] = i
+            self.tokens[i] = tok
+        return i
+
+    def drain(self):
+        """
+        Takes up to max_batch pending ticks, coalesced per token. Returns (latest ticks array,
+        highest ltp, lowest ltp) per token, so intra-batch extremes are not lost.
+        """
+        with self._lock:
+            n = min(self._head - self._tail, self.max_batch)
+            if n <= 0: return self._ring[:0].copy(), np.empty(0), np.empty(0)
+            start = self._tail % self.capacity
+            end = start + n
+            if end <= self.capacity:
+                batch = self._ring[start:end].copy()
+            else:
+                batch = np.concatenate([self._ring[start:], self._ring[:end - self.capacity]])
+            self._tail += n
+
+        now = time.monotonic()
+        self.last_lag_ms = float(now - batch["ts"][0]) * 1000.0
+        self.max_lag_ms = max(self.max_lag_ms, self.last_lag_ms)
+
+        # Group by token (stable sort keeps arrival order): latest tick, count and range per token
+        order = np.argsort(batch["token"], kind="stable")
+        toks = batch["token"][order]
+        starts = np.flatnonzero(np.r_[True, toks[1:] != toks[:-1]])
+        ends = np.r_[starts[1:], len(toks)]
+        prices = batch["ltp"][order]
+        latest = batch[order[ends - 1]]
+        highs = np.maximum.reduceat(prices, starts)
+        lows = np.minimum.reduceat(prices, starts)
+        for t, n in zip(latest, ends - starts):
+            i = self._slot(int(t["token"]))
+            self.ltp[i] = t["ltp"]
+            if t["volume"] >= 0: self.volume[i] = t["volume"]
+            self.last_ts[i] = t["ts"]
+            self.tick_count[i] += n
+        return latest, highs, lows
+
+    def apply_once(self):
+        latest, highs, lows = self.drain()
+        if not len(latest): return 0
+        ticks = [(str(int(t)), float(p), None if v < 0 else int(v), float(h), float(l))
+                 for t, p, v, h, l in zip(latest["token"], latest["ltp"], latest["volume"], highs, lows)]
+        try:
+            if self.apply_func: self.apply_func(ticks)
+        except Exception as e:
+            self.apply_errors += 1
+            logger.error(f"Tick apply error: {e}")
+        self.applied += len(ticks)
+        self.batches += 1
+        return len(ticks)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                while self.apply_once() >= self.max_batch or self._head - self._tail >= self.max_batch:
+                    pass # Backlog: keep draining without sleeping
+            except Exception as e:
+                logger.error(f"Tick applier error: {e}")
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True, name="TickApplier")
+            self._thread.start()
+
+    def last(self, token):
+        """Latest (ltp, volume, monotonic ts) applied for a token, or None."""
+        i = self._slots.get(int(token))
+        if i is None: return None
+        return float(self.ltp[i]), (None if self.volume[i] < 0 else int(self.volume[i])), float(self.last_ts[i])
+
+    def stats(self):
+        now = time.monotonic()
+        if now - self._rate_t0 >= 1.0:
+            self.ticks_per_sec = (self.received - self._rate_n0) / (now - self._rate_t0)
+            self._rate_t0, self._rate_n0 = now, self.received
+        with self._lock:
+            pending = self._head - self._tail
+            oldest = float(self._ring[self._tail % self.capacity]["ts"]) if pending else None
+        return {
+            "received": self.received,
+            "applied": self.applied,
+            "pending": pending,
+            "dropped": self.dropped,
+            "invalid": self.invalid,
+            "batches": self.batches,
+            "avg_batch": round(self.applied / self.batches, 1) if self.batches else 0.0,
+            "ticks_per_sec": round(self.ticks_per_sec, 1),
+            "queue_lag_ms": round((now - oldest) * 1000.0, 1) if oldest is not None else 0.0,
+            "last_batch_lag_ms": round(self.last_lag_ms, 1),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "tokens": len(self._slots),
+            "apply_errors": self.apply_errors,
+        }
@@ -0,0 +1,160 @@
+import os
+import json
+import sqlite3
+import time
+import atexit
+import threading
+import logging
+
+logger = logging.getLogger("TrackerStore")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "trackers.db")
+
+# Namespaces: "breakout" (symbol -> {timeframe: time}), "strategy" (symbol -> {strategy: time}),
+# "ath" (symbol -> price, stored under key "")
+ATH_KEY = ""
+
+_DELETE = object() # Pending-write marker for a removed entry
+
+
+def _dumps(value):
+    # numpy scalars from the metrics engine -> plain Python values
+    return json.dumps(value, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+
+
+class TrackerStore:
+    """
+    SQLite (WAL) store for the breakout/strategy trackers and the ATH cache, one row per
+    (namespace, symbol, key). Changes are queued in memory (latest value per row wins) and a
+    writer thread commits them in one transaction after a short debounce, so the scanner
+    never blocks on disk and each write costs only the rows that changed.
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = TrackerStore()
+        return cls._instance
+
+    def __init__(self, path=DB_PATH, debounce=1.0):
+        self.path = path
+        self.debounce = debounce
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL") # Durable at checkpoints; never corrupt
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+            ns TEXT NOT NULL, symbol TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+            PRIMARY KEY (ns, symbol, key)) WITHOUT ROWID""")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._db_lock = threading.Lock()
+        self._pending = {} # (ns, symbol, key) -> value | _DELETE
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self.writes = 0
+        self.commits = 0
+        self._writer = threading.Thread(target=self._run, daemon=True, name="TrackerStoreWriter")
+        self._writer.start()
+        atexit.register(self.close)
+
+    # --- Reads (startup) ---
+
+    def load(self, ns):
+        """Namespace as a dict: symbol -> {key: value}, or symbol -> value for "ath"."""
+        out = {}
+        with self._db_lock:
+            rows = self._conn.execute("SELECT symbol, key, value FROM entries WHERE ns = ?", (ns,)).fetchall()
+        for symbol, key, value in rows:
+            value = json.loads(value)
+            if key == ATH_KEY: out[symbol] = value
+            else: out.setdefault(symbol, {})[key] = value
+        return out
+
+    def import_json(self, ns, json_path):
+        """One-time migration: copies a legacy JSON file into the namespace (skipped once done)."""
+        marker = f"imported:{ns}"
+        with self._db_lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE name = ?", (marker,)).fetchone(): return 0
+        rows = []
+        if os.path.exists(json_path):
+            try:
+                with open(json_path, "r") as f:
+                    data = json.load(f)
+                for symbol, v in data.items():
+                    if isinstance(v, dict):
+                        rows.extend((ns, symbol, k, _dumps(val)) for k, val in v.items())
+                    else:
+                        rows.append((ns, symbol, ATH_KEY, _dumps(v)))
+            except Exception as e:
+                logger.error(f"Failed to import {json_path}: {e}")
+                return 0
+        with self._db_lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", rows)
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (marker, json_path))
+        if rows: logger.info(f"Imported {len(rows)} {ns} entries from {json_path}")
+        return len(rows)
+
+    # --- Writes (queued) ---
+
+    def set(self, ns, symbol, key, value):
+        with self._lock:
+            self._pending[(ns, symbol, key)] = value
+        self._wake.set()
+
+    def set_ath(self, symbol, value):
+        self.set("ath", symbol, ATH_KEY, value)
+
+    def delete(self, ns, symbol, key=ATH_KEY):
+        with self._lock:
+            self._pending[(ns, symbol, key)] = _DELETE
+        self._wake.set()
+
+    def flush(self):
+        """Commits everything queued so far (one transaction). Returns the number of rows written."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch: return 0
+        upserts = [(ns, s, k, _dumps(v)) for (ns, s, k), v in batch.items() if v is not _DELETE]
+        deletes = [key for key, v in batch.items() if v is _DELETE]
+        try:
+            with self._db_lock:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    if upserts: self._conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", upserts)
+                    if deletes: self._conn.executemany("DELETE FROM entries WHERE ns = ? AND symbol = ? AND key = ?", deletes)
+        except Exception as e:
+            # Put the batch back (newer queued values win) and retry on the next wake-up
+            logger.error(f"Tracker Store write failed: {e}")
+            with self._lock:
+                for k, v in batch.items(): self._pending.setdefault(k, v)
+            return 0
+        self.writes += len(batch)
+        self.commits += 1
+        return len(batch)
+
+    def _run(self):
+        while not self._stop:
+            self._wake.wait()
+            if self._stop: break
+            # Debounce: let the rest of the scan cycle's changes land in the same transaction
+            time.sleep(self.debounce)
+            if self._stop: break
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        if self._stop: return
+        self._stop = True
+        self._wake.set()
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "rows_written": self.writes, "commits": self.commits}
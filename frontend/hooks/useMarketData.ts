@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 
 import { StockData } from '@/lib/types';
@@ -6,15 +6,29 @@ import { StockData } from '@/lib/types';
 export const useMarketData = () => {
     const [data, setData] = useState<StockData[]>([]);
     const [loading, setLoading] = useState(true);
+    // Last snapshot version and rows, so polls only transfer what changed
+    const version = useRef<number | null>(null);
+    const rows = useRef<Map<string, StockData>>(new Map());
 
     const API_URL = "http://localhost:8000";
 
     const fetchData = async (silent = false) => {
         if (!silent) setLoading(true);
         try {
-            const res = await axios.get(`${API_URL}/god-mode`);
+            const params = version.current !== null ? { since: version.current } : {};
+            const res = await axios.get(`${API_URL}/god-mode`, { params });
             if (res.data.status === "success") {
-                setData(res.data.data);
+                if (res.data.delta) {
+                    if (res.data.version === version.current) return; // Nothing changed
+                    res.data.data.forEach((row: StockData) => rows.current.set(row.symbol, row));
+                    res.data.removed.forEach((sym: string) => rows.current.delete(sym));
+                    // Server sends the sorted order; rebuild the list from it
+                    setData(res.data.order.map((sym: string) => rows.current.get(sym)).filter(Boolean));
+                } else {
+                    rows.current = new Map(res.data.data.map((row: StockData) => [row.symbol, row]));
+                    setData(res.data.data);
+                }
+                version.current = res.data.version;
             }
         } catch (err) {
             console.error("Failed to fetch data", err);